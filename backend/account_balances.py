@@ -0,0 +1,157 @@
+"""
+Maintenance helpers for the account_balances_daily table.
+
+Each AccountBalanceDaily row holds the summed amount and count of the accounting
+entries for one (UTC day, project, account_type, entry_type). create_accounting_entry()
+calls add_to_daily_balance() so the aggregate changes in the same transaction as
+the entry. Anything that writes accounting_entries directly (backfills, fix scripts)
+must call rebuild_account_balances() afterwards; rebuild_account_balances.py does the
+same from the command line.
+"""
+from datetime import date, datetime, time, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Date, cast, delete, func, insert, select
+from sqlalchemy.orm import Session
+from models import AccountBalanceDaily, AccountingEntry
+
+# project_id stored for entries that have no project (NULL cannot be part of the key)
+NO_PROJECT = 0
+
+BalanceKey = Tuple[date, int, str, str]
+
+def to_utc(transaction_date: datetime) -> datetime:
+    """Convert a tz-aware transaction date to UTC before it is stored.
+    
+    SQLite stores DateTime values without their offset, so a non-UTC value would be
+    bucketed under its local day by entry_day_column() but its UTC day by balance_day().
+    Naive values are taken to be UTC already.
+    """
+    if transaction_date.tzinfo is not None:
+        return transaction_date.astimezone(timezone.utc)
+    return transaction_date
+
+def balance_day(transaction_date: datetime) -> date:
+    """The UTC calendar day an entry is bucketed under"""
+    return to_utc(transaction_date).date()
+
+def utc_day_start(day: date) -> datetime:
+    """Midnight UTC at the start of a calendar day"""
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+def entry_day_column(db: Session):
+    """SQL expression for balance_day() of AccountingEntry.transaction_date"""
+    if db.get_bind().dialect.name == "postgresql":
+        return cast(func.timezone("UTC", AccountingEntry.transaction_date), Date)
+    return func.date(AccountingEntry.transaction_date)
+
+def _upsert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(AccountBalanceDaily)
+
+def add_to_daily_balance(
+    db: Session,
+    transaction_date: datetime,
+    project_id: Optional[int],
+    account_type: str,
+    entry_type: str,
+    amount: float,
+    entry_count: int = 1
+) -> None:
+    """Add an entry's amount to its daily balance row. Does not commit.
+    
+    Uses INSERT ... ON CONFLICT DO UPDATE so concurrent writers add to the same
+    row instead of racing on a read-modify-write.
+    """
+    stmt = _upsert(db).values(
+        balance_date=balance_day(transaction_date),
+        project_id=project_id or NO_PROJECT,
+        account_type=account_type,
+        entry_type=entry_type,
+        amount=amount,
+        entry_count=entry_count
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["balance_date", "project_id", "account_type", "entry_type"],
+        set_={
+            "amount": AccountBalanceDaily.amount + stmt.excluded.amount,
+            "entry_count": AccountBalanceDaily.entry_count + stmt.excluded.entry_count
+        }
+    )
+    db.execute(stmt)
+
+def _grouped_entries(db: Session):
+    day = entry_day_column(db)
+    project = func.coalesce(AccountingEntry.project_id, NO_PROJECT)
+    return select(
+        day,
+        project,
+        AccountingEntry.account_type,
+        AccountingEntry.entry_type,
+        func.sum(AccountingEntry.amount),
+        func.count(AccountingEntry.id)
+    ).group_by(day, project, AccountingEntry.account_type, AccountingEntry.entry_type)
+
+def rebuild_account_balances(db: Session) -> int:
+    """Recompute the whole table from accounting_entries with one INSERT ... SELECT and commit.
+    
+    Returns the number of daily rows written.
+    """
+    db.execute(delete(AccountBalanceDaily))
+    db.execute(
+        insert(AccountBalanceDaily).from_select(
+            ["balance_date", "project_id", "account_type", "entry_type", "amount", "entry_count"],
+            _grouped_entries(db)
+        )
+    )
+    db.commit()
+    return db.query(func.count()).select_from(AccountBalanceDaily).scalar()
+
+def _as_date(value) -> date:
+    # SQLite returns date() results as strings
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+def find_drifted_account_balances(db: Session) -> List[BalanceKey]:
+    """Return the keys whose stored daily balance differs from accounting_entries"""
+    expected: Dict[BalanceKey, Tuple[float, int]] = {
+        (_as_date(day), project_id, account_type, entry_type): (float(amount or 0.0), count)
+        for day, project_id, account_type, entry_type, amount, count in db.execute(_grouped_entries(db)).all()
+    }
+    stored: Dict[BalanceKey, Tuple[float, int]] = {
+        (row.balance_date, row.project_id, row.account_type, row.entry_type): (row.amount, row.entry_count)
+        for row in db.query(AccountBalanceDaily).all()
+    }
+    
+    drifted = []
+    for key in set(expected) | set(stored):
+        expected_amount, expected_count = expected.get(key, (0.0, 0))
+        stored_amount, stored_count = stored.get(key, (0.0, 0))
+        if expected_count != stored_count or abs(expected_amount - stored_amount) > 1e-6:
+            drifted.append(key)
+    return sorted(drifted)
+
+def summed_balances(
+    db: Session,
+    project_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> Dict[Tuple[str, str], float]:
+    """Amounts summed per (account_type, entry_type) over an inclusive range of UTC days"""
+    conditions = []
+    if project_id:
+        conditions.append(AccountBalanceDaily.project_id == project_id)
+    if start_date:
+        conditions.append(AccountBalanceDaily.balance_date >= start_date)
+    if end_date:
+        conditions.append(AccountBalanceDaily.balance_date <= end_date)
+    
+    rows = db.query(
+        AccountBalanceDaily.account_type,
+        AccountBalanceDaily.entry_type,
+        func.sum(AccountBalanceDaily.amount)
+    ).filter(*conditions).group_by(
+        AccountBalanceDaily.account_type, AccountBalanceDaily.entry_type
+    ).all()
+    return {(account_type, entry_type): float(amount or 0.0) for account_type, entry_type, amount in rows}
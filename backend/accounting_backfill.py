@@ -0,0 +1,177 @@
+"""
+Set-based, resumable backfill of accounting entries for existing transactions.
+
+Used by migrate_accounting_data.py and the 420b14f08575 Alembic revision. Each step
+posts the debit and credit legs for one kind of source row (invoices, invoice
+payments, vouchers, developer payments) with a single INSERT ... SELECT per chunk of
+source ids. A NOT EXISTS anti-join skips rows that already have entries, so the
+backfill is idempotent. After each chunk the last processed id is written to
+accounting_backfill_progress and committed, so an interrupted run resumes where it
+stopped. The progress table is part of the schema (AccountingBackfillProgress); the
+420b14f08575 revision, which runs before that table's revision, creates it for the
+duration of its backfill.
+
+The statements are raw SQL against the table layout of the accounting_entries
+revision so they stay valid for that migration whatever models.py looks like later.
+"""
+import time
+from typing import Callable, Dict, Optional
+import sqlalchemy as sa
+
+DEFAULT_CHUNK_SIZE = 5000
+
+PROGRESS_TABLE = "accounting_backfill_progress"
+
+ENTRY_COLUMNS = """
+    (transaction_date, transaction_type, account_type, entry_type, amount,
+     description, reference_number, invoice_id, payment_id, voucher_id,
+     developer_payment_id, project_id, created_by, created_at)
+"""
+
+# step name -> (source table, INSERT ... SELECT posting both legs for source ids in (:after_id, :upto_id])
+BACKFILL_STEPS = {
+    "invoices": ("invoices", f"""
+        INSERT INTO accounting_entries {ENTRY_COLUMNS}
+        SELECT i.invoice_date, 'invoice_created', legs.account_type, legs.entry_type, i.invoice_amount,
+               CASE WHEN legs.entry_type = 'debit'
+                    THEN 'Invoice #' || i.id || ' - ' || COALESCE(p.name, 'Project')
+                    ELSE 'Invoice #' || i.id || ' - Revenue' END,
+               'INV-' || i.id, i.id, NULL, NULL, NULL, i.project_id, i.created_by, CURRENT_TIMESTAMP
+        FROM invoices i
+        LEFT JOIN projects p ON p.id = i.project_id
+        CROSS JOIN (
+            SELECT 'accounts_receivable' AS account_type, 'debit' AS entry_type
+            UNION ALL SELECT 'revenue', 'credit'
+        ) legs
+        WHERE i.id > :after_id AND i.id <= :upto_id
+        AND NOT EXISTS (
+            SELECT 1 FROM accounting_entries ae
+            WHERE ae.invoice_id = i.id AND ae.transaction_type = 'invoice_created'
+        )
+    """),
+    "invoice_payments": ("payments", f"""
+        INSERT INTO accounting_entries {ENTRY_COLUMNS}
+        SELECT pay.payment_date, 'invoice_payment', legs.account_type, legs.entry_type, pay.amount,
+               'Payment for Invoice #' || pay.invoice_id,
+               'PAY-' || pay.id, pay.invoice_id, pay.id, NULL, NULL, i.project_id, pay.created_by, CURRENT_TIMESTAMP
+        FROM payments pay
+        JOIN invoices i ON i.id = pay.invoice_id
+        CROSS JOIN (
+            SELECT 'cash' AS account_type, 'debit' AS entry_type
+            UNION ALL SELECT 'accounts_receivable', 'credit'
+        ) legs
+        WHERE pay.id > :after_id AND pay.id <= :upto_id
+        AND NOT EXISTS (
+            SELECT 1 FROM accounting_entries ae
+            WHERE ae.payment_id = pay.id AND ae.transaction_type = 'invoice_payment'
+        )
+    """),
+    "vouchers": ("payment_vouchers", f"""
+        INSERT INTO accounting_entries {ENTRY_COLUMNS}
+        SELECT v.voucher_date, 'voucher_created', legs.account_type, legs.entry_type, v.voucher_amount,
+               CASE WHEN legs.entry_type = 'debit'
+                    THEN 'Voucher #' || v.id || ' - ' || COALESCE(p.name, 'Project')
+                    ELSE 'Voucher #' || v.id || ' - Accounts Payable' END,
+               'VCH-' || v.id, NULL, NULL, v.id, NULL, v.project_id, v.created_by, CURRENT_TIMESTAMP
+        FROM payment_vouchers v
+        LEFT JOIN projects p ON p.id = v.project_id
+        CROSS JOIN (
+            SELECT 'expense' AS account_type, 'debit' AS entry_type
+            UNION ALL SELECT 'accounts_payable', 'credit'
+        ) legs
+        WHERE v.id > :after_id AND v.id <= :upto_id
+        AND NOT EXISTS (
+            SELECT 1 FROM accounting_entries ae
+            WHERE ae.voucher_id = v.id AND ae.transaction_type = 'voucher_created'
+        )
+    """),
+    "developer_payments": ("developer_payments", f"""
+        INSERT INTO accounting_entries {ENTRY_COLUMNS}
+        SELECT dp.payment_date, 'voucher_payment', legs.account_type, legs.entry_type, dp.payment_amount,
+               'Payment for Voucher #' || dp.voucher_id,
+               'DPAY-' || dp.id, NULL, NULL, dp.voucher_id, dp.id, v.project_id, dp.created_by, CURRENT_TIMESTAMP
+        FROM developer_payments dp
+        JOIN payment_vouchers v ON v.id = dp.voucher_id
+        CROSS JOIN (
+            SELECT 'accounts_payable' AS account_type, 'debit' AS entry_type
+            UNION ALL SELECT 'cash', 'credit'
+        ) legs
+        WHERE dp.id > :after_id AND dp.id <= :upto_id
+        AND NOT EXISTS (
+            SELECT 1 FROM accounting_entries ae
+            WHERE ae.developer_payment_id = dp.id AND ae.transaction_type = 'voucher_payment'
+        )
+    """),
+}
+
+def _load_progress(connection) -> Dict[str, tuple]:
+    rows = connection.execute(sa.text(f"SELECT step, last_id, rows_inserted FROM {PROGRESS_TABLE}")).all()
+    return {step: (last_id, rows_inserted) for step, last_id, rows_inserted in rows}
+
+def _save_progress(connection, step: str, last_id: int, rows_inserted: int, is_new: bool) -> None:
+    if is_new:
+        statement = f"INSERT INTO {PROGRESS_TABLE} (step, last_id, rows_inserted) VALUES (:step, :last_id, :rows_inserted)"
+    else:
+        statement = f"UPDATE {PROGRESS_TABLE} SET last_id = :last_id, rows_inserted = :rows_inserted WHERE step = :step"
+    connection.execute(sa.text(statement), {"step": step, "last_id": last_id, "rows_inserted": rows_inserted})
+
+def run_accounting_backfill(
+    connection,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    commit: bool = True,
+    reset: bool = False,
+    log: Optional[Callable[[str], None]] = print
+) -> Dict[str, int]:
+    """Post missing accounting entries for every backfill step, chunk by chunk.
+    
+    commit=True commits after every chunk (pass False when the connection is in
+    autocommit mode, e.g. inside an Alembic autocommit_block). reset=True discards
+    recorded progress and starts from the first id. Returns entries inserted per step.
+    """
+    log = log or (lambda message: None)
+    if reset:
+        connection.execute(sa.text(f"DELETE FROM {PROGRESS_TABLE}"))
+    progress = _load_progress(connection)
+    if commit:
+        connection.commit()
+    
+    inserted: Dict[str, int] = {}
+    started = time.perf_counter()
+    for step, (source_table, insert_sql) in BACKFILL_STEPS.items():
+        max_id = connection.execute(sa.text(f"SELECT MAX(id) FROM {source_table}")).scalar() or 0
+        last_id, step_rows = progress.get(step, (0, 0))
+        is_new = step not in progress
+        if last_id:
+            log(f"  {step}: resuming after id {last_id}")
+    
+        step_started = time.perf_counter()
+        while last_id < max_id:
+            upto_id = min(last_id + chunk_size, max_id)
+            chunk_started = time.perf_counter()
+            result = connection.execute(sa.text(insert_sql), {"after_id": last_id, "upto_id": upto_id})
+            rows = max(result.rowcount or 0, 0)
+            step_rows += rows
+            _save_progress(connection, step, upto_id, step_rows, is_new)
+            is_new = False
+            if commit:
+                connection.commit()
+    
+            elapsed = time.perf_counter() - chunk_started
+            rate = rows / elapsed if elapsed > 0 else 0.0
+            log(f"  {step}: ids {last_id + 1}-{upto_id} -> {rows} entries ({rate:,.0f} rows/s)")
+            last_id = upto_id
+    
+        elapsed = time.perf_counter() - step_started
+        inserted[step] = step_rows
+        log(f"  {step}: {step_rows} entries in {elapsed:.2f}s")
+    
+    # Finished: clear the progress so a later run (e.g. after fix_accounting_entries.py) starts over
+    connection.execute(sa.text(f"DELETE FROM {PROGRESS_TABLE}"))
+    if commit:
+        connection.commit()
+    
+    total = sum(inserted.values())
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed > 0 else 0.0
+    log(f"  Backfilled {total} entries in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    return inserted
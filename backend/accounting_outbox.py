@@ -0,0 +1,216 @@
+"""
+Transactional outbox for accounting postings.
+
+Write paths call enqueue_accounting_event() before their single commit, so the
+outbox row is stored atomically with the invoice/payment/voucher it describes.
+process_accounting_outbox() drains pending rows in batches and posts the
+double-entry rows with the record_* helpers. It first checks which sources are
+already posted, so an event is never posted twice even if a batch is retried.
+
+The app runs the drain in a background thread (start_accounting_outbox_worker(),
+started from main.py); drain_accounting_outbox.py does the same from the command line.
+"""
+import os
+import threading
+import traceback
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set, Tuple
+from sqlalchemy import and_, or_, insert
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import AccountingOutbox, AccountingEntry, Invoice, Payment, PaymentVoucher, DeveloperPayment
+
+DEFAULT_BATCH_SIZE = 100
+MAX_ATTEMPTS = 5  # Events that keep failing are left for inspection (see last_error)
+
+# event_type -> outbox/entry column identifying the source row
+EVENT_SOURCE_COLUMNS = {
+    "invoice_created": "invoice_id",
+    "invoice_payment": "payment_id",
+    "voucher_created": "voucher_id",
+    "voucher_payment": "developer_payment_id",
+}
+
+def enqueue_accounting_event(
+    db: Session,
+    event_type: str,
+    created_by: int,
+    invoice_id: Optional[int] = None,
+    payment_id: Optional[int] = None,
+    voucher_id: Optional[int] = None,
+    developer_payment_id: Optional[int] = None
+) -> AccountingOutbox:
+    """Queue a ledger posting in the caller's transaction. Does not commit."""
+    if event_type not in EVENT_SOURCE_COLUMNS:
+        raise ValueError(f"Unknown accounting event type: {event_type}")
+    event = AccountingOutbox(
+        event_type=event_type,
+        invoice_id=invoice_id,
+        payment_id=payment_id,
+        voucher_id=voucher_id,
+        developer_payment_id=developer_payment_id,
+        created_by=created_by
+    )
+    db.add(event)
+    return event
+
+def enqueue_accounting_events(
+    db: Session,
+    event_type: str,
+    created_by: int,
+    sources: Iterable[Dict[str, int]]
+) -> int:
+    """Queue one event per source with a single multi-row INSERT. Does not commit.
+    
+    Each source maps outbox columns to ids, e.g. {"voucher_id": 1, "developer_payment_id": 7}.
+    Returns the number of events queued.
+    """
+    if event_type not in EVENT_SOURCE_COLUMNS:
+        raise ValueError(f"Unknown accounting event type: {event_type}")
+    rows = [
+        {
+            "event_type": event_type,
+            "created_by": created_by,
+            **{column_name: source.get(column_name) for column_name in EVENT_SOURCE_COLUMNS.values()}
+        }
+        for source in sources
+    ]
+    if rows:
+        db.execute(insert(AccountingOutbox), rows)
+    return len(rows)
+
+def _load_by_id(db: Session, model, ids: Set[int]) -> Dict[int, object]:
+    if not ids:
+        return {}
+    return {row.id: row for row in db.query(model).filter(model.id.in_(ids)).all()}
+
+def _posted_sources(db: Session, events) -> Set[Tuple[str, int]]:
+    """(event_type, source id) pairs that already have ledger entries"""
+    conditions = []
+    for event_type, column_name in EVENT_SOURCE_COLUMNS.items():
+        source_ids = {getattr(e, column_name) for e in events if e.event_type == event_type}
+        if source_ids:
+            conditions.append(and_(
+                AccountingEntry.transaction_type == event_type,
+                getattr(AccountingEntry, column_name).in_(source_ids)
+            ))
+    if not conditions:
+        return set()
+    
+    rows = db.query(
+        AccountingEntry.transaction_type,
+        AccountingEntry.invoice_id,
+        AccountingEntry.payment_id,
+        AccountingEntry.voucher_id,
+        AccountingEntry.developer_payment_id
+    ).filter(or_(*conditions)).distinct().all()
+    return {
+        (row.transaction_type, getattr(row, EVENT_SOURCE_COLUMNS[row.transaction_type]))
+        for row in rows
+    }
+
+def process_accounting_outbox(db: Session, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Post one batch of pending events and commit. Returns the number of events handled."""
+    # Imported here: routers.accounting imports ledger_integrity, which imports this module
+    from routers.accounting import (
+        record_invoice_created, record_invoice_payment, record_voucher_created, record_voucher_payment
+    )
+    
+    # SKIP LOCKED lets several app workers drain concurrently on PostgreSQL
+    events = db.query(AccountingOutbox).filter(
+        AccountingOutbox.processed_at.is_(None),
+        AccountingOutbox.attempts < MAX_ATTEMPTS
+    ).order_by(AccountingOutbox.id).limit(batch_size).with_for_update(skip_locked=True).all()
+    if not events:
+        return 0
+    
+    # Source rows for the whole batch, one query per type
+    invoices = _load_by_id(db, Invoice, {e.invoice_id for e in events if e.invoice_id})
+    payments = _load_by_id(db, Payment, {e.payment_id for e in events if e.payment_id})
+    invoices.update(_load_by_id(db, Invoice, {p.invoice_id for p in payments.values()} - set(invoices)))
+    vouchers = _load_by_id(db, PaymentVoucher, {e.voucher_id for e in events if e.voucher_id})
+    developer_payments = _load_by_id(db, DeveloperPayment, {e.developer_payment_id for e in events if e.developer_payment_id})
+    vouchers.update(_load_by_id(db, PaymentVoucher, {p.voucher_id for p in developer_payments.values()} - set(vouchers)))
+    posted = _posted_sources(db, events)
+    
+    for event in events:
+        source_id = getattr(event, EVENT_SOURCE_COLUMNS[event.event_type])
+        try:
+            # Savepoint per event so one bad event does not hold back the batch
+            with db.begin_nested():
+                if (event.event_type, source_id) not in posted:
+                    if event.event_type == "invoice_created":
+                        record_invoice_created(db, invoices[source_id], event.created_by)
+                    elif event.event_type == "invoice_payment":
+                        payment = payments[source_id]
+                        record_invoice_payment(db, payment, invoices[payment.invoice_id], event.created_by)
+                    elif event.event_type == "voucher_created":
+                        record_voucher_created(db, vouchers[source_id], event.created_by)
+                    else:
+                        developer_payment = developer_payments[source_id]
+                        record_voucher_payment(db, developer_payment, vouchers[developer_payment.voucher_id], event.created_by)
+                    posted.add((event.event_type, source_id))
+            event.processed_at = datetime.utcnow()
+            event.last_error = None
+        except KeyError:
+            event.attempts += 1
+            event.last_error = f"{EVENT_SOURCE_COLUMNS[event.event_type]} {source_id} not found"
+        except Exception as e:
+            event.attempts += 1
+            event.last_error = str(e)
+    
+    db.commit()
+    return len(events)
+
+def drain_accounting_outbox(db: Session, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Process batches until no pending events are left. Returns the number handled."""
+    total = 0
+    while True:
+        handled = process_accounting_outbox(db, batch_size)
+        total += handled
+        if handled < batch_size:
+            return total
+
+# ========== BACKGROUND WORKER ==========
+
+_wakeup = threading.Event()
+_stop = threading.Event()
+_worker: Optional[threading.Thread] = None
+
+def notify_accounting_outbox() -> None:
+    """Wake the worker after a commit instead of waiting for the next poll"""
+    _wakeup.set()
+
+def _run_worker(interval: float) -> None:
+    while not _stop.is_set():
+        db = SessionLocal()
+        try:
+            drain_accounting_outbox(db)
+        except Exception as e:
+            db.rollback()
+            print(f"Error draining accounting outbox: {e}")
+            traceback.print_exc()
+        finally:
+            db.close()
+        _wakeup.wait(interval)
+        _wakeup.clear()
+
+def start_accounting_outbox_worker(interval: Optional[float] = None) -> None:
+    """Start the drain thread (once per process)"""
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    if interval is None:
+        interval = float(os.getenv("ACCOUNTING_OUTBOX_INTERVAL", "5"))
+    _stop.clear()
+    _worker = threading.Thread(target=_run_worker, args=(interval,), name="accounting-outbox", daemon=True)
+    _worker.start()
+
+def stop_accounting_outbox_worker(timeout: float = 10.0) -> None:
+    global _worker
+    if _worker is None:
+        return
+    _stop.set()
+    _wakeup.set()
+    _worker.join(timeout)
+    _worker = None
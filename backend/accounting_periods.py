@@ -0,0 +1,135 @@
+"""
+Month-end close snapshots and trial balances.
+
+close_accounting_period() stores cumulative debits and credits per project and
+account as of the last UTC day of a month in period_closing_balances. Closed
+periods are never recomputed.
+
+accumulated_balances() starts from the latest snapshot on or before the
+requested day and only aggregates entries the snapshot does not contain:
+- entries dated after the snapshot's period end
+- late postings into a closed month, i.e. entries with ids above the
+  snapshot's last_entry_id
+Both use indexes (transaction_date, primary key), so a trial balance for any
+date only reads the open period's rows. The close holds a lock that keeps entries
+from being posted concurrently, so no entry can commit later with an id at or
+below last_entry_id.
+
+Deleting and re-inserting accounting entries gives them ids above every
+last_entry_id, which would count the closed months twice; the scripts that do
+so refuse to run once a period is closed (see closed_period_names()).
+"""
+import re
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, case, or_, text
+from sqlalchemy.orm import Session
+from models import AccountingEntry, AccountingPeriod, PeriodClosingBalance
+from account_balances import NO_PROJECT, utc_day_start
+from idempotency import lock_for_write
+
+PERIOD_PATTERN = re.compile(r"^(\d{4})-(0[1-9]|1[0-2])$")
+
+# (project_id, account_type) -> [debit_total, credit_total]
+Balances = Dict[Tuple[int, str], List[float]]
+
+def parse_period(period: str) -> Tuple[date, date]:
+    """First and last day of a YYYY-MM period. Raises ValueError for other formats."""
+    match = PERIOD_PATTERN.match(period)
+    if not match:
+        raise ValueError(f"Invalid period: {period}")
+    year, month = int(match.group(1)), int(match.group(2))
+    period_start = date(year, month, 1)
+    next_start = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return period_start, next_start - timedelta(days=1)
+
+def closed_period_names(db: Session) -> List[str]:
+    return [period for period, in db.query(AccountingPeriod.period).order_by(AccountingPeriod.period_end).all()]
+
+def lock_entries_for_close(db: Session) -> None:
+    """Wait for in-flight postings to commit and block new ones until the close commits"""
+    if db.get_bind().dialect.name == "postgresql":
+        # SHARE conflicts with the ROW EXCLUSIVE lock every INSERT takes
+        db.execute(text("LOCK TABLE accounting_entries IN SHARE MODE"))
+    else:
+        lock_for_write(db)
+
+def latest_closed_period(db: Session, on_or_before: date) -> Optional[AccountingPeriod]:
+    return db.query(AccountingPeriod).filter(
+        AccountingPeriod.period_end <= on_or_before
+    ).order_by(AccountingPeriod.period_end.desc()).first()
+
+def accumulated_balances(
+    db: Session,
+    as_of: date,
+    project_id: Optional[int] = None,
+    upto_entry_id: Optional[int] = None
+) -> Tuple[Optional[AccountingPeriod], Balances]:
+    """Cumulative totals up to and including the UTC day as_of.
+    
+    Returns the closed period used as the starting point (None when there is
+    none yet, in which case every entry up to as_of is aggregated).
+    """
+    base = latest_closed_period(db, as_of)
+    balances: Balances = {}
+    if base:
+        query = db.query(PeriodClosingBalance).filter(PeriodClosingBalance.period_id == base.id)
+        if project_id:
+            query = query.filter(PeriodClosingBalance.project_id == project_id)
+        for row in query.all():
+            balances[(row.project_id, row.account_type)] = [row.debit_total, row.credit_total]
+    
+    conditions = [AccountingEntry.transaction_date < utc_day_start(as_of + timedelta(days=1))]
+    if upto_entry_id is not None:
+        conditions.append(AccountingEntry.id <= upto_entry_id)
+    if base:
+        conditions.append(or_(
+            AccountingEntry.transaction_date >= utc_day_start(base.period_end + timedelta(days=1)),
+            AccountingEntry.id > base.last_entry_id
+        ))
+    if project_id:
+        conditions.append(AccountingEntry.project_id == project_id)
+    
+    project_column = func.coalesce(AccountingEntry.project_id, NO_PROJECT)
+    rows = db.query(
+        project_column,
+        AccountingEntry.account_type,
+        func.sum(case((AccountingEntry.entry_type == "debit", AccountingEntry.amount), else_=0)),
+        func.sum(case((AccountingEntry.entry_type == "credit", AccountingEntry.amount), else_=0))
+    ).filter(*conditions).group_by(project_column, AccountingEntry.account_type).all()
+    for row_project_id, account_type, debits, credits in rows:
+        totals = balances.setdefault((row_project_id, account_type), [0.0, 0.0])
+        totals[0] += float(debits or 0.0)
+        totals[1] += float(credits or 0.0)
+    return base, balances
+
+def close_accounting_period(db: Session, period: str, closed_by: int) -> AccountingPeriod:
+    """Snapshot the closing balances of a period and commit. Callers validate the period first."""
+    period_start, period_end = parse_period(period)
+    lock_entries_for_close(db)
+    # Fix the set of entries first so the snapshot and last_entry_id agree
+    last_entry_id = db.query(func.max(AccountingEntry.id)).scalar() or 0
+    _, balances = accumulated_balances(db, period_end, upto_entry_id=last_entry_id)
+    
+    accounting_period = AccountingPeriod(
+        period=period,
+        period_start=period_start,
+        period_end=period_end,
+        last_entry_id=last_entry_id,
+        closed_by=closed_by
+    )
+    db.add(accounting_period)
+    db.flush()
+    db.add_all([
+        PeriodClosingBalance(
+            period_id=accounting_period.id,
+            project_id=project_id,
+            account_type=account_type,
+            debit_total=debit_total,
+            credit_total=credit_total
+        )
+        for (project_id, account_type), (debit_total, credit_total) in balances.items()
+    ])
+    db.commit()
+    db.refresh(accounting_period)
+    return accounting_period
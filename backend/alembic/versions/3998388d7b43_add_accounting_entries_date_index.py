@@ -0,0 +1,27 @@
+"""add accounting entries transaction date index
+
+Revision ID: 3998388d7b43
+Revises: 5520990ac84c
+Create Date: 2026-10-17 13:40:52.117206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3998388d7b43'
+down_revision: Union[str, None] = '5520990ac84c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Date-range filters on /entries and /ledger without a project filter
+    op.create_index(op.f('ix_accounting_entries_transaction_date'), 'accounting_entries', ['transaction_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_accounting_entries_transaction_date'), table_name='accounting_entries')
@@ -0,0 +1,50 @@
+"""add account balances daily table
+
+Revision ID: 5520990ac84c
+Revises: 82f7367d5b10
+Create Date: 2026-10-17 12:21:09.664032
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5520990ac84c'
+down_revision: Union[str, None] = '82f7367d5b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('account_balances_daily',
+    sa.Column('balance_date', sa.Date(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('account_type', sa.String(), nullable=False),
+    sa.Column('entry_type', sa.String(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('entry_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('balance_date', 'project_id', 'account_type', 'entry_type')
+    )
+    op.create_index('ix_account_balances_daily_project_id_balance_date', 'account_balances_daily', ['project_id', 'balance_date'], unique=False)
+
+    # Backfill from the existing ledger, bucketed by UTC day (project 0 = no project)
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        day = "CAST(timezone('UTC', transaction_date) AS DATE)"
+    else:
+        day = "date(transaction_date)"
+    op.execute(f"""
+        INSERT INTO account_balances_daily
+        (balance_date, project_id, account_type, entry_type, amount, entry_count)
+        SELECT {day}, COALESCE(project_id, 0), account_type, entry_type, SUM(amount), COUNT(id)
+        FROM accounting_entries
+        GROUP BY {day}, COALESCE(project_id, 0), account_type, entry_type
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_account_balances_daily_project_id_balance_date', table_name='account_balances_daily')
+    op.drop_table('account_balances_daily')
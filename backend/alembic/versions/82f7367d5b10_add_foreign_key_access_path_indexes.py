@@ -0,0 +1,48 @@
+"""add foreign key access path indexes
+
+Revision ID: 82f7367d5b10
+Revises: 8c669e09c45e
+Create Date: 2026-10-17 11:03:27.518934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '82f7367d5b10'
+down_revision: Union[str, None] = '8c669e09c45e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns) - kept in sync with the Index/index=True definitions in models.py
+INDEXES = [
+    ('ix_tasks_project_id', 'tasks', ['project_id']),
+    ('ix_timesheets_task_id_status', 'timesheets', ['task_id', 'status']),
+    ('ix_timesheets_project_id_date', 'timesheets', ['project_id', 'date']),
+    ('ix_timesheets_user_id_date', 'timesheets', ['user_id', 'date']),
+    ('ix_task_developers_task_id', 'task_developers', ['task_id']),
+    ('ix_task_developers_developer_id', 'task_developers', ['developer_id']),
+    ('ix_developer_projects_project_id_developer_id', 'developer_projects', ['project_id', 'developer_id']),
+    ('ix_invoice_tasks_invoice_id', 'invoice_tasks', ['invoice_id']),
+    ('ix_invoice_tasks_task_id', 'invoice_tasks', ['task_id']),
+    ('ix_payment_voucher_tasks_voucher_id', 'payment_voucher_tasks', ['voucher_id']),
+    ('ix_payment_voucher_tasks_task_id', 'payment_voucher_tasks', ['task_id']),
+    ('ix_developer_payments_voucher_id', 'developer_payments', ['voucher_id']),
+    ('ix_developer_payment_tasks_payment_id', 'developer_payment_tasks', ['payment_id']),
+    ('ix_developer_payment_tasks_task_id', 'developer_payment_tasks', ['task_id']),
+    ('ix_accounting_entries_project_id_transaction_date', 'accounting_entries', ['project_id', 'transaction_date']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
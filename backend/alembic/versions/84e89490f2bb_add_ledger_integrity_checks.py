@@ -0,0 +1,70 @@
+"""add ledger integrity checks
+
+Revision ID: 84e89490f2bb
+Revises: fc3e092605aa
+Create Date: 2026-10-17 15:34:08.219547
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '84e89490f2bb'
+down_revision: Union[str, None] = 'fc3e092605aa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Lookups by source row and reference used by the integrity checks (and the outbox)
+ENTRY_INDEXES = ['invoice_id', 'payment_id', 'voucher_id', 'developer_payment_id', 'reference_number']
+
+
+def upgrade() -> None:
+    op.create_table('ledger_check_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_entry_id', sa.Integer(), nullable=False),
+    sa.Column('last_invoice_id', sa.Integer(), nullable=False),
+    sa.Column('last_payment_id', sa.Integer(), nullable=False),
+    sa.Column('last_voucher_id', sa.Integer(), nullable=False),
+    sa.Column('last_developer_payment_id', sa.Integer(), nullable=False),
+    sa.Column('entries_checked', sa.Integer(), nullable=False),
+    sa.Column('discrepancies_found', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_ledger_check_runs_id'), 'ledger_check_runs', ['id'], unique=False)
+    op.create_table('ledger_discrepancies',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('run_id', sa.Integer(), nullable=False),
+    sa.Column('check_type', sa.String(), nullable=False),
+    sa.Column('transaction_type', sa.String(), nullable=True),
+    sa.Column('reference_number', sa.String(), nullable=True),
+    sa.Column('source_id', sa.Integer(), nullable=True),
+    sa.Column('debit_total', sa.Float(), nullable=True),
+    sa.Column('credit_total', sa.Float(), nullable=True),
+    sa.Column('entry_count', sa.Integer(), nullable=True),
+    sa.Column('details', sa.Text(), nullable=True),
+    sa.Column('detected_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+    sa.Column('resolved_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['run_id'], ['ledger_check_runs.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_ledger_discrepancies_id'), 'ledger_discrepancies', ['id'], unique=False)
+    op.create_index(op.f('ix_ledger_discrepancies_run_id'), 'ledger_discrepancies', ['run_id'], unique=False)
+    op.create_index(op.f('ix_ledger_discrepancies_resolved_at'), 'ledger_discrepancies', ['resolved_at'], unique=False)
+    for column in ENTRY_INDEXES:
+        op.create_index(op.f(f'ix_accounting_entries_{column}'), 'accounting_entries', [column], unique=False)
+
+
+def downgrade() -> None:
+    for column in ENTRY_INDEXES:
+        op.drop_index(op.f(f'ix_accounting_entries_{column}'), table_name='accounting_entries')
+    op.drop_index(op.f('ix_ledger_discrepancies_resolved_at'), table_name='ledger_discrepancies')
+    op.drop_index(op.f('ix_ledger_discrepancies_run_id'), table_name='ledger_discrepancies')
+    op.drop_index(op.f('ix_ledger_discrepancies_id'), table_name='ledger_discrepancies')
+    op.drop_table('ledger_discrepancies')
+    op.drop_index(op.f('ix_ledger_check_runs_id'), table_name='ledger_check_runs')
+    op.drop_table('ledger_check_runs')
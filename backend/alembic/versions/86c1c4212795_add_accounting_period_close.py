@@ -0,0 +1,51 @@
+"""add accounting period close
+
+Revision ID: 86c1c4212795
+Revises: 84e89490f2bb
+Create Date: 2026-10-17 16:21:47.903315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '86c1c4212795'
+down_revision: Union[str, None] = '84e89490f2bb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('accounting_periods',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('period_end', sa.Date(), nullable=False),
+    sa.Column('last_entry_id', sa.Integer(), nullable=False),
+    sa.Column('closed_by', sa.Integer(), nullable=False),
+    sa.Column('closed_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+    sa.ForeignKeyConstraint(['closed_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('period')
+    )
+    op.create_index(op.f('ix_accounting_periods_id'), 'accounting_periods', ['id'], unique=False)
+    op.create_index(op.f('ix_accounting_periods_period_end'), 'accounting_periods', ['period_end'], unique=False)
+    op.create_table('period_closing_balances',
+    sa.Column('period_id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('account_type', sa.String(), nullable=False),
+    sa.Column('debit_total', sa.Float(), nullable=False),
+    sa.Column('credit_total', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['period_id'], ['accounting_periods.id'], ),
+    sa.PrimaryKeyConstraint('period_id', 'project_id', 'account_type')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('period_closing_balances')
+    op.drop_index(op.f('ix_accounting_periods_period_end'), table_name='accounting_periods')
+    op.drop_index(op.f('ix_accounting_periods_id'), table_name='accounting_periods')
+    op.drop_table('accounting_periods')
@@ -0,0 +1,70 @@
+"""add task rollups table
+
+Revision ID: 8c669e09c45e
+Revises: 5461c720dfb1
+Create Date: 2026-10-17 09:12:41.204118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c669e09c45e'
+down_revision: Union[str, None] = '5461c720dfb1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('task_rollups',
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('approved_hours', sa.Float(), nullable=False),
+    sa.Column('pending_hours', sa.Float(), nullable=False),
+    sa.Column('timesheet_count', sa.Integer(), nullable=False),
+    sa.Column('billed_invoice_id', sa.Integer(), nullable=True),
+    sa.Column('voucher_paid_amount', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['billed_invoice_id'], ['invoices.id'], ),
+    sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ),
+    sa.PrimaryKeyConstraint('task_id')
+    )
+
+    # Backfill one row per task from the source tables.
+    # Timesheet status is stored by value on PostgreSQL and by name on SQLite.
+    op.execute("""
+        INSERT INTO task_rollups
+        (task_id, approved_hours, pending_hours, timesheet_count, billed_invoice_id, voucher_paid_amount, updated_at)
+        SELECT t.id,
+               COALESCE(ts.approved_hours, 0),
+               COALESCE(ts.pending_hours, 0),
+               COALESCE(ts.timesheet_count, 0),
+               it.billed_invoice_id,
+               COALESCE(dpt.paid_amount, 0),
+               CURRENT_TIMESTAMP
+        FROM tasks t
+        LEFT JOIN (
+            SELECT task_id,
+                   SUM(CASE WHEN status IN ('approved', 'APPROVED') THEN hours ELSE 0 END) AS approved_hours,
+                   SUM(CASE WHEN status IN ('pending', 'PENDING') THEN hours ELSE 0 END) AS pending_hours,
+                   COUNT(*) AS timesheet_count
+            FROM timesheets
+            GROUP BY task_id
+        ) ts ON ts.task_id = t.id
+        LEFT JOIN (
+            SELECT task_id, MIN(invoice_id) AS billed_invoice_id
+            FROM invoice_tasks
+            GROUP BY task_id
+        ) it ON it.task_id = t.id
+        LEFT JOIN (
+            SELECT task_id, SUM(amount) AS paid_amount
+            FROM developer_payment_tasks
+            GROUP BY task_id
+        ) dpt ON dpt.task_id = t.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('task_rollups')
@@ -0,0 +1,34 @@
+"""add accounting backfill progress
+
+Revision ID: affd36127ccc
+Revises: eb46e3ecaf98
+Create Date: 2026-10-17 21:12:44.508315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'affd36127ccc'
+down_revision: Union[str, None] = 'eb46e3ecaf98'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Databases that ran the backfill before 420b14f08575 dropped its progress table already have it
+    if sa.inspect(op.get_bind()).has_table('accounting_backfill_progress'):
+        return
+    op.create_table('accounting_backfill_progress',
+    sa.Column('step', sa.String(length=64), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('rows_inserted', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('step')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('accounting_backfill_progress')
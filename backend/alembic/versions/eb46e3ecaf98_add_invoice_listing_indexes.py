@@ -0,0 +1,30 @@
+"""add invoice listing indexes
+
+Revision ID: eb46e3ecaf98
+Revises: 09c48714943d
+Create Date: 2026-10-17 20:06:37.142587
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'eb46e3ecaf98'
+down_revision: Union[str, None] = '09c48714943d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset pagination of GET /api/payments/invoices (newest first)
+    op.create_index('ix_invoices_invoice_date_id', 'invoices', ['invoice_date', 'id'], unique=False)
+    # Per-invoice payment totals and include=payments
+    op.create_index(op.f('ix_payments_invoice_id'), 'payments', ['invoice_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_payments_invoice_id'), table_name='payments')
+    op.drop_index('ix_invoices_invoice_date_id', table_name='invoices')
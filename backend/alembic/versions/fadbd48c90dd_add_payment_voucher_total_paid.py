@@ -0,0 +1,47 @@
+"""add payment voucher total paid
+
+Revision ID: fadbd48c90dd
+Revises: fdbfebca18a9
+Create Date: 2026-10-17 18:11:42.307915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fadbd48c90dd'
+down_revision: Union[str, None] = 'fdbfebca18a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('payment_vouchers', sa.Column('total_paid', sa.Float(), nullable=False, server_default='0'))
+
+    # Backfill from developer_payments; status was never updated before this revision
+    op.execute(
+        "UPDATE payment_vouchers SET total_paid = COALESCE("
+        "(SELECT SUM(payment_amount) FROM developer_payments WHERE developer_payments.voucher_id = payment_vouchers.id), 0)"
+    )
+    # Enum columns hold member names on SQLite and values on PostgreSQL (see create_enum_column)
+    if op.get_bind().dialect.name == 'postgresql':
+        paid, partial, pending = 'paid', 'partial', 'pending'
+    else:
+        paid, partial, pending = 'PAID', 'PARTIAL', 'PENDING'
+    op.execute(
+        f"UPDATE payment_vouchers SET status = CASE "
+        f"WHEN total_paid >= voucher_amount THEN '{paid}' "
+        f"WHEN total_paid > 0 THEN '{partial}' "
+        f"ELSE '{pending}' END"
+    )
+
+    # Status-filtered voucher listings per project
+    op.create_index('ix_payment_vouchers_project_id_status', 'payment_vouchers', ['project_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payment_vouchers_project_id_status', table_name='payment_vouchers')
+    op.drop_column('payment_vouchers', 'total_paid')
@@ -0,0 +1,49 @@
+"""add accounting outbox
+
+Revision ID: fc3e092605aa
+Revises: 3998388d7b43
+Create Date: 2026-10-17 14:52:31.408611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fc3e092605aa'
+down_revision: Union[str, None] = '3998388d7b43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('accounting_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_type', sa.String(), nullable=False),
+    sa.Column('invoice_id', sa.Integer(), nullable=True),
+    sa.Column('payment_id', sa.Integer(), nullable=True),
+    sa.Column('voucher_id', sa.Integer(), nullable=True),
+    sa.Column('developer_payment_id', sa.Integer(), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+    sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['developer_payment_id'], ['developer_payments.id'], ),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.id'], ),
+    sa.ForeignKeyConstraint(['payment_id'], ['payments.id'], ),
+    sa.ForeignKeyConstraint(['voucher_id'], ['payment_vouchers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_accounting_outbox_id'), 'accounting_outbox', ['id'], unique=False)
+    # Pending-event scan of the drain worker
+    op.create_index('ix_accounting_outbox_processed_at_id', 'accounting_outbox', ['processed_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_accounting_outbox_processed_at_id', table_name='accounting_outbox')
+    op.drop_index(op.f('ix_accounting_outbox_id'), table_name='accounting_outbox')
+    op.drop_table('accounting_outbox')
@@ -0,0 +1,27 @@
+"""add payment vouchers date index
+
+Revision ID: fdbfebca18a9
+Revises: 86c1c4212795
+Create Date: 2026-10-17 17:02:13.550182
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fdbfebca18a9'
+down_revision: Union[str, None] = '86c1c4212795'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset pagination of GET /api/developer-payments/vouchers (newest first)
+    op.create_index('ix_payment_vouchers_voucher_date_id', 'payment_vouchers', ['voucher_date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payment_vouchers_voucher_date_id', table_name='payment_vouchers')
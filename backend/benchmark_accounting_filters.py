@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark the accounting date filters: date(transaction_date) vs half-open ranges.
+
+For each scenario it prints the query plan of the old func.date() predicate and of
+transaction_date_filters(), whether an index is used, and the median query time.
+Works on SQLite and PostgreSQL (uses DATABASE_URL).
+
+Run with --seed N to insert N synthetic entries first. They are inserted inside a
+transaction that is rolled back at the end, so the database is left unchanged.
+"""
+import sys
+import time
+import random
+import statistics
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add current directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import select, func, insert
+from database import engine
+from models import AccountingEntry, Project, User
+from routers.accounting import transaction_date_filters
+from verify_query_plans import explain_full_scans
+
+RUNS = 20
+SEED_BATCH_SIZE = 10000
+ACCOUNTS = [
+    ("accounts_receivable", "debit"), ("revenue", "credit"),
+    ("cash", "debit"), ("accounts_receivable", "credit"),
+    ("expense", "debit"), ("accounts_payable", "credit"),
+    ("accounts_payable", "debit"), ("cash", "credit")
+]
+
+def legacy_date_filters(start_date, end_date) -> list:
+    """The filters /entries and /summary used before: not sargable"""
+    return [
+        func.date(AccountingEntry.transaction_date) >= start_date,
+        func.date(AccountingEntry.transaction_date) <= end_date
+    ]
+
+def seed_entries(connection, count: int) -> None:
+    user_id = connection.execute(select(User.id).limit(1)).scalar()
+    if user_id is None:
+        raise RuntimeError("--seed needs at least one user in the database")
+    project_ids = connection.execute(select(Project.id)).scalars().all() or [None]
+    
+    start = connection.execute(select(func.max(AccountingEntry.transaction_date))).scalar()
+    if start is None:
+        start = datetime(2023, 1, 1)
+    
+    rng = random.Random(42)
+    for offset in range(0, count, SEED_BATCH_SIZE):
+        rows = []
+        for i in range(offset, min(offset + SEED_BATCH_SIZE, count)):
+            account_type, entry_type = ACCOUNTS[i % len(ACCOUNTS)]
+            rows.append({
+                "transaction_date": start + timedelta(minutes=rng.randint(0, 3 * 365 * 24 * 60)),
+                "transaction_type": "benchmark",
+                "account_type": account_type,
+                "entry_type": entry_type,
+                "amount": round(rng.uniform(10, 5000), 2),
+                "description": "benchmark",
+                "project_id": rng.choice(project_ids),
+                "created_by": user_id
+            })
+        connection.execute(insert(AccountingEntry), rows)
+    connection.exec_driver_sql("ANALYZE")
+    print(f"Seeded {count} synthetic entries (rolled back at exit)\n")
+
+def time_query(connection, statement) -> float:
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        connection.execute(statement).all()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def run_benchmark(seed: int = 0) -> bool:
+    """Print plans and timings. Returns True when the new filters avoid full scans."""
+    all_indexed = True
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            if seed:
+                seed_entries(connection, seed)
+    
+            latest = connection.execute(select(func.max(AccountingEntry.transaction_date))).scalar()
+            if latest is None:
+                print("No accounting entries; run with --seed N")
+                return True
+            end_date = latest.date()
+            start_date = end_date - timedelta(days=30)
+            busiest_project = connection.execute(
+                select(AccountingEntry.project_id)
+                .where(AccountingEntry.project_id.isnot(None))
+                .group_by(AccountingEntry.project_id)
+                .order_by(func.count().desc())
+                .limit(1)
+            ).scalar()
+            total = connection.execute(select(func.count(AccountingEntry.id))).scalar()
+            print(f"{engine.dialect.name}: {total} entries, range {start_date} .. {end_date}\n")
+    
+            scenarios = [("date range", [])]
+            if busiest_project is not None:
+                scenarios.append((f"project {busiest_project} + date range", [AccountingEntry.project_id == busiest_project]))
+    
+            for name, extra in scenarios:
+                print(f"{name}:")
+                for label, filters in (
+                    ("date(transaction_date)", legacy_date_filters(start_date, end_date)),
+                    ("half-open range", transaction_date_filters(start_date, end_date))
+                ):
+                    statement = select(
+                        AccountingEntry.account_type, AccountingEntry.entry_type, AccountingEntry.amount
+                    ).where(*extra, *filters)
+                    nested = connection.begin_nested()
+                    scans, details = explain_full_scans(connection, statement, disable_seqscan=False)
+                    nested.rollback()
+                    rows = len(connection.execute(statement).all())
+                    median_ms = time_query(connection, statement)
+                    plan = "FULL SCAN" if scans else "index"
+                    print(f"  {label:<24} {plan:<10} {rows:>8} rows  {median_ms:8.2f} ms (median of {RUNS})")
+                    for detail in details:
+                        print(f"      {detail}")
+                    if label == "half-open range" and scans:
+                        all_indexed = False
+                print()
+        finally:
+            transaction.rollback()
+    
+    if all_indexed:
+        print("✓ Half-open date filters use an index")
+    else:
+        print("⚠ Half-open date filters still scan accounting_entries; run `alembic upgrade head`")
+    return all_indexed
+
+if __name__ == "__main__":
+    try:
+        seed = 0
+        if "--seed" in sys.argv:
+            seed = int(sys.argv[sys.argv.index("--seed") + 1])
+        success = run_benchmark(seed)
+        sys.exit(0 if success else 1)
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
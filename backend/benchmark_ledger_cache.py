@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark the in-memory ledger cache against the SQL summary paths.
+
+Prints the cache's load time and array memory, then for several project and date
+range slices the median latency of:
+  - ledger cache (ledger_cache.LedgerCache.summed_balances)
+  - daily balances (account_balances.summed_balances, what /summary uses without the cache)
+  - raw ledger GROUP BY over accounting_entries
+and checks that the cache returns the same totals. Works on SQLite and PostgreSQL
+(uses DATABASE_URL); needs NumPy.
+
+Run with --seed N to insert N synthetic entries first. Everything runs inside a
+transaction that is rolled back at the end, so the database is left unchanged.
+"""
+import sys
+import time
+import statistics
+from datetime import timedelta
+from pathlib import Path
+
+# Add current directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import engine
+from models import AccountingEntry
+from account_balances import rebuild_account_balances, summed_balances
+from ledger_cache import LedgerCache, np
+from routers.accounting import transaction_date_filters
+from benchmark_accounting_filters import seed_entries
+
+RUNS = 50
+
+def raw_ledger_totals(db: Session, project_id=None, start_date=None, end_date=None) -> dict:
+    query = db.query(
+        AccountingEntry.account_type, AccountingEntry.entry_type, func.sum(AccountingEntry.amount)
+    ).filter(*transaction_date_filters(start_date, end_date))
+    if project_id:
+        query = query.filter(AccountingEntry.project_id == project_id)
+    rows = query.group_by(AccountingEntry.account_type, AccountingEntry.entry_type).all()
+    return {(account_type, entry_type): float(amount or 0.0) for account_type, entry_type, amount in rows}
+
+def median_ms(function) -> float:
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def same_totals(a: dict, b: dict) -> bool:
+    keys = set(a) | set(b)
+    return all(abs(a.get(key, 0.0) - b.get(key, 0.0)) < 0.005 for key in keys)
+
+def run_benchmark(seed: int = 0) -> bool:
+    """Print memory and latencies. Returns True when the cache matches SQL everywhere."""
+    all_match = True
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        # Commits inside (rebuild_account_balances) only release a savepoint
+        db = Session(bind=connection, join_transaction_mode="create_savepoint")
+        try:
+            if seed:
+                seed_entries(connection, seed)
+                rebuild_account_balances(db)
+    
+            total = db.query(func.count(AccountingEntry.id)).scalar()
+            latest = db.query(func.max(AccountingEntry.transaction_date)).scalar()
+            if latest is None:
+                print("No accounting entries; run with --seed N")
+                return True
+    
+            started = time.perf_counter()
+            cache = LedgerCache()
+            cache.load(db)
+            load_seconds = time.perf_counter() - started
+            print(f"{engine.dialect.name}: {total} entries")
+            print(f"Ledger cache: loaded {cache.row_count} rows in {load_seconds:.2f}s, "
+                  f"{cache.nbytes / 1024 / 1024:.1f} MiB ({cache.nbytes / max(cache.row_count, 1):.0f} bytes/row)\n")
+    
+            end_date = latest.date()
+            start_date = end_date - timedelta(days=30)
+            busiest_project = db.query(AccountingEntry.project_id).filter(
+                AccountingEntry.project_id.isnot(None)
+            ).group_by(AccountingEntry.project_id).order_by(func.count().desc()).limit(1).scalar()
+    
+            scenarios = [("all entries", {}), ("last 30 days", {"start_date": start_date, "end_date": end_date})]
+            if busiest_project is not None:
+                scenarios.append((f"project {busiest_project}", {"project_id": busiest_project}))
+                scenarios.append((f"project {busiest_project} + 30 days",
+                                  {"project_id": busiest_project, "start_date": start_date, "end_date": end_date}))
+    
+            for name, filters in scenarios:
+                cached = cache.summed_balances(**filters)
+                daily = summed_balances(db, **filters)
+                raw = raw_ledger_totals(db, **filters)
+                match = same_totals(cached, daily) and same_totals(cached, raw)
+                all_match = all_match and match
+                print(f"{name}:{'' if match else '  ⚠ TOTALS DIFFER'}")
+                for label, function in (
+                    ("ledger cache", lambda: cache.summed_balances(**filters)),
+                    ("daily balances", lambda: summed_balances(db, **filters)),
+                    ("raw ledger GROUP BY", lambda: raw_ledger_totals(db, **filters))
+                ):
+                    print(f"  {label:<20} {median_ms(function):9.3f} ms (median of {RUNS})")
+                print()
+        finally:
+            db.close()
+            transaction.rollback()
+    
+    if all_match:
+        print("✓ Ledger cache totals match SQL")
+    else:
+        print("⚠ Ledger cache totals differ from SQL")
+    return all_match
+
+if __name__ == "__main__":
+    try:
+        if np is None:
+            print("NumPy is not installed; the ledger cache needs: pip install numpy")
+            sys.exit(1)
+        seed = 0
+        if "--seed" in sys.argv:
+            seed = int(sys.argv[sys.argv.index("--seed") + 1])
+        success = run_benchmark(seed)
+        sys.exit(0 if success else 1)
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Run the double-entry integrity checks (e.g. nightly from cron).
+
+Only accounting entries and source rows added since the last run are checked;
+use --full to recheck the whole ledger. Exits with code 1 when new
+discrepancies were found; they are listed under /api/accounting/discrepancies.
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add current directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import SessionLocal
+from ledger_integrity import run_ledger_integrity_check
+
+def check_ledger_integrity(full: bool = False) -> bool:
+    """Run one check. Returns True when no new discrepancies were found."""
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        run = run_ledger_integrity_check(db, full=full)
+        elapsed = time.perf_counter() - started
+        print(f"Checked {run.entries_checked} new entries up to id {run.last_entry_id} in {elapsed:.2f}s")
+    
+        if not run.discrepancies:
+            print("✓ No new ledger discrepancies")
+            return True
+    
+        print(f"⚠ {run.discrepancies_found} new discrepancy(ies):")
+        for discrepancy in run.discrepancies[:50]:
+            print(f"  - [{discrepancy.check_type}] {discrepancy.details}")
+        if len(run.discrepancies) > 50:
+            print(f"  ... and {len(run.discrepancies) - 50} more")
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    try:
+        success = check_ledger_integrity("--full" in sys.argv)
+        sys.exit(0 if success else 1)
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Post pending accounting outbox events.
+
+The API drains the outbox in a background thread; use this script to catch up
+by hand (e.g. after fixing the cause of failed events) or, with --watch, to run
+the drain as its own service with ACCOUNTING_OUTBOX_WORKER=False on the API.
+Use --retry-failed to give events that reached the attempt limit another try.
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add current directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import SessionLocal
+from models import AccountingOutbox
+from accounting_outbox import MAX_ATTEMPTS, drain_accounting_outbox
+
+WATCH_INTERVAL = 5
+
+def report_failed(db) -> int:
+    failed = db.query(AccountingOutbox).filter(
+        AccountingOutbox.processed_at.is_(None),
+        AccountingOutbox.attempts >= MAX_ATTEMPTS
+    ).order_by(AccountingOutbox.id).all()
+    if failed:
+        print(f"⚠ {len(failed)} event(s) gave up after {MAX_ATTEMPTS} attempts:")
+        for event in failed[:50]:
+            print(f"  - #{event.id} {event.event_type}: {event.last_error}")
+        if len(failed) > 50:
+            print(f"  ... and {len(failed) - 50} more")
+        print("\nFix the cause and run with --retry-failed.")
+    return len(failed)
+
+def drain(retry_failed: bool = False) -> bool:
+    """Drain once. Returns True when no event is stuck."""
+    db = SessionLocal()
+    try:
+        if retry_failed:
+            reset = db.query(AccountingOutbox).filter(
+                AccountingOutbox.processed_at.is_(None),
+                AccountingOutbox.attempts >= MAX_ATTEMPTS
+            ).update({AccountingOutbox.attempts: 0}, synchronize_session=False)
+            db.commit()
+            print(f"Retrying {reset} failed event(s)")
+    
+        handled = drain_accounting_outbox(db)
+        print(f"✓ Processed {handled} outbox event(s)")
+        return report_failed(db) == 0
+    finally:
+        db.close()
+
+def watch() -> None:
+    print(f"Draining the accounting outbox every {WATCH_INTERVAL}s (Ctrl+C to stop)")
+    while True:
+        db = SessionLocal()
+        try:
+            handled = drain_accounting_outbox(db)
+            if handled:
+                print(f"  Processed {handled} event(s)")
+        finally:
+            db.close()
+        time.sleep(WATCH_INTERVAL)
+
+if __name__ == "__main__":
+    try:
+        if "--watch" in sys.argv:
+            watch()
+        success = drain("--retry-failed" in sys.argv)
+        sys.exit(0 if success else 1)
+    except KeyboardInterrupt:
+        sys.exit(0)
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -12,6 +12,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from sqlalchemy.orm import Session
 from database import SessionLocal
 from models import AccountingEntry
+from accounting_periods import closed_period_names
 from sqlalchemy import func
 
 def fix_accounting_entries():
@@ -27,6 +28,12 @@ def fix_accounting_entries():
         print("  2. Re-run the migration with correct entries")
         print("="*60)
         
+        # Re-inserted entries get ids above the closed periods' snapshots and would be counted twice
+        closed_periods = closed_period_names(db)
+        if closed_periods:
+            print(f"\n❌ Cannot recreate entries: accounting periods are closed ({', '.join(closed_periods)})")
+            return
+        
         # Count existing entries
         existing_count = db.query(AccountingEntry).count()
         print(f"\nFound {existing_count} existing accounting entries")
@@ -44,7 +51,7 @@ def fix_accounting_entries():
         # Now re-run the migration
         print("\nRe-running migration with correct entries...")
         from migrate_accounting_data import migrate_accounting_data
-        migrate_accounting_data()
+        migrate_accounting_data(reset=True)
         
         print("\n" + "="*60)
         print("Fix Complete!")
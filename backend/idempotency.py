@@ -0,0 +1,103 @@
+"""
+Idempotent, serialized payment posting.
+
+Payment and voucher endpoints accept an Idempotency-Key header. The first
+request with a key stores its response in idempotency_keys in the same
+transaction as the payment; a retry by the same user with the same key gets
+that response back (with an Idempotent-Replayed: true header) instead of
+posting again. Reusing a key for a different request body or endpoint is a 400.
+
+Balance checks run under a write lock so concurrent workers cannot overpay:
+- PostgreSQL: callers lock the invoice/voucher rows with SELECT ... FOR UPDATE
+- SQLite: lock_for_write() starts the transaction with BEGIN IMMEDIATE, which
+  takes the database write lock before the balance is read
+
+Neither helper commits; callers commit once after store_idempotent_response().
+"""
+import hashlib
+import json
+from typing import Optional
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import IdempotencyKey
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+def lock_for_write(db: Session) -> None:
+    """Serialize writers on SQLite before reading balances. No-op on PostgreSQL."""
+    if db.get_bind().dialect.name != "sqlite":
+        return
+    connection = db.connection()
+    # Only possible before the first write of the transaction; later the lock is already held
+    if not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+def request_hash(payload: BaseModel) -> str:
+    return hashlib.sha256(payload.model_dump_json().encode("utf-8")).hexdigest()
+
+def _find(db: Session, user_id: int, key: str, endpoint: str, payload_hash: str) -> Optional[IdempotencyKey]:
+    record = db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key
+    ).first()
+    if record and (record.endpoint != endpoint or record.request_hash != payload_hash):
+        raise HTTPException(
+            status_code=400,
+            detail=f"{IDEMPOTENCY_KEY_HEADER} has already been used for a different request"
+        )
+    return record
+
+def claim_idempotency_key(
+    db: Session,
+    user_id: int,
+    key: Optional[str],
+    endpoint: str,
+    payload: BaseModel
+) -> Optional[IdempotencyKey]:
+    """Reserve key for this request, or return the earlier request's record.
+    
+    Returns None when no key was sent. A record with response_body set is a
+    retry: return replay_response(record) instead of posting. Otherwise pass
+    the record to store_idempotent_response() before committing.
+    """
+    if key is None:
+        return None
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_KEY_HEADER} must be 1-{MAX_KEY_LENGTH} characters")
+    
+    payload_hash = request_hash(payload)
+    existing = _find(db, user_id, key, endpoint, payload_hash)
+    if existing:
+        return existing
+    
+    record = IdempotencyKey(user_id=user_id, key=key, endpoint=endpoint, request_hash=payload_hash)
+    try:
+        # The unique index makes a concurrent request with the same key wait here until the first commits
+        with db.begin_nested():
+            db.add(record)
+            db.flush()
+    except IntegrityError:
+        existing = _find(db, user_id, key, endpoint, payload_hash)
+        if existing:
+            return existing
+        raise
+    return record
+
+def replay_response(record: IdempotencyKey) -> JSONResponse:
+    return JSONResponse(
+        status_code=record.status_code,
+        content=json.loads(record.response_body),
+        headers={REPLAYED_HEADER: "true"}
+    )
+
+def store_idempotent_response(record: Optional[IdempotencyKey], response: BaseModel, status_code: int = 200) -> None:
+    """Attach the response to the claimed key. Does not commit."""
+    if record is None:
+        return
+    record.status_code = status_code
+    record.response_body = response.model_dump_json()
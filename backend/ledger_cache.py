@@ -0,0 +1,284 @@
+"""
+Optional in-process columnar cache of accounting_entries for /api/accounting/summary.
+
+Enabled with LEDGER_CACHE=True and requires NumPy (pip install numpy). The cache
+holds one array per column: entry id, UTC day (days since 1970-01-01), project
+(0 = no project), account code, entry code and amount. The main block is sorted
+by day, so a date range is two binary searches. A project filter is a vectorized
+mask, and the per-(account_type, entry_type) totals come from a weighted
+np.bincount over the group codes (account code * 2 + entry code).
+
+Keeping it current:
+- main.py loads it in the background at startup
+- create_accounting_entry() registers new rows with track_ledger_entry(); they
+  are appended when the outer transaction commits and dropped on rollback
+- each read first appends rows above the highest id read from the database,
+  which picks up entries written by other processes
+- the cache is reloaded every LEDGER_CACHE_TTL seconds, so deletes and rewrites
+  (fix_accounting_entries.py, backfills) are eventually reflected
+
+summed_balances() returns None while the cache is disabled, loading or older
+than the TTL; callers then use the SQL path in account_balances.
+"""
+import os
+import threading
+import time
+import traceback
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import AccountingEntry
+from account_balances import NO_PROJECT, balance_day, entry_day_column
+
+try:
+    import numpy as np
+except ImportError:  # The cache is optional; the SQL path needs nothing extra
+    np = None
+
+LOAD_BATCH_SIZE = 50000
+MERGE_THRESHOLD = 4096  # Appended rows kept unsorted until there are this many
+ENTRY_CODES = {"debit": 0, "credit": 1}
+ENTRY_TYPES = ["debit", "credit"]
+EPOCH = date(1970, 1, 1)
+
+PENDING_KEY = "ledger_cache_pending"
+COMMITTED_KEY = "ledger_cache_committed"
+
+def ledger_cache_enabled() -> bool:
+    return np is not None and os.getenv("LEDGER_CACHE", "False").lower() == "true"
+
+def _day_number(day: date) -> int:
+    return (day - EPOCH).days
+
+class LedgerCache:
+    """Columnar copy of accounting_entries. Thread-safe; reads never block on a load."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._account_codes: Dict[str, int] = {}
+        self._account_types: List[str] = []
+        self._clear()
+        self.loaded_at: Optional[float] = None
+    
+    def _clear(self) -> None:
+        self.ids = np.empty(0, dtype=np.int64)
+        self.days = np.empty(0, dtype=np.int32)
+        self.projects = np.empty(0, dtype=np.int32)
+        self.groups = np.empty(0, dtype=np.int16)  # account code * 2 + entry code
+        self.amounts = np.empty(0, dtype=np.float64)
+        self._tail: List[tuple] = []  # (id, day, project, group, amount), not yet merged
+        self.synced_id = 0  # Highest id read from the database
+        self._appended_ids = set()  # Ids above synced_id appended from local commits
+    
+    def _group_code(self, account_type: str, entry_type: str) -> int:
+        code = self._account_codes.get(account_type)
+        if code is None:
+            code = len(self._account_types)
+            self._account_codes[account_type] = code
+            self._account_types.append(account_type)
+        return code * 2 + ENTRY_CODES[entry_type]
+    
+    @property
+    def row_count(self) -> int:
+        return len(self.ids) + len(self._tail)
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (self.ids, self.days, self.projects, self.groups, self.amounts))
+    
+    def is_fresh(self, ttl: float) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < ttl
+    
+    def _rows_after(self, db: Session, after_id: int, batch_size: int = LOAD_BATCH_SIZE):
+        query = db.query(
+            AccountingEntry.id,
+            entry_day_column(db),
+            AccountingEntry.project_id,
+            AccountingEntry.account_type,
+            AccountingEntry.entry_type,
+            AccountingEntry.amount
+        ).filter(AccountingEntry.id > after_id).order_by(AccountingEntry.id)
+        return query.execution_options(yield_per=batch_size)
+    
+    def _encode(self, row) -> tuple:
+        entry_id, day, project_id, account_type, entry_type, amount = row
+        if isinstance(day, str):  # SQLite date() returns text
+            day = date.fromisoformat(day)
+        return (entry_id, _day_number(day), project_id or NO_PROJECT,
+                self._group_code(account_type, entry_type), float(amount))
+    
+    def load(self, db: Session) -> None:
+        """Replace the contents with a fresh copy of the table"""
+        started = time.monotonic()
+        with self._lock:
+            self._clear()
+            rows = [self._encode(row) for row in self._rows_after(db, 0)]
+            self._merge(rows)
+            self.synced_id = int(self.ids.max()) if len(self.ids) else 0
+            self.loaded_at = started
+    
+    def _merge(self, rows: List[tuple]) -> None:
+        """Fold rows into the day-sorted main block. Caller holds the lock."""
+        if not rows:
+            return
+        ids, days, projects, groups, amounts = zip(*rows)
+        all_days = np.concatenate([self.days, np.array(days, dtype=np.int32)])
+        order = np.argsort(all_days, kind="stable")
+        self.ids = np.concatenate([self.ids, np.array(ids, dtype=np.int64)])[order]
+        self.days = all_days[order]
+        self.projects = np.concatenate([self.projects, np.array(projects, dtype=np.int32)])[order]
+        self.groups = np.concatenate([self.groups, np.array(groups, dtype=np.int16)])[order]
+        self.amounts = np.concatenate([self.amounts, np.array(amounts, dtype=np.float64)])[order]
+    
+    def _append(self, rows: List[tuple]) -> None:
+        """Caller holds the lock"""
+        self._tail.extend(rows)
+        if len(self._tail) >= MERGE_THRESHOLD:
+            self._merge(self._tail)
+            self._tail = []
+    
+    def append_committed(self, rows: List[tuple]) -> None:
+        """Append (id, transaction_date, project_id, account_type, entry_type, amount) of committed entries"""
+        with self._lock:
+            if self.loaded_at is None:
+                return
+            encoded = []
+            for entry_id, transaction_date, project_id, account_type, entry_type, amount in rows:
+                if entry_id <= self.synced_id or entry_id in self._appended_ids:
+                    continue
+                self._appended_ids.add(entry_id)
+                encoded.append((entry_id, _day_number(balance_day(transaction_date)), project_id or NO_PROJECT,
+                                self._group_code(account_type, entry_type), float(amount)))
+            self._append(encoded)
+    
+    def catch_up(self, db: Session) -> None:
+        """Append entries committed by other processes since the last read"""
+        latest = db.query(func.max(AccountingEntry.id)).scalar() or 0
+        if latest <= self.synced_id:
+            return
+        with self._lock:
+            rows = self._rows_after(db, self.synced_id).all()
+            self._append([self._encode(row) for row in rows if row[0] not in self._appended_ids])
+            self.synced_id = max([self.synced_id] + [row[0] for row in rows])
+            self._appended_ids = {entry_id for entry_id in self._appended_ids if entry_id > self.synced_id}
+    
+    def summed_balances(
+        self,
+        project_id: Optional[int] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Dict[Tuple[str, str], float]:
+        """Same result as account_balances.summed_balances(), from the arrays"""
+        with self._lock:
+            days, projects, groups, amounts = self.days, self.projects, self.groups, self.amounts
+            tail = list(self._tail)
+            account_types = list(self._account_types)
+    
+        # Main block is sorted by day: the range is a slice
+        lo = int(np.searchsorted(days, _day_number(start_date), "left")) if start_date else 0
+        hi = int(np.searchsorted(days, _day_number(end_date), "right")) if end_date else len(days)
+        slice_groups, slice_amounts = groups[lo:hi], amounts[lo:hi]
+        if project_id:
+            mask = projects[lo:hi] == project_id
+            slice_groups, slice_amounts = slice_groups[mask], slice_amounts[mask]
+    
+        if tail:
+            _, tail_days, tail_projects, tail_groups, tail_amounts = (np.array(column) for column in zip(*tail))
+            mask = np.ones(len(tail), dtype=bool)
+            if start_date:
+                mask &= tail_days >= _day_number(start_date)
+            if end_date:
+                mask &= tail_days <= _day_number(end_date)
+            if project_id:
+                mask &= tail_projects == project_id
+            slice_groups = np.concatenate([slice_groups, tail_groups[mask].astype(np.int16)])
+            slice_amounts = np.concatenate([slice_amounts, tail_amounts[mask].astype(np.float64)])
+    
+        # Group codes are small integers: one weighted bincount sums every group in O(n)
+        sums = np.bincount(slice_groups, weights=slice_amounts, minlength=len(account_types) * 2)
+        counts = np.bincount(slice_groups, minlength=len(account_types) * 2)
+        return {
+            (account_types[group // 2], ENTRY_TYPES[group % 2]): float(sums[group])
+            for group in np.flatnonzero(counts).tolist()
+        }
+
+# ========== PROCESS-WIDE CACHE ==========
+
+_cache: Optional[LedgerCache] = None
+_loading = threading.Lock()
+
+def _ttl() -> float:
+    return float(os.getenv("LEDGER_CACHE_TTL", "300"))
+
+def _reload() -> None:
+    if not _loading.acquire(blocking=False):
+        return  # Another thread is already loading
+    db = SessionLocal()
+    try:
+        cache = LedgerCache()
+        cache.load(db)
+        global _cache
+        _cache = cache
+    except Exception as e:
+        print(f"Error loading ledger cache: {e}")
+        traceback.print_exc()
+    finally:
+        db.close()
+        _loading.release()
+
+def load_ledger_cache(background: bool = True) -> None:
+    """(Re)load the process-wide cache; no-op when the cache is disabled"""
+    if not ledger_cache_enabled():
+        return
+    if background:
+        threading.Thread(target=_reload, name="ledger-cache-load", daemon=True).start()
+    else:
+        _reload()
+
+def summed_balances(
+    db: Session,
+    project_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> Optional[Dict[Tuple[str, str], float]]:
+    """Totals from the cache, or None when the caller should use SQL (disabled, loading or stale)"""
+    cache = _cache
+    if not ledger_cache_enabled() or cache is None:
+        return None
+    if not cache.is_fresh(_ttl()):
+        load_ledger_cache()
+        return None
+    cache.catch_up(db)
+    return cache.summed_balances(project_id=project_id, start_date=start_date, end_date=end_date)
+
+def track_ledger_entry(db: Session, entry: AccountingEntry) -> None:
+    """Append entry to the cache once db's outer transaction commits"""
+    if _cache is not None:
+        db.info.setdefault(PENDING_KEY, []).append(entry)
+
+@event.listens_for(Session, "before_commit")
+def _capture_committed_entries(session: Session) -> None:
+    if session.in_nested_transaction() or not session.info.get(PENDING_KEY):
+        return
+    session.flush()
+    # Entries added inside a rolled-back savepoint are no longer in the session
+    session.info[COMMITTED_KEY] = [
+        (entry.id, entry.transaction_date, entry.project_id, entry.account_type, entry.entry_type, entry.amount)
+        for entry in session.info.pop(PENDING_KEY) if entry in session
+    ]
+
+@event.listens_for(Session, "after_commit")
+def _append_committed_entries(session: Session) -> None:
+    if session.in_nested_transaction():
+        return
+    rows = session.info.pop(COMMITTED_KEY, None)
+    if rows and _cache is not None:
+        _cache.append_committed(rows)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_entries(session: Session) -> None:
+    if not session.in_nested_transaction():
+        session.info.pop(PENDING_KEY, None)
+        session.info.pop(COMMITTED_KEY, None)
@@ -0,0 +1,207 @@
+"""
+Incremental double-entry integrity checks for accounting_entries.
+
+Each run starts after the high-water marks of the previous LedgerCheckRun and
+only looks at what was added since, with one grouped query per check. Ids are not
+committed in order (a transaction can commit after a later id is already visible),
+so every run also re-checks the last RECHECK_WINDOW ids behind each mark; rows that
+commit later than that are only caught by a full run.
+
+- unbalanced_reference: debits != credits for a reference_number touched by new entries
+- unpaired_entries: a source row touched by new entries does not have exactly
+  one debit and one credit of its transaction type
+- missing_entries: a new invoice, payment, voucher or developer payment has no
+  entries at all (rows with an in-flight outbox event are left for the next run)
+
+Findings are stored in ledger_discrepancies; one that is still open is not
+recorded again. Used by check_ledger_integrity.py and the accounting admin endpoints.
+"""
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import func, case, or_, exists, select
+from sqlalchemy.orm import Session
+from models import (
+    AccountingEntry, AccountingOutbox, Invoice, Payment, PaymentVoucher, DeveloperPayment,
+    LedgerCheckRun, LedgerDiscrepancy
+)
+from accounting_outbox import MAX_ATTEMPTS
+
+BALANCE_TOLERANCE = 0.01
+# Ids behind the previous high-water marks that are checked again, for rows committed late
+RECHECK_WINDOW = 1000
+
+# transaction_type -> (source model, entry column, high-water mark column on LedgerCheckRun)
+LEDGER_SOURCES = {
+    "invoice_created": (Invoice, "invoice_id", "last_invoice_id"),
+    "invoice_payment": (Payment, "payment_id", "last_payment_id"),
+    "voucher_created": (PaymentVoucher, "voucher_id", "last_voucher_id"),
+    "voucher_payment": (DeveloperPayment, "developer_payment_id", "last_developer_payment_id"),
+}
+
+def _side_sum(entry_type: str, value):
+    return func.coalesce(func.sum(case((AccountingEntry.entry_type == entry_type, value), else_=0)), 0)
+
+def _recheck_from(mark: int) -> int:
+    return max(mark - RECHECK_WINDOW, 0)
+
+def _entry_window(after_id: int, upto_id: int) -> list:
+    return [AccountingEntry.id > after_id, AccountingEntry.id <= upto_id]
+
+def find_unbalanced_references(db: Session, after_id: int, upto_id: int) -> List[LedgerDiscrepancy]:
+    touched = select(AccountingEntry.reference_number).where(
+        *_entry_window(after_id, upto_id),
+        AccountingEntry.reference_number.isnot(None)
+    )
+    debit_total = _side_sum("debit", AccountingEntry.amount)
+    credit_total = _side_sum("credit", AccountingEntry.amount)
+    rows = db.query(
+        AccountingEntry.transaction_type,
+        AccountingEntry.reference_number,
+        debit_total,
+        credit_total,
+        func.count(AccountingEntry.id)
+    ).filter(
+        AccountingEntry.reference_number.in_(touched)
+    ).group_by(
+        AccountingEntry.transaction_type, AccountingEntry.reference_number
+    ).having(func.abs(debit_total - credit_total) > BALANCE_TOLERANCE).all()
+    
+    return [
+        LedgerDiscrepancy(
+            check_type="unbalanced_reference",
+            transaction_type=transaction_type,
+            reference_number=reference_number,
+            debit_total=float(debits),
+            credit_total=float(credits),
+            entry_count=count,
+            details=f"{reference_number}: debits {float(debits):.2f} != credits {float(credits):.2f}"
+        )
+        for transaction_type, reference_number, debits, credits, count in rows
+    ]
+
+def find_unpaired_entries(db: Session, after_id: int, upto_id: int) -> List[LedgerDiscrepancy]:
+    findings = []
+    for transaction_type, (_, column_name, _) in LEDGER_SOURCES.items():
+        source_column = getattr(AccountingEntry, column_name)
+        touched = select(source_column).where(
+            *_entry_window(after_id, upto_id),
+            AccountingEntry.transaction_type == transaction_type
+        )
+        debit_count = _side_sum("debit", 1)
+        credit_count = _side_sum("credit", 1)
+        rows = db.query(
+            source_column,
+            func.count(AccountingEntry.id),
+            debit_count,
+            credit_count,
+            _side_sum("debit", AccountingEntry.amount),
+            _side_sum("credit", AccountingEntry.amount)
+        ).filter(
+            AccountingEntry.transaction_type == transaction_type,
+            source_column.in_(touched)
+        ).group_by(source_column).having(or_(debit_count != 1, credit_count != 1)).all()
+    
+        for source_id, count, debits, credits, debit_total, credit_total in rows:
+            findings.append(LedgerDiscrepancy(
+                check_type="unpaired_entries",
+                transaction_type=transaction_type,
+                source_id=source_id,
+                debit_total=float(debit_total),
+                credit_total=float(credit_total),
+                entry_count=count,
+                details=f"{column_name} {source_id}: {debits} debit(s) and {credits} credit(s), expected one of each"
+            ))
+    return findings
+
+def find_missing_entries(db: Session, run: LedgerCheckRun, previous: Optional[LedgerCheckRun]) -> List[LedgerDiscrepancy]:
+    """Check new source rows and advance the run's source high-water marks"""
+    findings = []
+    for transaction_type, (model, column_name, mark_name) in LEDGER_SOURCES.items():
+        mark = getattr(previous, mark_name) if previous else 0
+        upto_id = db.query(func.max(model.id)).scalar() or 0
+        # Rows still waiting in the outbox are not missing yet; stop before the first one
+        first_pending = db.query(func.min(getattr(AccountingOutbox, column_name))).filter(
+            AccountingOutbox.event_type == transaction_type,
+            AccountingOutbox.processed_at.is_(None),
+            AccountingOutbox.attempts < MAX_ATTEMPTS
+        ).scalar()
+        if first_pending is not None:
+            upto_id = min(upto_id, first_pending - 1)
+        setattr(run, mark_name, max(upto_id, mark))
+        after_id = _recheck_from(mark)
+        if upto_id <= after_id:
+            continue
+    
+        posted = exists().where(
+            getattr(AccountingEntry, column_name) == model.id,
+            AccountingEntry.transaction_type == transaction_type
+        )
+        missing_ids = db.query(model.id).filter(
+            model.id > after_id,
+            model.id <= upto_id,
+            ~posted
+        ).order_by(model.id).all()
+        findings.extend(
+            LedgerDiscrepancy(
+                check_type="missing_entries",
+                transaction_type=transaction_type,
+                source_id=source_id,
+                entry_count=0,
+                details=f"{model.__tablename__} {source_id} has no {transaction_type} entries"
+            )
+            for source_id, in missing_ids
+        )
+    return findings
+
+def _discrepancy_key(discrepancy) -> tuple:
+    return (discrepancy.check_type, discrepancy.transaction_type, discrepancy.reference_number, discrepancy.source_id)
+
+def run_ledger_integrity_check(db: Session, full: bool = False) -> LedgerCheckRun:
+    """Check everything added since the last run (or the whole ledger with full=True) and commit.
+    
+    Returns the LedgerCheckRun; discrepancies_found counts newly recorded findings.
+    """
+    previous = None
+    if not full:
+        previous = db.query(LedgerCheckRun).filter(
+            LedgerCheckRun.finished_at.isnot(None)
+        ).order_by(LedgerCheckRun.id.desc()).first()
+    
+    previous_entry_id = previous.last_entry_id if previous else 0
+    upto_entry_id = max(db.query(func.max(AccountingEntry.id)).scalar() or 0, previous_entry_id)
+    after_entry_id = _recheck_from(previous_entry_id)
+    run = LedgerCheckRun(last_entry_id=upto_entry_id)
+    db.add(run)
+    db.flush()
+    
+    findings = []
+    if upto_entry_id > after_entry_id:
+        run.entries_checked = db.query(func.count(AccountingEntry.id)).filter(
+            *_entry_window(after_entry_id, upto_entry_id)
+        ).scalar()
+        findings.extend(find_unbalanced_references(db, after_entry_id, upto_entry_id))
+        findings.extend(find_unpaired_entries(db, after_entry_id, upto_entry_id))
+    else:
+        run.entries_checked = 0
+    findings.extend(find_missing_entries(db, run, previous))
+    
+    # Do not duplicate findings that are still open from an earlier run
+    open_keys = {
+        _discrepancy_key(row)
+        for row in db.query(
+            LedgerDiscrepancy.check_type,
+            LedgerDiscrepancy.transaction_type,
+            LedgerDiscrepancy.reference_number,
+            LedgerDiscrepancy.source_id
+        ).filter(LedgerDiscrepancy.resolved_at.is_(None)).all()
+    }
+    new_findings = [finding for finding in findings if _discrepancy_key(finding) not in open_keys]
+    for finding in new_findings:
+        finding.run_id = run.id
+    db.add_all(new_findings)
+    
+    run.discrepancies_found = len(new_findings)
+    run.finished_at = datetime.utcnow()
+    db.commit()
+    db.refresh(run)
+    return run
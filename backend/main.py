@@ -9,6 +9,8 @@ import os
 from database import engine, get_db
 from models import Base
 from routers import auth, projects, developers, tasks, timesheets, payments, project_sources, developer_payments, ai, accounting
+from accounting_outbox import start_accounting_outbox_worker, stop_accounting_outbox_worker
+from ledger_cache import load_ledger_cache
 
 # Database migrations are handled by Alembic
 # Run migrations with: alembic upgrade head
@@ -54,6 +56,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Keyset pagination cursor for list endpoints
 )
 
 # Include routers
@@ -68,6 +71,21 @@ app.include_router(developer_payments.router, prefix="/api/developer-payments",
 app.include_router(ai.router, prefix="/api/ai", tags=["AI"])
 app.include_router(accounting.router, prefix="/api/accounting", tags=["Accounting"])
 
+# Post queued accounting entries in the background (see accounting_outbox.py)
+# Set ACCOUNTING_OUTBOX_WORKER=False when drain_accounting_outbox.py --watch runs separately
+run_outbox_worker = os.getenv("ACCOUNTING_OUTBOX_WORKER", "True").lower() == "true"
+
+@app.on_event("startup")
+def start_background_workers():
+    if run_outbox_worker:
+        start_accounting_outbox_worker()
+    # No-op unless LEDGER_CACHE=True; /summary uses SQL until the load finishes
+    load_ledger_cache()
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    stop_accounting_outbox_worker()
+
 @app.get("/")
 def root():
     return {"message": "WorkHub API is running"}
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, Enum as SQLEnum, Numeric
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Boolean, Text, Enum as SQLEnum, Numeric, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base, DATABASE_URL
@@ -104,6 +104,9 @@ class Project(Base):
 
 class DeveloperProject(Base):
     __tablename__ = "developer_projects"
+    __table_args__ = (
+        Index("ix_developer_projects_project_id_developer_id", "project_id", "developer_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     developer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -119,8 +122,8 @@ class TaskDeveloper(Base):
     __tablename__ = "task_developers"
     
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
-    developer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)
+    developer_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -131,7 +134,7 @@ class Task(Base):
     __tablename__ = "tasks"
     
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
     title = Column(String, nullable=False)
     description = Column(Text)
     status = Column(String, default="todo")  # todo, in_progress, testing, completed
@@ -149,9 +152,30 @@ class Task(Base):
     invoice_tasks = relationship("InvoiceTask", back_populates="task", cascade="all, delete-orphan")
     developer_payment_tasks = relationship("DeveloperPaymentTask", back_populates="task", cascade="all, delete-orphan")
     voucher_tasks = relationship("PaymentVoucherTask", back_populates="task", cascade="all, delete-orphan")
+    rollup = relationship("TaskRollup", back_populates="task", uselist=False, cascade="all, delete-orphan")
+
+class TaskRollup(Base):
+    """Precomputed per-task totals, maintained in the same transaction as the rows they summarize"""
+    __tablename__ = "task_rollups"
+    
+    task_id = Column(Integer, ForeignKey("tasks.id"), primary_key=True)
+    approved_hours = Column(Float, nullable=False, default=0.0)  # Sum of approved timesheet hours
+    pending_hours = Column(Float, nullable=False, default=0.0)  # Sum of pending timesheet hours
+    timesheet_count = Column(Integer, nullable=False, default=0)  # Number of timesheets (any status)
+    billed_invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=True)  # First invoice the task is linked to
+    voucher_paid_amount = Column(Float, nullable=False, default=0.0)  # Sum of developer payment splits for the task
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    task = relationship("Task", back_populates="rollup")
 
 class Timesheet(Base):
     __tablename__ = "timesheets"
+    __table_args__ = (
+        Index("ix_timesheets_task_id_status", "task_id", "status"),
+        Index("ix_timesheets_project_id_date", "project_id", "date"),
+        Index("ix_timesheets_user_id_date", "user_id", "date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -173,6 +197,9 @@ class Timesheet(Base):
 class Invoice(Base):
     """Invoice created by Project Lead - can have multiple payments"""
     __tablename__ = "invoices"
+    __table_args__ = (
+        Index("ix_invoices_invoice_date_id", "invoice_date", "id"),  # Newest-first invoice listing
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
@@ -194,7 +221,7 @@ class Payment(Base):
     __tablename__ = "payments"
     
     id = Column(Integer, primary_key=True, index=True)
-    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=False)
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=False, index=True)
     amount = Column(Float, nullable=False)  # Payment amount
     payment_date = Column(DateTime(timezone=True), nullable=False)
     evidence_file = Column(String, nullable=True)  # File path for payment proof
@@ -211,8 +238,8 @@ class InvoiceTask(Base):
     __tablename__ = "invoice_tasks"
     
     id = Column(Integer, primary_key=True, index=True)
-    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=False)
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=False, index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -222,6 +249,10 @@ class InvoiceTask(Base):
 class PaymentVoucher(Base):
     """Payment Voucher created by Project Lead for developer payments (similar to invoice but for outgoing payments)"""
     __tablename__ = "payment_vouchers"
+    __table_args__ = (
+        Index("ix_payment_vouchers_voucher_date_id", "voucher_date", "id"),  # Newest-first voucher listing
+        Index("ix_payment_vouchers_project_id_status", "project_id", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     developer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -233,7 +264,9 @@ class PaymentVoucher(Base):
     date_range_end = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)  # Project lead who created the voucher
+    # Maintained by refresh_voucher_totals() in the same transaction as the payments
     status = create_enum_column(PaymentStatus, default=PaymentStatus.PENDING)  # pending, paid, partial
+    total_paid = Column(Float, nullable=False, default=0.0, server_default="0")  # Sum of developer payments
     
     # Relationships
     developer = relationship("User", foreign_keys=[developer_id])
@@ -247,8 +280,8 @@ class PaymentVoucherTask(Base):
     __tablename__ = "payment_voucher_tasks"
     
     id = Column(Integer, primary_key=True, index=True)
-    voucher_id = Column(Integer, ForeignKey("payment_vouchers.id"), nullable=False)
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    voucher_id = Column(Integer, ForeignKey("payment_vouchers.id"), nullable=False, index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)
     productivity_hours = Column(Float, nullable=False)
     hourly_rate = Column(Float, nullable=False)
     amount = Column(Float, nullable=False)  # productivity_hours * hourly_rate
@@ -263,7 +296,7 @@ class DeveloperPayment(Base):
     __tablename__ = "developer_payments"
     
     id = Column(Integer, primary_key=True, index=True)
-    voucher_id = Column(Integer, ForeignKey("payment_vouchers.id"), nullable=True)  # Nullable for backward compatibility with existing payments
+    voucher_id = Column(Integer, ForeignKey("payment_vouchers.id"), nullable=True, index=True)  # Nullable for backward compatibility with existing payments
     developer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     payment_amount = Column(Float, nullable=False)
@@ -289,16 +322,19 @@ class TransactionType(str, enum.Enum):
 class AccountingEntry(Base):
     """Double-entry accounting ledger entries"""
     __tablename__ = "accounting_entries"
+    __table_args__ = (
+        Index("ix_accounting_entries_project_id_transaction_date", "project_id", "transaction_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    transaction_date = Column(DateTime(timezone=True), nullable=False)
+    transaction_date = Column(DateTime(timezone=True), nullable=False, index=True)
     transaction_type = Column(String, nullable=False)  # invoice_created, invoice_payment, voucher_created, voucher_payment
     
     # Reference to source transaction
-    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=True)
-    payment_id = Column(Integer, ForeignKey("payments.id"), nullable=True)
-    voucher_id = Column(Integer, ForeignKey("payment_vouchers.id"), nullable=True)
-    developer_payment_id = Column(Integer, ForeignKey("developer_payments.id"), nullable=True)
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=True, index=True)
+    payment_id = Column(Integer, ForeignKey("payments.id"), nullable=True, index=True)
+    voucher_id = Column(Integer, ForeignKey("payment_vouchers.id"), nullable=True, index=True)
+    developer_payment_id = Column(Integer, ForeignKey("developer_payments.id"), nullable=True, index=True)
     
     # Account information
     account_type = Column(String, nullable=False)  # accounts_receivable, accounts_payable, cash, bank, revenue, expense
@@ -307,7 +343,7 @@ class AccountingEntry(Base):
     
     # Description and reference
     description = Column(Text, nullable=True)
-    reference_number = Column(String, nullable=True)  # Invoice #, Voucher #, etc.
+    reference_number = Column(String, nullable=True, index=True)  # Invoice #, Voucher #, etc.
     
     # Project and user context
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
@@ -322,13 +358,151 @@ class AccountingEntry(Base):
     project = relationship("Project", foreign_keys=[project_id])
     created_by_user = relationship("User", foreign_keys=[created_by])
 
+class AccountingOutbox(Base):
+    """Pending ledger postings, written in the same transaction as the business row.
+    
+    A background worker (accounting_outbox.py) drains the table and posts the
+    double-entry rows, so a request commits once and no posting is lost.
+    """
+    __tablename__ = "accounting_outbox"
+    __table_args__ = (
+        Index("ix_accounting_outbox_processed_at_id", "processed_at", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String, nullable=False)  # invoice_created, invoice_payment, voucher_created, voucher_payment
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=True)
+    payment_id = Column(Integer, ForeignKey("payments.id"), nullable=True)
+    voucher_id = Column(Integer, ForeignKey("payment_vouchers.id"), nullable=True)
+    developer_payment_id = Column(Integer, ForeignKey("developer_payments.id"), nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)  # Set once the entries are posted
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+
+class IdempotencyKey(Base):
+    """Stored response of a payment request sent with an Idempotency-Key header.
+    
+    A retry with the same user and key gets the stored response instead of
+    creating the payment again (see idempotency.py).
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("ix_idempotency_keys_user_id_key", "user_id", "key", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    key = Column(String(255), nullable=False)
+    endpoint = Column(String, nullable=False)  # Keys cannot be reused across endpoints
+    request_hash = Column(String(64), nullable=False)  # SHA-256 of the request body
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)  # JSON, set in the same transaction as the payment
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class LedgerCheckRun(Base):
+    """One run of the incremental double-entry checker (ledger_integrity.py).
+    
+    The last_*_id columns are the high-water marks: the next run checks accounting
+    entries and source rows with higher ids, plus a recheck window just below them.
+    """
+    __tablename__ = "ledger_check_runs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    last_entry_id = Column(Integer, nullable=False, default=0)
+    last_invoice_id = Column(Integer, nullable=False, default=0)
+    last_payment_id = Column(Integer, nullable=False, default=0)
+    last_voucher_id = Column(Integer, nullable=False, default=0)
+    last_developer_payment_id = Column(Integer, nullable=False, default=0)
+    entries_checked = Column(Integer, nullable=False, default=0)
+    discrepancies_found = Column(Integer, nullable=False, default=0)
+    
+    discrepancies = relationship("LedgerDiscrepancy", back_populates="run")
+
+class LedgerDiscrepancy(Base):
+    """A double-entry integrity problem found by a ledger check run"""
+    __tablename__ = "ledger_discrepancies"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey("ledger_check_runs.id"), nullable=False, index=True)
+    check_type = Column(String, nullable=False)  # unbalanced_reference, unpaired_entries, missing_entries
+    transaction_type = Column(String, nullable=True)
+    reference_number = Column(String, nullable=True)
+    source_id = Column(Integer, nullable=True)  # Invoice, payment, voucher or developer payment id
+    debit_total = Column(Float, nullable=True)
+    credit_total = Column(Float, nullable=True)
+    entry_count = Column(Integer, nullable=True)
+    details = Column(Text, nullable=True)
+    detected_at = Column(DateTime(timezone=True), server_default=func.now())
+    resolved_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    
+    run = relationship("LedgerCheckRun", back_populates="discrepancies")
+
+class AccountingPeriod(Base):
+    """A closed month. Its closing balances are written once and never changed."""
+    __tablename__ = "accounting_periods"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    period = Column(String, nullable=False, unique=True)  # YYYY-MM
+    period_start = Column(Date, nullable=False)
+    period_end = Column(Date, nullable=False, index=True)  # Last day of the month (UTC)
+    last_entry_id = Column(Integer, nullable=False)  # Highest accounting entry id included in the snapshot
+    closed_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    closed_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    closing_balances = relationship("PeriodClosingBalance", back_populates="accounting_period")
+
+class PeriodClosingBalance(Base):
+    """Cumulative debits and credits per project and account as of a period's last day"""
+    __tablename__ = "period_closing_balances"
+    
+    period_id = Column(Integer, ForeignKey("accounting_periods.id"), primary_key=True)
+    project_id = Column(Integer, primary_key=True)  # 0 for entries without a project
+    account_type = Column(String, primary_key=True)
+    debit_total = Column(Float, nullable=False, default=0.0)
+    credit_total = Column(Float, nullable=False, default=0.0)
+    
+    accounting_period = relationship("AccountingPeriod", back_populates="closing_balances")
+
+class AccountBalanceDaily(Base):
+    """Accounting entry amounts summed per UTC day, project, account and side.
+    
+    Maintained by create_accounting_entry() in the same transaction as the entry,
+    so summaries over a date range read one row per day instead of every entry.
+    """
+    __tablename__ = "account_balances_daily"
+    __table_args__ = (
+        Index("ix_account_balances_daily_project_id_balance_date", "project_id", "balance_date"),
+    )
+    
+    balance_date = Column(Date, primary_key=True)
+    project_id = Column(Integer, primary_key=True, default=0)  # 0 for entries without a project
+    account_type = Column(String, primary_key=True)
+    entry_type = Column(String, primary_key=True)  # debit or credit
+    amount = Column(Float, nullable=False, default=0.0)
+    entry_count = Column(Integer, nullable=False, default=0)
+
+class AccountingBackfillProgress(Base):
+    """Last source id processed per accounting_backfill.py step, so an interrupted backfill resumes.
+    
+    Rows only exist while a backfill is running; a completed run deletes them.
+    """
+    __tablename__ = "accounting_backfill_progress"
+    
+    step = Column(String(64), primary_key=True)  # invoices, invoice_payments, vouchers, developer_payments
+    last_id = Column(Integer, nullable=False)
+    rows_inserted = Column(Integer, nullable=False)
+
 class DeveloperPaymentTask(Base):
     """Link tasks to developer payments"""
     __tablename__ = "developer_payment_tasks"
     
     id = Column(Integer, primary_key=True, index=True)
-    payment_id = Column(Integer, ForeignKey("developer_payments.id"), nullable=False)
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    payment_id = Column(Integer, ForeignKey("developer_payments.id"), nullable=False, index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)
     productivity_hours = Column(Float, nullable=False)  # Hours paid for this task
     hourly_rate = Column(Float, nullable=False)  # Rate at time of payment
     amount = Column(Float, nullable=False)  # productivity_hours * hourly_rate
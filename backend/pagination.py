@@ -0,0 +1,63 @@
+"""
+Keyset (cursor) pagination helpers shared by the list endpoints.
+
+A cursor is an opaque, URL-safe token holding the sort key values of the last
+row on a page. The next page is fetched with a WHERE clause on those values
+instead of an OFFSET, so every page costs the same however deep it is.
+The token for the following page is returned in the X-Next-Cursor header.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Sequence
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 1000
+
+def _encode_value(value: Any):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+def _decode_value(value: Any):
+    if isinstance(value, dict) and len(value) == 1:
+        if isinstance(value.get("dt"), str):
+            return datetime.fromisoformat(value["dt"])
+        if isinstance(value.get("d"), str):
+            return date.fromisoformat(value["d"])
+    # Anything else would only fail later when bound into the keyset comparison
+    if value is not None and not isinstance(value, (str, int, float)):
+        raise ValueError("unexpected cursor value")
+    return value
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort key values of the last row on a page"""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, expected_length: int) -> List[Any]:
+    """Decode a cursor produced by encode_cursor(), raising 400 if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        if not isinstance(values, list) or len(values) != expected_length:
+            raise ValueError("unexpected cursor shape")
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_after(columns: Sequence[Any], values: Sequence[Any], descending: bool = False):
+    """Build a row-value comparison '(columns) > (values)' (or '<' when descending).
+    
+    Expanded into OR/AND form so it works on both SQLite and PostgreSQL.
+    """
+    clauses = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Rebuild the account_balances_daily table from accounting_entries.
+
+Run with --check to only report days whose stored balance has drifted from the
+ledger (exit code 1 if any have). Without it the whole table is recomputed with a
+single INSERT ... SELECT.
+"""
+import sys
+from pathlib import Path
+
+# Add current directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import SessionLocal
+from account_balances import find_drifted_account_balances, rebuild_account_balances
+
+def check_account_balances() -> bool:
+    """Report drifted daily balances. Returns True when there are none."""
+    db = SessionLocal()
+    try:
+        drifted = find_drifted_account_balances(db)
+        if not drifted:
+            print("✓ All daily account balances match the ledger")
+            return True
+    
+        print(f"⚠ {len(drifted)} daily balance row(s) have drifted:")
+        for balance_date, project_id, account_type, entry_type in drifted[:50]:
+            print(f"  - {balance_date} project {project_id} {account_type} {entry_type}")
+        if len(drifted) > 50:
+            print(f"  ... and {len(drifted) - 50} more")
+        print("\nRun without --check to rebuild the table.")
+        return False
+    finally:
+        db.close()
+
+def rebuild() -> bool:
+    db = SessionLocal()
+    try:
+        rows = rebuild_account_balances(db)
+        print(f"✓ Rebuilt account_balances_daily ({rows} rows)")
+        return True
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    try:
+        success = check_account_balances() if "--check" in sys.argv else rebuild()
+        sys.exit(0 if success else 1)
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
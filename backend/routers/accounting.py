@@ -1,14 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
-from datetime import datetime, date
+from sqlalchemy import func, case, not_, select
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, date, timedelta
 from database import get_db
 from models import (
-    User, AccountingEntry, Invoice, Payment, PaymentVoucher, DeveloperPayment, Project
+    User, AccountingEntry, Invoice, Payment, PaymentVoucher, DeveloperPayment, Project, LedgerDiscrepancy,
+    AccountingPeriod
+)
+from schemas import (
+    AccountingEntryResponse, AccountingSummary, LedgerEntryResponse, LedgerDiscrepancyResponse, LedgerCheckRunResponse,
+    AccountingPeriodResponse, TrialBalance, TrialBalanceLine
 )
-from schemas import AccountingEntryResponse, AccountingSummary
 from auth import get_current_active_user, require_role
+from account_balances import NO_PROJECT, add_to_daily_balance, summed_balances, to_utc, utc_day_start
+from ledger_cache import track_ledger_entry, summed_balances as cached_summed_balances
+from ledger_integrity import run_ledger_integrity_check
+from accounting_periods import parse_period, accumulated_balances, close_accounting_period
+from pagination import NEXT_CURSOR_HEADER, MAX_PAGE_SIZE, encode_cursor, decode_cursor, keyset_after
 
 # Import accounting functions to avoid circular imports
 # These will be imported by payments and developer_payments routers
@@ -31,7 +41,13 @@ def create_accounting_entry(
     project_id: Optional[int] = None,
     created_by: int = None
 ):
-    """Helper function to create accounting entries following double-entry bookkeeping"""
+    """Helper function to create accounting entries following double-entry bookkeeping.
+    
+    Also adds the amount to account_balances_daily in the same transaction, and to
+    the in-memory ledger cache (if enabled) once that transaction commits.
+    """
+    # Stored and bucketed as UTC so rebuild_account_balances() puts it on the same day
+    transaction_date = to_utc(transaction_date)
     entry = AccountingEntry(
         transaction_date=transaction_date,
         transaction_type=transaction_type,
@@ -48,6 +64,8 @@ def create_accounting_entry(
         created_by=created_by
     )
     db.add(entry)
+    add_to_daily_balance(db, transaction_date, project_id, account_type, entry_type, amount)
+    track_ledger_entry(db, entry)
     return entry
 
 def record_invoice_created(db: Session, invoice: Invoice, created_by: int):
@@ -196,6 +214,69 @@ def record_voucher_payment(db: Session, dev_payment: DeveloperPayment, voucher:
         created_by=created_by
     )
 
+def build_accounting_summary(totals: Dict[Tuple[str, str], float]) -> AccountingSummary:
+    """Derive the summary figures from amounts summed per (account_type, entry_type)"""
+    def total(account_type: Optional[str] = None, entry_type: Optional[str] = None) -> float:
+        return sum(
+            amount for (account, entry), amount in totals.items()
+            if (account_type is None or account == account_type) and (entry_type is None or entry == entry_type)
+        )
+    
+    # Calculate totals
+    total_debits = total(entry_type="debit")
+    total_credits = total(entry_type="credit")
+    balance = total_credits - total_debits
+    
+    # Calculate account balances
+    # Accounts Receivable: Debit increases (money owed to us), Credit decreases (payments received)
+    # Balance = Debits - Credits (positive = money still owed to us)
+    accounts_receivable = total("accounts_receivable", "debit") - total("accounts_receivable", "credit")
+    
+    # Accounts Payable: Credit increases (money we owe), Debit decreases (payments made)
+    # Balance = Credits - Debits (positive = money we still owe)
+    accounts_payable = total("accounts_payable", "credit") - total("accounts_payable", "debit")
+    
+    # Cash In: Money received (Debit to Cash increases the asset)
+    cash_in = total("cash", "debit")
+    
+    # Cash Out: Money paid out (Credit to Cash decreases the asset)
+    cash_out = total("cash", "credit")
+    
+    # Revenue: Total revenue earned (Credit to Revenue increases revenue)
+    total_revenue = total("revenue", "credit")
+    
+    # Expenses: Total expenses incurred (Debit to Expense increases expense)
+    total_expenses = total("expense", "debit")
+    
+    # Profit/Loss = Revenue - Expenses
+    profit_loss = total_revenue - total_expenses
+    
+    return AccountingSummary(
+        total_debits=total_debits,
+        total_credits=total_credits,
+        balance=balance,
+        accounts_receivable=accounts_receivable,
+        accounts_payable=accounts_payable,
+        cash_in=cash_in,
+        cash_out=cash_out,
+        total_revenue=total_revenue,
+        total_expenses=total_expenses,
+        profit_loss=profit_loss
+    )
+
+def transaction_date_filters(start_date: Optional[date], end_date: Optional[date]) -> list:
+    """Half-open timestamp bounds for an inclusive range of UTC calendar days.
+    
+    Compares the bare transaction_date column (rather than date(transaction_date))
+    so the index on it can be used. Days are UTC, matching account_balances_daily.
+    """
+    conditions = []
+    if start_date:
+        conditions.append(AccountingEntry.transaction_date >= utc_day_start(start_date))
+    if end_date:
+        conditions.append(AccountingEntry.transaction_date < utc_day_start(end_date + timedelta(days=1)))
+    return conditions
+
 @router.get("/entries", response_model=List[AccountingEntryResponse])
 def get_accounting_entries(
     project_id: Optional[int] = None,
@@ -220,10 +301,7 @@ def get_accounting_entries(
         query = query.filter(AccountingEntry.transaction_type == transaction_type)
     if account_type:
         query = query.filter(AccountingEntry.account_type == account_type)
-    if start_date:
-        query = query.filter(func.date(AccountingEntry.transaction_date) >= start_date)
-    if end_date:
-        query = query.filter(func.date(AccountingEntry.transaction_date) <= end_date)
+    query = query.filter(*transaction_date_filters(start_date, end_date))
     
     # Order by date (newest first)
     entries = query.order_by(AccountingEntry.transaction_date.desc()).all()
@@ -243,97 +321,223 @@ def get_accounting_summary(
     if current_user.role.value not in ["super_admin", "project_lead"]:
         raise HTTPException(status_code=403, detail="Not authorized to view accounting summary")
     
-    query = db.query(AccountingEntry)
+    # In-memory columnar cache when enabled, else the per-day aggregates instead of every ledger line
+    totals = cached_summed_balances(db, project_id=project_id, start_date=start_date, end_date=end_date)
+    if totals is None:
+        totals = summed_balances(db, project_id=project_id, start_date=start_date, end_date=end_date)
     
-    if project_id:
-        query = query.filter(AccountingEntry.project_id == project_id)
-    if start_date:
-        query = query.filter(func.date(AccountingEntry.transaction_date) >= start_date)
-    if end_date:
-        query = query.filter(func.date(AccountingEntry.transaction_date) <= end_date)
+    return build_accounting_summary(totals)
+
+# Accounts whose balance grows with credits; all others (and the unfiltered ledger) grow with debits
+CREDIT_NORMAL_ACCOUNTS = {"accounts_payable", "revenue"}
+LEDGER_ORDERS = ("asc", "desc")
+
+@router.get("/ledger", response_model=List[LedgerEntryResponse])
+def get_ledger(
+    response: Response,
+    project_id: Optional[int] = None,
+    account_type: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    order: str = "asc",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get the accounting ledger ordered by (transaction_date, id) with running balances.
     
-    entries = query.all()
+    running_balance is computed in the database with SUM() OVER the page, seeded with
+    the sum of the matching entries before the page, so any page can be fetched
+    without reading the ones before it. It is debits - credits, or credits - debits
+    when account_type is a credit-normal account (accounts_payable, revenue).
+    Pass limit to paginate; the cursor for the next page is returned in X-Next-Cursor.
+    """
+    # Only super admins and project leads can view accounting
+    if current_user.role.value not in ["super_admin", "project_lead"]:
+        raise HTTPException(status_code=403, detail="Not authorized to view accounting entries")
     
-    # Calculate totals
-    total_debits = sum(e.amount for e in entries if e.entry_type == "debit")
-    total_credits = sum(e.amount for e in entries if e.entry_type == "credit")
-    balance = total_credits - total_debits
+    if order not in LEDGER_ORDERS:
+        raise HTTPException(status_code=400, detail=f"Invalid order. Must be one of: {list(LEDGER_ORDERS)}")
+    descending = order == "desc"
     
-    # Calculate account balances
-    # Accounts Receivable: Debit increases (money owed to us), Credit decreases (payments received)
-    # Balance = Debits - Credits (positive = money still owed to us)
-    accounts_receivable = sum(
-        e.amount for e in entries 
-        if e.account_type == "accounts_receivable" and e.entry_type == "debit"
-    ) - sum(
-        e.amount for e in entries 
-        if e.account_type == "accounts_receivable" and e.entry_type == "credit"
-    )
+    conditions = transaction_date_filters(start_date, end_date)
+    if project_id:
+        conditions.append(AccountingEntry.project_id == project_id)
+    if account_type:
+        conditions.append(AccountingEntry.account_type == account_type)
     
-    # Accounts Payable: Credit increases (money we owe), Debit decreases (payments made)
-    # Balance = Credits - Debits (positive = money we still owe)
-    accounts_payable = sum(
-        e.amount for e in entries 
-        if e.account_type == "accounts_payable" and e.entry_type == "credit"
-    ) - sum(
-        e.amount for e in entries 
-        if e.account_type == "accounts_payable" and e.entry_type == "debit"
+    increase_side = "credit" if account_type in CREDIT_NORMAL_ACCOUNTS else "debit"
+    signed_amount = case(
+        (AccountingEntry.entry_type == increase_side, AccountingEntry.amount),
+        else_=-AccountingEntry.amount
     )
+    sort_columns = [AccountingEntry.transaction_date, AccountingEntry.id]
     
-    # Cash In: Money received (Debit to Cash increases the asset)
-    cash_in = sum(
-        e.amount for e in entries 
-        if e.account_type == "cash" and e.entry_type == "debit"
-    )
+    page_conditions = list(conditions)
+    # Sum of the matching entries on the far side of the cursor
+    boundary_balance = 0.0
+    if cursor:
+        cursor_values = decode_cursor(cursor, 2)
+        page_conditions.append(keyset_after(sort_columns, cursor_values, descending=descending))
+        if descending:
+            # Entries before the cursor: the page and everything older than it
+            boundary = keyset_after(sort_columns, cursor_values, descending=True)
+        else:
+            # Entries up to and including the cursor row
+            boundary = not_(keyset_after(sort_columns, cursor_values))
+        boundary_balance = db.query(func.sum(signed_amount)).filter(*conditions, boundary).scalar() or 0.0
+    elif descending:
+        boundary_balance = db.query(func.sum(signed_amount)).filter(*conditions).scalar() or 0.0
     
-    # Cash Out: Money paid out (Credit to Cash decreases the asset)
-    cash_out = sum(
-        e.amount for e in entries 
-        if e.account_type == "cash" and e.entry_type == "credit"
-    )
+    page_order = [column.desc() if descending else column for column in sort_columns]
+    page_filter = page_conditions
+    has_more = False
+    if limit:
+        # One extra id tells whether there is a next page; it stays out of the window sums
+        page_ids = db.execute(
+            select(AccountingEntry.id).where(*page_conditions).order_by(*page_order).limit(limit + 1)
+        ).scalars().all()
+        has_more = len(page_ids) > limit
+        page_filter = [AccountingEntry.id.in_(page_ids[:limit])]
     
-    # Revenue: Total revenue earned (Credit to Revenue increases revenue)
-    total_revenue = sum(
-        e.amount for e in entries 
-        if e.account_type == "revenue" and e.entry_type == "credit"
-    )
+    rows = db.query(
+        AccountingEntry,
+        func.sum(signed_amount).over(order_by=sort_columns).label("page_balance"),
+        func.sum(signed_amount).over().label("page_total")
+    ).filter(*page_filter).order_by(*page_order).all()
     
-    # Expenses: Total expenses incurred (Debit to Expense increases expense)
-    total_expenses = sum(
-        e.amount for e in entries 
-        if e.account_type == "expense" and e.entry_type == "debit"
-    )
+    # Ascending pages continue from the boundary; descending pages end at it
+    entries = []
+    for entry, page_balance, page_total in rows:
+        opening_balance = boundary_balance - page_total if descending else boundary_balance
+        entries.append(LedgerEntryResponse(
+            **AccountingEntryResponse.model_validate(entry).model_dump(),
+            running_balance=opening_balance + page_balance
+        ))
     
-    # Profit/Loss = Revenue - Expenses
-    profit_loss = total_revenue - total_expenses
+    if has_more:
+        last = rows[-1][0]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([last.transaction_date, last.id])
     
-    return AccountingSummary(
-        total_debits=total_debits,
-        total_credits=total_credits,
-        balance=balance,
-        accounts_receivable=accounts_receivable,
-        accounts_payable=accounts_payable,
-        cash_in=cash_in,
-        cash_out=cash_out,
-        total_revenue=total_revenue,
-        total_expenses=total_expenses,
-        profit_loss=profit_loss
-    )
+    return entries
 
-@router.get("/ledger", response_model=List[AccountingEntryResponse])
-def get_ledger(
+# ========== INTEGRITY CHECKS ==========
+
+@router.post("/integrity-check", response_model=LedgerCheckRunResponse)
+def run_integrity_check(
+    full: bool = False,
+    current_user: User = Depends(require_role(["super_admin"])),
+    db: Session = Depends(get_db)
+):
+    """Check ledger entries added since the last run (full=true rechecks everything)"""
+    return run_ledger_integrity_check(db, full=full)
+
+@router.get("/discrepancies", response_model=List[LedgerDiscrepancyResponse])
+def get_ledger_discrepancies(
+    include_resolved: bool = False,
+    check_type: Optional[str] = None,
+    current_user: User = Depends(require_role(["super_admin"])),
+    db: Session = Depends(get_db)
+):
+    """Get discrepancies found by the integrity checks (open ones by default)"""
+    query = db.query(LedgerDiscrepancy)
+    if not include_resolved:
+        query = query.filter(LedgerDiscrepancy.resolved_at.is_(None))
+    if check_type:
+        query = query.filter(LedgerDiscrepancy.check_type == check_type)
+    return query.order_by(LedgerDiscrepancy.id.desc()).all()
+
+@router.put("/discrepancies/{discrepancy_id}/resolve", response_model=LedgerDiscrepancyResponse)
+def resolve_ledger_discrepancy(
+    discrepancy_id: int,
+    current_user: User = Depends(require_role(["super_admin"])),
+    db: Session = Depends(get_db)
+):
+    """Mark a discrepancy as resolved after the ledger has been corrected"""
+    discrepancy = db.query(LedgerDiscrepancy).filter(LedgerDiscrepancy.id == discrepancy_id).first()
+    if not discrepancy:
+        raise HTTPException(status_code=404, detail="Discrepancy not found")
+    if discrepancy.resolved_at is None:
+        discrepancy.resolved_at = datetime.utcnow()
+        db.commit()
+        db.refresh(discrepancy)
+    return discrepancy
+
+# ========== PERIOD CLOSE ==========
+
+@router.get("/periods", response_model=List[AccountingPeriodResponse])
+def get_closed_periods(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get closed accounting periods (newest first)"""
+    if current_user.role.value not in ["super_admin", "project_lead"]:
+        raise HTTPException(status_code=403, detail="Not authorized to view accounting periods")
+    
+    return db.query(AccountingPeriod).order_by(AccountingPeriod.period_end.desc()).all()
+
+@router.post("/periods/{period}/close", response_model=AccountingPeriodResponse)
+def close_period(
+    period: str,
+    current_user: User = Depends(require_role(["super_admin"])),
+    db: Session = Depends(get_db)
+):
+    """Close a month (YYYY-MM): snapshot its closing balances per project and account"""
+    try:
+        _, period_end = parse_period(period)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Period must be in YYYY-MM format")
+    
+    if period_end >= datetime.utcnow().date():
+        raise HTTPException(status_code=400, detail=f"Period {period} has not ended yet")
+    
+    if db.query(AccountingPeriod).filter(AccountingPeriod.period == period).first():
+        raise HTTPException(status_code=400, detail=f"Period {period} is already closed")
+    
+    # Later snapshots build on earlier ones, so periods are closed in order
+    latest = db.query(AccountingPeriod).order_by(AccountingPeriod.period_end.desc()).first()
+    if latest and latest.period_end > period_end:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot close {period}: the later period {latest.period} is already closed"
+        )
+    
+    try:
+        return close_accounting_period(db, period, current_user.id)
+    except IntegrityError:
+        # Closed concurrently by another request
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Period {period} is already closed")
+
+@router.get("/trial-balance", response_model=TrialBalance)
+def get_trial_balance(
+    as_of: Optional[date] = None,
     project_id: Optional[int] = None,
-    start_date: Optional[date] = None,
-    end_date: Optional[date] = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get full accounting ledger (all entries)"""
-    return get_accounting_entries(
-        project_id=project_id,
-        start_date=start_date,
-        end_date=end_date,
-        current_user=current_user,
-        db=db
+    """Get debit and credit totals per project and account up to and including as_of (default today, UTC)"""
+    if current_user.role.value not in ["super_admin", "project_lead"]:
+        raise HTTPException(status_code=403, detail="Not authorized to view the trial balance")
+    
+    as_of = as_of or datetime.utcnow().date()
+    base, balances = accumulated_balances(db, as_of, project_id=project_id)
+    
+    lines = [
+        TrialBalanceLine(
+            project_id=None if line_project_id == NO_PROJECT else line_project_id,
+            account_type=account_type,
+            debit_total=debit_total,
+            credit_total=credit_total,
+            balance=debit_total - credit_total
+        )
+        for (line_project_id, account_type), (debit_total, credit_total) in sorted(balances.items())
+    ]
+    return TrialBalance(
+        as_of=as_of,
+        base_period=base.period if base else None,
+        lines=lines,
+        total_debits=sum(line.debit_total for line in lines),
+        total_credits=sum(line.credit_total for line in lines)
     )
-
@@ -1,19 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, Header
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import func, false, insert, select
 from typing import List, Optional
 from datetime import datetime
 from database import get_db
 from models import (
     User, Task, Project, DeveloperProject, TaskDeveloper, 
-    DeveloperPayment, DeveloperPaymentTask, PaymentVoucher, PaymentVoucherTask
+    DeveloperPayment, DeveloperPaymentTask, PaymentVoucher, PaymentVoucherTask, PaymentStatus
 )
 from schemas import (
     DeveloperPaymentCreate, DeveloperPaymentResponse,
+    DeveloperPaymentBatchCreate, DeveloperPaymentBatchItem, DeveloperPaymentBatchResponse,
     DeveloperWorkSummary, PaymentVoucherCreate, PaymentVoucherResponse
 )
-from routers.accounting import record_voucher_created, record_voucher_payment
+from accounting_outbox import enqueue_accounting_event, enqueue_accounting_events, notify_accounting_outbox
 from auth import get_current_active_user, require_role, has_super_admin_access
+from idempotency import lock_for_write, claim_idempotency_key, replay_response, store_idempotent_response
+from task_rollups import refresh_task_rollups
+from voucher_totals import VOUCHER_STATUSES, voucher_status, refresh_voucher_totals
+from pagination import NEXT_CURSOR_HEADER, MAX_PAGE_SIZE, encode_cursor, decode_cursor, keyset_after
 
 router = APIRouter()
 
@@ -22,10 +27,18 @@ router = APIRouter()
 @router.post("/vouchers", response_model=PaymentVoucherResponse)
 def create_payment_voucher(
     voucher: PaymentVoucherCreate,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(require_role(["project_lead", "super_admin"])),
     db: Session = Depends(get_db)
 ):
-    """Create a payment voucher for a developer (similar to invoice but for outgoing payments)"""
+    """Create a payment voucher for a developer (similar to invoice but for outgoing payments).
+    
+    A retry with the same Idempotency-Key header returns the first response.
+    """
+    lock_for_write(db)
+    key_record = claim_idempotency_key(db, current_user.id, idempotency_key, "create_payment_voucher", voucher)
+    if key_record and key_record.response_body is not None:
+        return replay_response(key_record)
     
     # Verify project exists and user is the project lead
     project = db.query(Project).filter(Project.id == voucher.project_id).first()
@@ -35,8 +48,8 @@ def create_payment_voucher(
     if not has_super_admin_access(current_user) and project.project_lead_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to create vouchers for this project")
     
-    # Verify developer is assigned to the project
-    developer_project = db.query(DeveloperProject).filter(
+    # Verify developer is assigned to the project (developer loaded with it for the response)
+    developer_project = db.query(DeveloperProject).options(joinedload(DeveloperProject.developer)).filter(
         DeveloperProject.developer_id == voucher.developer_id,
         DeveloperProject.project_id == voucher.project_id
     ).first()
@@ -46,25 +59,24 @@ def create_payment_voucher(
     
     hourly_rate = float(developer_project.hourly_rate)
     
-    # Verify all tasks belong to the project and have productivity hours
-    tasks = db.query(Task).filter(
+    # Verify all tasks belong to the project and are assigned to the developer, in one query
+    is_assigned = select(TaskDeveloper.id).where(
+        TaskDeveloper.task_id == Task.id,
+        TaskDeveloper.developer_id == voucher.developer_id
+    ).exists()
+    task_rows = db.query(Task, is_assigned).filter(
         Task.id.in_(voucher.task_ids),
         Task.project_id == voucher.project_id
-    ).all()
+    ).order_by(Task.id).all()
     
-    if len(tasks) != len(voucher.task_ids):
+    if len(task_rows) != len(voucher.task_ids):
         raise HTTPException(status_code=400, detail="Some tasks not found or don't belong to this project")
     
-    # Verify tasks are assigned to the developer
-    task_assignments = db.query(TaskDeveloper).filter(
-        TaskDeveloper.task_id.in_(voucher.task_ids),
-        TaskDeveloper.developer_id == voucher.developer_id
-    ).all()
-    
-    assigned_task_ids = [ta.task_id for ta in task_assignments]
-    if len(assigned_task_ids) != len(voucher.task_ids):
+    if not all(assigned for _, assigned in task_rows):
         raise HTTPException(status_code=400, detail="Some tasks are not assigned to this developer")
     
+    tasks = [task for task, _ in task_rows]
+    
     # Calculate voucher amount from tasks
     calculated_amount = 0
     for task in tasks:
@@ -82,7 +94,7 @@ def create_payment_voucher(
             detail=f"Voucher amount {voucher.voucher_amount} does not match calculated amount {calculated_amount:.2f}"
         )
     
-    # Create voucher
+    # Create voucher (id and created_at come back from the INSERT)
     db_voucher = PaymentVoucher(
         developer_id=voucher.developer_id,
         project_id=voucher.project_id,
@@ -91,115 +103,147 @@ def create_payment_voucher(
         notes=voucher.notes,
         date_range_start=voucher.date_range_start,
         date_range_end=voucher.date_range_end,
-        created_by=current_user.id
+        created_by=current_user.id,
+        total_paid=0.0,
+        status=PaymentStatus(voucher_status(0.0, voucher.voucher_amount))
     )
     db.add(db_voucher)
-    db.commit()
-    db.refresh(db_voucher)
-    
-    # Link tasks to voucher
-    for task in tasks:
-        voucher_task = PaymentVoucherTask(
-            voucher_id=db_voucher.id,
-            task_id=task.id,
-            productivity_hours=task.productivity_hours,
-            hourly_rate=hourly_rate,
-            amount=task.productivity_hours * hourly_rate
-        )
-        db.add(voucher_task)
+    db.flush()
     
+    # Link tasks to voucher with one multi-row INSERT
+    task_details = [
+        {
+            "id": task.id,
+            "title": task.title,
+            "productivity_hours": task.productivity_hours,
+            "hourly_rate": hourly_rate,
+            "amount": task.productivity_hours * hourly_rate
+        }
+        for task in tasks
+    ]
+    db.execute(insert(PaymentVoucherTask), [
+        {
+            "voucher_id": db_voucher.id,
+            "task_id": detail["id"],
+            "productivity_hours": detail["productivity_hours"],
+            "hourly_rate": hourly_rate,
+            "amount": detail["amount"]
+        }
+        for detail in task_details
+    ])
+    
+    # Ledger entries are posted from the outbox, committed with the voucher
+    enqueue_accounting_event(db, "voucher_created", current_user.id, voucher_id=db_voucher.id)
+    
+    # A new voucher has no payments yet; everything else is already in memory
+    developer = developer_project.developer
+    response = PaymentVoucherResponse(
+        id=db_voucher.id,
+        developer_id=db_voucher.developer_id,
+        project_id=db_voucher.project_id,
+        voucher_amount=db_voucher.voucher_amount,
+        voucher_date=db_voucher.voucher_date,
+        notes=db_voucher.notes,
+        date_range_start=db_voucher.date_range_start,
+        date_range_end=db_voucher.date_range_end,
+        created_at=db_voucher.created_at,
+        created_by=db_voucher.created_by,
+        total_paid=db_voucher.total_paid,
+        status=db_voucher.status.value,
+        developer={"id": developer.id, "full_name": developer.full_name, "email": developer.email},
+        project={"id": project.id, "name": project.name},
+        tasks=task_details,
+        payments=[]
+    )
+    store_idempotent_response(key_record, response)
     db.commit()
-    db.refresh(db_voucher)
-    
-    # Record accounting entry for voucher creation
-    try:
-        # Refresh to ensure all relationships are available
-        db.refresh(db_voucher)
-        record_voucher_created(db, db_voucher, current_user.id)
-        db.commit()
-    except Exception as e:
-        # Log error but don't fail voucher creation
-        import traceback
-        print(f"Error recording accounting entry for voucher {db_voucher.id}: {e}")
-        traceback.print_exc()
-    
-    # Calculate total paid and status
-    total_paid = db.query(func.coalesce(func.sum(DeveloperPayment.payment_amount), 0)).filter(
-        DeveloperPayment.voucher_id == db_voucher.id
-    ).scalar() or 0.0
-    
-    status = "paid" if total_paid >= db_voucher.voucher_amount else ("partial" if total_paid > 0 else "pending")
+    notify_accounting_outbox()
     
-    # Build response
-    developer = db_voucher.developer
-    project = db_voucher.project
+    return response
+
+def build_voucher_response(voucher: PaymentVoucher) -> PaymentVoucherResponse:
+    """Build the response from the voucher's loaded relationships.
     
-    voucher_tasks = db.query(PaymentVoucherTask).filter(
-        PaymentVoucherTask.voucher_id == db_voucher.id
-    ).all()
+    Load developer, project, voucher_tasks.task and payments with selectinload
+    to avoid per-voucher queries.
+    """
+    developer = voucher.developer
+    project = voucher.project
     
-    task_details = []
-    for vt in voucher_tasks:
-        task = vt.task
-        task_details.append({
-            "id": task.id,
-            "title": task.title,
+    task_details = [
+        {
+            "id": vt.task.id,
+            "title": vt.task.title,
             "productivity_hours": vt.productivity_hours,
             "hourly_rate": vt.hourly_rate,
             "amount": vt.amount
-        })
+        }
+        for vt in sorted(voucher.voucher_tasks, key=lambda vt: vt.id)
+    ]
     
-    # Get payments for this voucher
-    payments = db.query(DeveloperPayment).filter(
-        DeveloperPayment.voucher_id == db_voucher.id
-    ).order_by(DeveloperPayment.payment_date.desc()).all()
-    
-    payment_details = []
-    for payment in payments:
-        payment_details.append({
+    payment_details = [
+        {
             "id": payment.id,
             "payment_amount": payment.payment_amount,
             "payment_date": payment.payment_date,
             "notes": payment.notes,
             "created_at": payment.created_at
-        })
+        }
+        for payment in sorted(voucher.payments, key=lambda p: p.payment_date, reverse=True)
+    ]
     
     return PaymentVoucherResponse(
-        id=db_voucher.id,
-        developer_id=db_voucher.developer_id,
-        project_id=db_voucher.project_id,
-        voucher_amount=db_voucher.voucher_amount,
-        voucher_date=db_voucher.voucher_date,
-        notes=db_voucher.notes,
-        date_range_start=db_voucher.date_range_start,
-        date_range_end=db_voucher.date_range_end,
-        created_at=db_voucher.created_at,
-        created_by=db_voucher.created_by,
-        total_paid=float(total_paid),
-        status=status,
+        id=voucher.id,
+        developer_id=voucher.developer_id,
+        project_id=voucher.project_id,
+        voucher_amount=voucher.voucher_amount,
+        voucher_date=voucher.voucher_date,
+        notes=voucher.notes,
+        date_range_start=voucher.date_range_start,
+        date_range_end=voucher.date_range_end,
+        created_at=voucher.created_at,
+        created_by=voucher.created_by,
+        total_paid=voucher.total_paid,
+        status=voucher.status.value,
         developer={"id": developer.id, "full_name": developer.full_name, "email": developer.email},
         project={"id": project.id, "name": project.name},
         tasks=task_details,
         payments=payment_details
     )
 
+def voucher_detail_options() -> list:
+    return [
+        selectinload(PaymentVoucher.developer),
+        selectinload(PaymentVoucher.project),
+        selectinload(PaymentVoucher.voucher_tasks).selectinload(PaymentVoucherTask.task),
+        selectinload(PaymentVoucher.payments)
+    ]
+
 @router.get("/vouchers", response_model=List[PaymentVoucherResponse])
 def get_payment_vouchers(
+    response: Response,
     project_id: Optional[int] = None,
     developer_id: Optional[int] = None,
     status: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: User = Depends(require_role(["project_lead", "super_admin"])),
     db: Session = Depends(get_db)
 ):
-    """Get all payment vouchers"""
+    """Get payment vouchers (newest first).
     
-    query = db.query(PaymentVoucher)
+    Totals and status are stored on the voucher, so the status filter uses the
+    (project_id, status) index; relationships are loaded in batches, so a page
+    costs a fixed number of queries. When limit is given and more rows exist,
+    the next page's cursor is in the X-Next-Cursor header.
+    """
+    query = db.query(PaymentVoucher).options(*voucher_detail_options())
     
     # Filter by projects led by this user
     if not has_super_admin_access(current_user):
-        projects = db.query(Project).filter(Project.project_lead_id == current_user.id).all()
-        project_ids = [p.id for p in projects]
-        query = query.filter(PaymentVoucher.project_id.in_(project_ids))
+        query = query.filter(PaymentVoucher.project_id.in_(
+            select(Project.id).where(Project.project_lead_id == current_user.id)
+        ))
     
     if project_id:
         query = query.filter(PaymentVoucher.project_id == project_id)
@@ -207,74 +251,28 @@ def get_payment_vouchers(
     if developer_id:
         query = query.filter(PaymentVoucher.developer_id == developer_id)
     
-    vouchers = query.order_by(PaymentVoucher.voucher_date.desc()).all()
+    if status:
+        if status in VOUCHER_STATUSES:
+            query = query.filter(PaymentVoucher.status == PaymentStatus(status))
+        else:
+            query = query.filter(false())
     
-    result = []
-    for voucher in vouchers:
-        # Calculate total paid and status
-        total_paid = db.query(func.coalesce(func.sum(DeveloperPayment.payment_amount), 0)).filter(
-            DeveloperPayment.voucher_id == voucher.id
-        ).scalar() or 0.0
-        
-        voucher_status = "paid" if total_paid >= voucher.voucher_amount else ("partial" if total_paid > 0 else "pending")
-        
-        # Apply status filter if provided
-        if status and voucher_status != status:
-            continue
-        
-        developer = voucher.developer
-        project = voucher.project
-        
-        voucher_tasks = db.query(PaymentVoucherTask).filter(
-            PaymentVoucherTask.voucher_id == voucher.id
-        ).all()
-        
-        task_details = []
-        for vt in voucher_tasks:
-            task = vt.task
-            task_details.append({
-                "id": task.id,
-                "title": task.title,
-                "productivity_hours": vt.productivity_hours,
-                "hourly_rate": vt.hourly_rate,
-                "amount": vt.amount
-            })
-        
-        # Get payments for this voucher
-        payments = db.query(DeveloperPayment).filter(
-            DeveloperPayment.voucher_id == voucher.id
-        ).order_by(DeveloperPayment.payment_date.desc()).all()
-        
-        payment_details = []
-        for payment in payments:
-            payment_details.append({
-                "id": payment.id,
-                "payment_amount": payment.payment_amount,
-                "payment_date": payment.payment_date,
-                "notes": payment.notes,
-                "created_at": payment.created_at
-            })
-        
-        result.append(PaymentVoucherResponse(
-            id=voucher.id,
-            developer_id=voucher.developer_id,
-            project_id=voucher.project_id,
-            voucher_amount=voucher.voucher_amount,
-            voucher_date=voucher.voucher_date,
-            notes=voucher.notes,
-            date_range_start=voucher.date_range_start,
-            date_range_end=voucher.date_range_end,
-            created_at=voucher.created_at,
-            created_by=voucher.created_by,
-            total_paid=float(total_paid),
-            status=voucher_status,
-            developer={"id": developer.id, "full_name": developer.full_name, "email": developer.email},
-            project={"id": project.id, "name": project.name},
-            tasks=task_details,
-            payments=payment_details
-        ))
+    sort_columns = [PaymentVoucher.voucher_date, PaymentVoucher.id]
+    if cursor:
+        query = query.filter(keyset_after(sort_columns, decode_cursor(cursor, len(sort_columns)), descending=True))
+    query = query.order_by(PaymentVoucher.voucher_date.desc(), PaymentVoucher.id.desc())
     
-    return result
+    if limit is None:
+        rows = query.all()
+    else:
+        # Fetch one extra row to know whether another page exists
+        rows = query.limit(limit + 1).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor([last.voucher_date, last.id])
+    
+    return [build_voucher_response(voucher) for voucher in rows]
 
 @router.get("/vouchers/{voucher_id}", response_model=PaymentVoucherResponse)
 def get_payment_voucher(
@@ -284,7 +282,9 @@ def get_payment_voucher(
 ):
     """Get a specific payment voucher"""
     
-    voucher = db.query(PaymentVoucher).filter(PaymentVoucher.id == voucher_id).first()
+    voucher = db.query(PaymentVoucher).options(*voucher_detail_options()).filter(
+        PaymentVoucher.id == voucher_id
+    ).first()
     if not voucher:
         raise HTTPException(status_code=404, detail="Payment voucher not found")
     
@@ -302,154 +302,125 @@ def get_payment_voucher(
     else:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    # Calculate total paid and status
-    total_paid = db.query(func.coalesce(func.sum(DeveloperPayment.payment_amount), 0)).filter(
-        DeveloperPayment.voucher_id == voucher.id
-    ).scalar() or 0.0
-    
-    status = "paid" if total_paid >= voucher.voucher_amount else ("partial" if total_paid > 0 else "pending")
-    
-    developer = voucher.developer
-    project = voucher.project
-    
-    voucher_tasks = db.query(PaymentVoucherTask).filter(
-        PaymentVoucherTask.voucher_id == voucher.id
-    ).all()
-    
-    task_details = []
-    for vt in voucher_tasks:
-        task = vt.task
-        task_details.append({
-            "id": task.id,
-            "title": task.title,
-            "productivity_hours": vt.productivity_hours,
-            "hourly_rate": vt.hourly_rate,
-            "amount": vt.amount
-        })
-    
-    # Get payments for this voucher
-    payments = db.query(DeveloperPayment).filter(
-        DeveloperPayment.voucher_id == voucher.id
-    ).order_by(DeveloperPayment.payment_date.desc()).all()
-    
-    payment_details = []
-    for payment in payments:
-        payment_details.append({
-            "id": payment.id,
-            "payment_amount": payment.payment_amount,
-            "payment_date": payment.payment_date,
-            "notes": payment.notes,
-            "created_at": payment.created_at
-        })
-    
-    return PaymentVoucherResponse(
-        id=voucher.id,
-        developer_id=voucher.developer_id,
-        project_id=voucher.project_id,
-        voucher_amount=voucher.voucher_amount,
-        voucher_date=voucher.voucher_date,
-        notes=voucher.notes,
-        date_range_start=voucher.date_range_start,
-        date_range_end=voucher.date_range_end,
-        created_at=voucher.created_at,
-        created_by=voucher.created_by,
-        total_paid=float(total_paid),
-        status=status,
-        developer={"id": developer.id, "full_name": developer.full_name, "email": developer.email},
-        project={"id": project.id, "name": project.name},
-        tasks=task_details,
-        payments=payment_details
-    )
+    return build_voucher_response(voucher)
 
 @router.get("/work-summary", response_model=List[DeveloperWorkSummary])
 def get_developer_work_summary(
+    response: Response,
     project_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: User = Depends(require_role(["project_lead", "super_admin"])),
     db: Session = Depends(get_db)
 ):
-    """Get work summary for all developers with earnings based on productivity hours"""
+    """Get work summary for all developers with earnings based on productivity hours.
+    
+    One row per developer assignment that has tasks with productivity hours.
+    The page is selected in SQL and totals come from grouped queries, so the
+    cost does not grow with the number of developers or tasks. When limit is
+    given and more rows exist, the next page's cursor is in the X-Next-Cursor header.
+    """
+    # Assignments with at least one task that has productivity hours
+    has_tasks = select(TaskDeveloper.id).join(Task, Task.id == TaskDeveloper.task_id).where(
+        TaskDeveloper.developer_id == DeveloperProject.developer_id,
+        Task.project_id == DeveloperProject.project_id,
+        Task.productivity_hours.isnot(None)
+    ).exists()
+    query = db.query(DeveloperProject).options(
+        selectinload(DeveloperProject.developer),
+        selectinload(DeveloperProject.project)
+    ).filter(has_tasks)
     
-    # Get projects led by this user
-    if has_super_admin_access(current_user):
-        projects_query = db.query(Project)
-    else:
-        projects_query = db.query(Project).filter(Project.project_lead_id == current_user.id)
+    # Filter by projects led by this user
+    if not has_super_admin_access(current_user):
+        query = query.filter(DeveloperProject.project_id.in_(
+            select(Project.id).where(Project.project_lead_id == current_user.id)
+        ))
     
     if project_id:
-        projects_query = projects_query.filter(Project.id == project_id)
+        query = query.filter(DeveloperProject.project_id == project_id)
     
-    projects = projects_query.all()
+    if cursor:
+        query = query.filter(keyset_after([DeveloperProject.id], decode_cursor(cursor, 1)))
+    query = query.order_by(DeveloperProject.id)
     
-    if not projects:
-        return []
+    if limit is None:
+        developer_projects = query.all()
+    else:
+        # Fetch one extra row to know whether another page exists
+        developer_projects = query.limit(limit + 1).all()
+        if len(developer_projects) > limit:
+            developer_projects = developer_projects[:limit]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor([developer_projects[-1].id])
     
-    project_ids = [p.id for p in projects]
+    if not developer_projects:
+        return []
     
-    # Get all developers assigned to these projects
-    developer_projects = db.query(DeveloperProject).filter(
-        DeveloperProject.project_id.in_(project_ids)
-    ).all()
+    developer_ids = {dp.developer_id for dp in developer_projects}
+    project_ids = {dp.project_id for dp in developer_projects}
+    
+    # Tasks with productivity hours per (developer, project)
+    task_rows = db.query(
+        TaskDeveloper.developer_id, Task.project_id, Task.id, Task.title, Task.productivity_hours
+    ).join(Task, Task.id == TaskDeveloper.task_id).filter(
+        TaskDeveloper.developer_id.in_(developer_ids),
+        Task.project_id.in_(project_ids),
+        Task.productivity_hours.isnot(None)
+    ).distinct().order_by(Task.id).all()
+    tasks_by_assignment = {}
+    for developer_id, task_project_id, task_id, title, productivity_hours in task_rows:
+        tasks_by_assignment.setdefault((developer_id, task_project_id), []).append((task_id, title, productivity_hours))
+    
+    # Paid amount per (developer, project)
+    paid_by_assignment = {
+        (developer_id, paid_project_id): float(amount or 0.0)
+        for developer_id, paid_project_id, amount in db.query(
+            DeveloperPayment.developer_id, DeveloperPayment.project_id, func.sum(DeveloperPayment.payment_amount)
+        ).filter(
+            DeveloperPayment.developer_id.in_(developer_ids),
+            DeveloperPayment.project_id.in_(project_ids)
+        ).group_by(DeveloperPayment.developer_id, DeveloperPayment.project_id).all()
+    }
+    
+    # Paid amount per (developer, project, task)
+    paid_by_task = {
+        (developer_id, paid_project_id, task_id): float(amount or 0.0)
+        for developer_id, paid_project_id, task_id, amount in db.query(
+            DeveloperPayment.developer_id,
+            DeveloperPayment.project_id,
+            DeveloperPaymentTask.task_id,
+            func.sum(DeveloperPaymentTask.amount)
+        ).join(DeveloperPayment, DeveloperPayment.id == DeveloperPaymentTask.payment_id).filter(
+            DeveloperPayment.developer_id.in_(developer_ids),
+            DeveloperPayment.project_id.in_(project_ids)
+        ).group_by(DeveloperPayment.developer_id, DeveloperPayment.project_id, DeveloperPaymentTask.task_id).all()
+    }
     
     result = []
-    
     for dp in developer_projects:
         project = dp.project
         developer = dp.developer
-        
-        # Get all tasks assigned to this developer in this project
-        task_assignments = db.query(TaskDeveloper).filter(
-            TaskDeveloper.developer_id == developer.id
-        ).all()
-        
-        task_ids = [ta.task_id for ta in task_assignments]
-        
-        # Get tasks for this project with productivity hours set
-        tasks = db.query(Task).filter(
-            Task.id.in_(task_ids),
-            Task.project_id == project.id,
-            Task.productivity_hours.isnot(None)
-        ).all()
-        
-        if not tasks:
-            continue
+        key = (developer.id, project.id)
+        tasks = tasks_by_assignment.get(key, [])
         
         # Calculate total productivity hours and earnings
-        total_productivity_hours = sum(task.productivity_hours for task in tasks if task.productivity_hours)
+        total_productivity_hours = sum(hours for _, _, hours in tasks if hours)
         hourly_rate = float(dp.hourly_rate)
         total_earnings = total_productivity_hours * hourly_rate
+        paid_amount = paid_by_assignment.get(key, 0.0)
         
-        # Get paid amount for this developer in this project
-        paid_payments = db.query(DeveloperPayment).filter(
-            DeveloperPayment.developer_id == developer.id,
-            DeveloperPayment.project_id == project.id
-        ).all()
-        
-        paid_amount = sum(payment.payment_amount for payment in paid_payments)
-        pending_amount = total_earnings - paid_amount
-        
-        # Get task details
         task_details = []
-        for task in tasks:
-            if task.productivity_hours:
-                # Check if this task has been fully paid
-                # Sum all payments for this task
-                payment_tasks = db.query(DeveloperPaymentTask).join(DeveloperPayment).filter(
-                    DeveloperPaymentTask.task_id == task.id,
-                    DeveloperPayment.developer_id == developer.id,
-                    DeveloperPayment.project_id == project.id
-                ).all()
-                
-                total_paid_for_task = sum(pt.amount for pt in payment_tasks)
-                task_earnings = task.productivity_hours * hourly_rate
-                is_paid = abs(total_paid_for_task - task_earnings) < 0.01  # Fully paid if amounts match (within 0.01)
-                
+        for task_id, title, productivity_hours in tasks:
+            if productivity_hours:
+                task_earnings = productivity_hours * hourly_rate
+                total_paid_for_task = paid_by_task.get(key + (task_id,), 0.0)
                 task_details.append({
-                    "id": task.id,
-                    "title": task.title,
-                    "productivity_hours": task.productivity_hours,
+                    "id": task_id,
+                    "title": title,
+                    "productivity_hours": productivity_hours,
                     "hourly_rate": hourly_rate,
-                    "earnings": task.productivity_hours * hourly_rate,
-                    "is_paid": is_paid
+                    "earnings": task_earnings,
+                    "is_paid": abs(total_paid_for_task - task_earnings) < 0.01  # Fully paid if amounts match (within 0.01)
                 })
         
         result.append(DeveloperWorkSummary(
@@ -461,7 +432,7 @@ def get_developer_work_summary(
             hourly_rate=hourly_rate,
             total_earnings=total_earnings,
             paid_amount=paid_amount,
-            pending_amount=pending_amount,
+            pending_amount=total_earnings - paid_amount,
             tasks=task_details
         ))
     
@@ -470,13 +441,21 @@ def get_developer_work_summary(
 @router.post("/pay", response_model=DeveloperPaymentResponse)
 def pay_developer(
     payment: DeveloperPaymentCreate,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(require_role(["project_lead", "super_admin"])),
     db: Session = Depends(get_db)
 ):
-    """Make a payment against a payment voucher"""
+    """Make a payment against a payment voucher.
     
-    # Verify voucher exists
-    voucher = db.query(PaymentVoucher).filter(PaymentVoucher.id == payment.voucher_id).first()
+    A retry with the same Idempotency-Key header returns the first response.
+    """
+    lock_for_write(db)
+    key_record = claim_idempotency_key(db, current_user.id, idempotency_key, "pay_developer", payment)
+    if key_record and key_record.response_body is not None:
+        return replay_response(key_record)
+    
+    # Verify voucher exists; the row lock serializes concurrent payments on it
+    voucher = db.query(PaymentVoucher).filter(PaymentVoucher.id == payment.voucher_id).with_for_update().first()
     if not voucher:
         raise HTTPException(status_code=404, detail="Payment voucher not found")
     
@@ -486,11 +465,7 @@ def pay_developer(
         raise HTTPException(status_code=403, detail="Not authorized to make payments for this project")
     
     # Calculate remaining amount on voucher
-    total_paid = db.query(func.coalesce(func.sum(DeveloperPayment.payment_amount), 0)).filter(
-        DeveloperPayment.voucher_id == voucher.id
-    ).scalar() or 0.0
-    
-    remaining_amount = voucher.voucher_amount - total_paid
+    remaining_amount = voucher.voucher_amount - voucher.total_paid
     
     # Validate payment amount
     if payment.payment_amount <= 0:
@@ -513,8 +488,7 @@ def pay_developer(
         created_by=current_user.id
     )
     db.add(db_payment)
-    db.commit()
-    db.refresh(db_payment)
+    db.flush()
     
     # Get voucher tasks and distribute payment proportionally
     voucher_tasks = db.query(PaymentVoucherTask).filter(
@@ -536,22 +510,16 @@ def pay_developer(
             amount=amount_for_task
         )
         db.add(payment_task)
+    refresh_task_rollups(db, [vt.task_id for vt in voucher_tasks])
+    refresh_voucher_totals(db, [voucher.id])
     
-    db.commit()
+    # Ledger entries are posted from the outbox, committed with the payment
+    enqueue_accounting_event(
+        db, "voucher_payment", current_user.id, voucher_id=voucher.id, developer_payment_id=db_payment.id
+    )
+    db.flush()
     db.refresh(db_payment)
     
-    # Record accounting entry for voucher payment
-    try:
-        # Refresh to ensure all relationships are available
-        db.refresh(voucher)
-        record_voucher_payment(db, db_payment, voucher, current_user.id)
-        db.commit()
-    except Exception as e:
-        # Log error but don't fail payment creation
-        import traceback
-        print(f"Error recording accounting entry for developer payment {db_payment.id}: {e}")
-        traceback.print_exc()
-    
     # Build response
     developer = db_payment.developer
     project = db_payment.project
@@ -572,7 +540,7 @@ def pay_developer(
             "amount": pt.amount
         })
     
-    return DeveloperPaymentResponse(
+    response = DeveloperPaymentResponse(
         id=db_payment.id,
         voucher_id=db_payment.voucher_id,
         developer_id=db_payment.developer_id,
@@ -587,6 +555,148 @@ def pay_developer(
         voucher={"id": voucher_obj.id, "voucher_amount": voucher_obj.voucher_amount, "voucher_date": voucher_obj.voucher_date} if voucher_obj else None,
         tasks=task_details
     )
+    store_idempotent_response(key_record, response)
+    db.commit()
+    notify_accounting_outbox()
+    
+    return response
+
+@router.post("/pay-batch", response_model=DeveloperPaymentBatchResponse)
+def pay_developers_batch(
+    batch: DeveloperPaymentBatchCreate,
+    idempotency_key: Optional[str] = Header(None),
+    current_user: User = Depends(require_role(["project_lead", "super_admin"])),
+    db: Session = Depends(get_db)
+):
+    """Make many voucher payments (e.g. a month-end payroll run) in one transaction.
+    
+    Either every payment is recorded or none is. The vouchers are locked and
+    validated together, and payments, task splits and outbox events are each
+    written with one multi-row INSERT, so the query count does not grow with
+    the number of payments. A retry with the same Idempotency-Key header
+    returns the first response.
+    """
+    lock_for_write(db)
+    key_record = claim_idempotency_key(db, current_user.id, idempotency_key, "pay_developers_batch", batch)
+    if key_record and key_record.response_body is not None:
+        return replay_response(key_record)
+    
+    if not batch.payments:
+        raise HTTPException(status_code=400, detail="No payments given")
+    
+    for item in batch.payments:
+        if item.payment_amount <= 0:
+            raise HTTPException(status_code=400, detail="Payment amount must be greater than 0")
+    
+    # Lock the vouchers in id order so concurrent runs cannot deadlock or overpay
+    voucher_ids = sorted({item.voucher_id for item in batch.payments})
+    vouchers = {
+        voucher.id: voucher
+        for voucher in db.query(PaymentVoucher).filter(
+            PaymentVoucher.id.in_(voucher_ids)
+        ).order_by(PaymentVoucher.id).with_for_update().all()
+    }
+    missing_ids = [voucher_id for voucher_id in voucher_ids if voucher_id not in vouchers]
+    if missing_ids:
+        raise HTTPException(status_code=404, detail=f"Payment vouchers not found: {missing_ids}")
+    
+    # Verify the user leads every project involved
+    if not has_super_admin_access(current_user):
+        project_ids = {voucher.project_id for voucher in vouchers.values()}
+        led_project_ids = {
+            led_project_id for led_project_id, in db.query(Project.id).filter(
+                Project.id.in_(project_ids),
+                Project.project_lead_id == current_user.id
+            ).all()
+        }
+        if project_ids - led_project_ids:
+            raise HTTPException(status_code=403, detail="Not authorized to make payments for these projects")
+    
+    # Validate the batch total per voucher against the locked totals
+    requested = {}
+    for item in batch.payments:
+        requested[item.voucher_id] = requested.get(item.voucher_id, 0.0) + item.payment_amount
+    for voucher_id, amount in requested.items():
+        voucher = vouchers[voucher_id]
+        remaining_amount = voucher.voucher_amount - voucher.total_paid
+        if amount > remaining_amount + 0.01:  # Allow small floating point differences
+            raise HTTPException(
+                status_code=400,
+                detail=f"Payments of {amount} exceed remaining amount {remaining_amount:.2f} on voucher {voucher_id}"
+            )
+    
+    # Multi-row INSERTs; payment ids come back in input order
+    payment_rows = [
+        {
+            "voucher_id": item.voucher_id,
+            "developer_id": vouchers[item.voucher_id].developer_id,
+            "project_id": vouchers[item.voucher_id].project_id,
+            "payment_amount": item.payment_amount,
+            "payment_date": item.payment_date,
+            "notes": item.notes,
+            "created_by": current_user.id
+        }
+        for item in batch.payments
+    ]
+    payment_ids = db.scalars(
+        insert(DeveloperPayment).returning(DeveloperPayment.id, sort_by_parameter_order=True),
+        payment_rows
+    ).all()
+    
+    # Distribute each payment over its voucher's tasks proportionally
+    voucher_tasks = {}
+    for vt in db.query(PaymentVoucherTask).filter(PaymentVoucherTask.voucher_id.in_(voucher_ids)).all():
+        voucher_tasks.setdefault(vt.voucher_id, []).append(vt)
+    payment_task_rows = []
+    for payment_id, row in zip(payment_ids, payment_rows):
+        voucher = vouchers[row["voucher_id"]]
+        payment_ratio = row["payment_amount"] / voucher.voucher_amount if voucher.voucher_amount > 0 else 0
+        payment_task_rows.extend(
+            {
+                "payment_id": payment_id,
+                "task_id": vt.task_id,
+                "productivity_hours": vt.productivity_hours,
+                "hourly_rate": vt.hourly_rate,
+                "amount": vt.amount * payment_ratio
+            }
+            for vt in voucher_tasks.get(voucher.id, [])
+        )
+    if payment_task_rows:
+        db.execute(insert(DeveloperPaymentTask), payment_task_rows)
+    refresh_task_rollups(db, [row["task_id"] for row in payment_task_rows])
+    refresh_voucher_totals(db, voucher_ids)
+    
+    # Ledger entries are posted from the outbox, committed with the payments
+    enqueue_accounting_events(db, "voucher_payment", current_user.id, [
+        {"voucher_id": row["voucher_id"], "developer_payment_id": payment_id}
+        for payment_id, row in zip(payment_ids, payment_rows)
+    ])
+    
+    # Read the summary before commit expires the vouchers
+    items = [
+        DeveloperPaymentBatchItem(
+            payment_id=payment_id,
+            voucher_id=row["voucher_id"],
+            developer_id=row["developer_id"],
+            project_id=row["project_id"],
+            payment_amount=row["payment_amount"],
+            payment_date=row["payment_date"],
+            voucher_total_paid=vouchers[row["voucher_id"]].total_paid,
+            voucher_status=vouchers[row["voucher_id"]].status.value
+        )
+        for payment_id, row in zip(payment_ids, payment_rows)
+    ]
+    response = DeveloperPaymentBatchResponse(
+        payment_count=len(items),
+        voucher_count=len(voucher_ids),
+        total_amount=sum(item.payment_amount for item in items),
+        payments=items
+    )
+    store_idempotent_response(key_record, response)
+    db.commit()
+    notify_accounting_outbox()
+    
+    return response
 
 @router.get("/payments", response_model=List[DeveloperPaymentResponse])
 def get_developer_payments(
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Header, Query, Response
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, false
+from typing import List, Optional, Tuple
 from datetime import datetime
 import os
 import shutil
@@ -9,7 +9,11 @@ from database import get_db
 from models import User, Invoice, Payment, Project, InvoiceTask, Task, DeveloperPayment, DeveloperProject, TaskDeveloper, PaymentVoucher, PaymentVoucherTask, Timesheet
 from schemas import InvoiceCreate, InvoiceResponse, PaymentCreate, PaymentResponse, DeveloperEarnings, PaymentHistoryItem, TaskResponse
 from auth import get_current_active_user, require_role, can_act_as_developer
-from routers.accounting import record_invoice_created, record_invoice_payment
+from accounting_outbox import enqueue_accounting_event, notify_accounting_outbox
+from idempotency import lock_for_write, claim_idempotency_key, replay_response, store_idempotent_response
+from routers.tasks import get_task_enrichment, build_task_response
+from task_rollups import refresh_task_rollups
+from pagination import NEXT_CURSOR_HEADER, MAX_PAGE_SIZE, encode_cursor, decode_cursor, keyset_after
 
 router = APIRouter()
 
@@ -49,10 +53,10 @@ def create_invoice(
         created_by=current_user.id
     )
     db.add(db_invoice)
-    db.commit()
-    db.refresh(db_invoice)
+    db.flush()
     
     # Link tasks if provided
+    linked_task_ids = []
     if task_ids:
         for task_id in task_ids:
             task = db.query(Task).filter(Task.id == task_id).first()
@@ -62,21 +66,14 @@ def create_invoice(
                     task_id=task_id
                 )
                 db.add(invoice_task)
+                linked_task_ids.append(task_id)
+    refresh_task_rollups(db, linked_task_ids)
     
+    # Ledger entries are posted from the outbox, committed with the invoice
+    enqueue_accounting_event(db, "invoice_created", current_user.id, invoice_id=db_invoice.id)
     db.commit()
     db.refresh(db_invoice)
-    
-    # Record accounting entry for invoice creation
-    try:
-        # Refresh to ensure all relationships are available
-        db.refresh(db_invoice)
-        record_invoice_created(db, db_invoice, current_user.id)
-        db.commit()
-    except Exception as e:
-        # Log error but don't fail invoice creation
-        import traceback
-        print(f"Error recording accounting entry for invoice {db_invoice.id}: {e}")
-        traceback.print_exc()
+    notify_accounting_outbox()
     
     # Calculate status
     total_paid = db.query(func.coalesce(func.sum(Payment.amount), 0)).filter(
@@ -100,14 +97,40 @@ def create_invoice(
         status=status
     )
 
-@router.get("/invoices", response_model=List[InvoiceResponse])
-def get_invoices(
+INVOICE_INCLUDES = ("payments",)
+
+def invoice_status_condition(status: str, total_paid, invoice_amount):
+    """SQL equivalent of the paid/pending status of get_invoices()"""
+    if status == "paid":
+        return total_paid >= invoice_amount
+    if status == "pending":
+        return total_paid < invoice_amount
+    return false()
+
+def list_invoices(
+    db: Session,
+    current_user: User,
     project_id: Optional[int] = None,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-):
-    """Get invoices - Project Leads see their invoices, Project Owners see invoices for their projects"""
-    query = db.query(Invoice)
+    status: Optional[str] = None,
+    include_payments: bool = False,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> Tuple[List[InvoiceResponse], Optional[str]]:
+    """Invoices visible to current_user, newest first, and the next page's cursor (None on the last page).
+    
+    total_paid and the status filter (paid, pending) are computed in SQL with one
+    grouped subquery; include_payments embeds each invoice's payments, loaded in one batch.
+    """
+    # Sum of payments per invoice, joined once instead of queried per invoice
+    paid_totals = db.query(
+        Payment.invoice_id.label("invoice_id"),
+        func.sum(Payment.amount).label("total_paid")
+    ).group_by(Payment.invoice_id).subquery()
+    total_paid = func.coalesce(paid_totals.c.total_paid, 0)
+    
+    query = db.query(Invoice, total_paid).outerjoin(paid_totals, paid_totals.c.invoice_id == Invoice.id)
+    if include_payments:
+        query = query.options(selectinload(Invoice.payments))
     
     if current_user.role.value == "project_lead":
         # Project leads see invoices for their projects only
@@ -127,16 +150,39 @@ def get_invoices(
     if project_id:
         query = query.filter(Invoice.project_id == project_id)
     
-    invoices = query.all()
+    if status:
+        # Treat partial payments as pending (partial status removed)
+        query = query.filter(invoice_status_condition(status, total_paid, Invoice.invoice_amount))
+    
+    sort_columns = [Invoice.invoice_date, Invoice.id]
+    if cursor:
+        query = query.filter(keyset_after(sort_columns, decode_cursor(cursor, len(sort_columns)), descending=True))
+    query = query.order_by(Invoice.invoice_date.desc(), Invoice.id.desc())
+    
+    next_cursor = None
+    if limit is None:
+        rows = query.all()
+    else:
+        # Fetch one extra row to know whether another page exists
+        rows = query.limit(limit + 1).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1][0]
+            next_cursor = encode_cursor([last.invoice_date, last.id])
     
     result = []
-    for invoice in invoices:
-        total_paid = db.query(func.coalesce(func.sum(Payment.amount), 0)).filter(
-            Payment.invoice_id == invoice.id
-        ).scalar() or 0.0
+    for invoice, invoice_total_paid in rows:
+        invoice_total_paid = float(invoice_total_paid or 0.0)
         
         # Treat partial payments as pending (partial status removed)
-        status = "paid" if total_paid >= invoice.invoice_amount else "pending"
+        invoice_status = "paid" if invoice_total_paid >= invoice.invoice_amount else "pending"
+        
+        payments = None
+        if include_payments:
+            payments = [
+                PaymentResponse.model_validate(payment).model_dump()
+                for payment in sorted(invoice.payments, key=lambda p: p.id)
+            ]
         
         result.append(InvoiceResponse(
             id=invoice.id,
@@ -148,10 +194,44 @@ def get_invoices(
             date_range_end=invoice.date_range_end,
             created_at=invoice.created_at,
             created_by=invoice.created_by,
-            total_paid=float(total_paid),
-            status=status
+            total_paid=invoice_total_paid,
+            status=invoice_status,
+            payments=payments
         ))
     
+    return result, next_cursor
+
+@router.get("/invoices", response_model=List[InvoiceResponse])
+def get_invoices(
+    response: Response,
+    project_id: Optional[int] = None,
+    status: Optional[str] = None,
+    include: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get invoices (newest first) - Project Leads see their invoices, Project Owners see invoices for their projects.
+    
+    status filters by paid/pending and include=payments embeds each invoice's
+    payments. When limit is given and more rows exist, the next page's cursor
+    is in the X-Next-Cursor header.
+    """
+    includes = {value.strip() for value in include.split(",") if value.strip()} if include else set()
+    if includes - set(INVOICE_INCLUDES):
+        raise HTTPException(status_code=400, detail=f"include must be one of: {', '.join(INVOICE_INCLUDES)}")
+    
+    result, next_cursor = list_invoices(
+        db, current_user,
+        project_id=project_id,
+        status=status,
+        include_payments="payments" in includes,
+        limit=limit,
+        cursor=cursor
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return result
 
 @router.get("/invoices/{invoice_id}", response_model=InvoiceResponse)
@@ -230,39 +310,12 @@ def get_invoice_tasks(
     
     tasks = db.query(Task).filter(Task.id.in_(task_ids)).all()
     
-    result = []
-    for task in tasks:
-        # Calculate cumulative hours from approved timesheets
-        cumulative_hours = db.query(func.sum(Timesheet.hours)).filter(
-            Timesheet.task_id == task.id,
-            Timesheet.status == "approved"
-        ).scalar() or 0.0
-        
-        # Get assigned developers
-        assigned_devs = db.query(TaskDeveloper).filter(
-            TaskDeveloper.task_id == task.id
-        ).all()
-        assigned_developer_ids = [ad.developer_id for ad in assigned_devs]
-        
-        task_dict = {
-            "id": task.id,
-            "project_id": task.project_id,
-            "title": task.title,
-            "description": task.description,
-            "status": task.status,
-            "estimation_hours": task.estimation_hours,
-            "billable_hours": task.billable_hours,
-            "productivity_hours": task.productivity_hours,
-            "track_summary": task.track_summary,
-            "cumulative_worked_hours": float(cumulative_hours),
-            "assigned_developer_ids": assigned_developer_ids,
-            "is_paid": True,  # Tasks in invoice are already billed
-            "created_at": task.created_at,
-            "updated_at": task.updated_at
-        }
-        result.append(TaskResponse(**task_dict))
+    # Tasks in invoice are already billed
+    enrichment = get_task_enrichment(db, task_ids)
+    for task_enrichment in enrichment.values():
+        task_enrichment["is_paid"] = True
     
-    return result
+    return [build_task_response(task, enrichment) for task in tasks]
 
 # ========== PAYMENT ENDPOINTS ==========
 
@@ -270,12 +323,21 @@ def get_invoice_tasks(
 @router.post("/payments/", response_model=PaymentResponse)
 def create_payment(
     payment: PaymentCreate,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(require_role(["project_owner"])),
     db: Session = Depends(get_db)
 ):
-    """Create a payment against an invoice (Project Owner only)"""
-    # Verify invoice exists
-    invoice = db.query(Invoice).filter(Invoice.id == payment.invoice_id).first()
+    """Create a payment against an invoice (Project Owner only).
+    
+    A retry with the same Idempotency-Key header returns the first response.
+    """
+    lock_for_write(db)
+    key_record = claim_idempotency_key(db, current_user.id, idempotency_key, "create_payment", payment)
+    if key_record and key_record.response_body is not None:
+        return replay_response(key_record)
+    
+    # Verify invoice exists; the row lock serializes concurrent payments on it
+    invoice = db.query(Invoice).filter(Invoice.id == payment.invoice_id).with_for_update().first()
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
     
@@ -305,22 +367,19 @@ def create_payment(
         created_by=current_user.id
     )
     db.add(db_payment)
-    db.commit()
+    db.flush()
+    
+    # Ledger entries are posted from the outbox, committed with the payment
+    enqueue_accounting_event(
+        db, "invoice_payment", current_user.id, invoice_id=invoice.id, payment_id=db_payment.id
+    )
     db.refresh(db_payment)
+    response = PaymentResponse.model_validate(db_payment)
+    store_idempotent_response(key_record, response)
+    db.commit()
+    notify_accounting_outbox()
     
-    # Record accounting entry for payment
-    try:
-        # Refresh invoice to ensure all relationships are available
-        db.refresh(invoice)
-        record_invoice_payment(db, db_payment, invoice, current_user.id)
-        db.commit()
-    except Exception as e:
-        # Log error but don't fail payment creation
-        import traceback
-        print(f"Error recording accounting entry for payment {db_payment.id}: {e}")
-        traceback.print_exc()
-    
-    return db_payment
+    return response
 
 @router.post("/payments/{payment_id}/upload-evidence")
 def upload_payment_evidence(
@@ -415,7 +474,8 @@ def get_project_payments(
     db: Session = Depends(get_db)
 ):
     """Legacy endpoint - returns invoices for a project"""
-    return get_invoices(project_id=project_id, current_user=current_user, db=db)
+    invoices, _ = list_invoices(db, current_user, project_id=project_id)
+    return invoices
 
 @router.get("/earnings/developer", response_model=List[DeveloperEarnings])
 def get_developer_earnings(
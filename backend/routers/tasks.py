@@ -1,14 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from sqlalchemy import func, and_, or_, insert, update
+from typing import List, Optional
+from datetime import datetime
+from collections import Counter
 from database import get_db
-from models import User, Task, Project, Timesheet, InvoiceTask, Invoice, Payment
-from schemas import TaskCreate, TaskResponse, TaskUpdateHours
+from models import User, Task, Project, Timesheet, InvoiceTask, Invoice, Payment, TaskDeveloper, TaskRollup, DeveloperProject
+from schemas import TaskCreate, TaskResponse, TaskUpdateHours, TaskUpdate, TaskBulkItemResult, TaskBulkResult
 from auth import get_current_active_user, require_role, has_super_admin_access, can_act_as_developer
+from pagination import NEXT_CURSOR_HEADER, MAX_PAGE_SIZE, encode_cursor, decode_cursor, keyset_after
 
 router = APIRouter()
 
+def get_task_enrichment(db: Session, task_ids: List[int]) -> dict:
+    """Load cumulative approved hours, assigned developers and billed status for a set of tasks.
+    
+    Runs a fixed number of grouped queries regardless of how many task ids are passed.
+    """
+    enrichment = {
+        task_id: {"cumulative_worked_hours": 0.0, "assigned_developer_ids": [], "is_paid": False}
+        for task_id in task_ids
+    }
+    if not enrichment:
+        return enrichment
+    
+    ids = list(enrichment.keys())
+    
+    # Approved hours and billing state come from the precomputed rollups
+    rollup_rows = db.query(
+        TaskRollup.task_id, TaskRollup.approved_hours, TaskRollup.billed_invoice_id
+    ).filter(TaskRollup.task_id.in_(ids)).all()
+    for task_id, approved_hours, billed_invoice_id in rollup_rows:
+        enrichment[task_id]["cumulative_worked_hours"] = float(approved_hours or 0.0)
+        enrichment[task_id]["is_paid"] = billed_invoice_id is not None  # Task is billed if linked to any invoice
+    
+    # Assigned developers
+    assignment_rows = db.query(TaskDeveloper.task_id, TaskDeveloper.developer_id).filter(
+        TaskDeveloper.task_id.in_(ids)
+    ).order_by(TaskDeveloper.id).all()
+    for task_id, developer_id in assignment_rows:
+        enrichment[task_id]["assigned_developer_ids"].append(developer_id)
+    
+    return enrichment
+
+def build_task_response(task: Task, enrichment: dict) -> TaskResponse:
+    """Build a TaskResponse from a task and its entry in get_task_enrichment()"""
+    task_enrichment = enrichment.get(task.id, {})
+    return TaskResponse(
+        id=task.id,
+        project_id=task.project_id,
+        title=task.title,
+        description=task.description,
+        status=task.status,
+        estimation_hours=task.estimation_hours,
+        billable_hours=task.billable_hours,
+        productivity_hours=task.productivity_hours,
+        track_summary=task.track_summary,
+        cumulative_worked_hours=task_enrichment.get("cumulative_worked_hours", 0.0),
+        assigned_developer_ids=task_enrichment.get("assigned_developer_ids", []),
+        is_paid=task_enrichment.get("is_paid", False),
+        created_at=task.created_at,
+        updated_at=task.updated_at
+    )
+
+def build_task_responses(db: Session, tasks: List[Task]) -> List[TaskResponse]:
+    """Build TaskResponses for a list of tasks using a single enrichment pass"""
+    enrichment = get_task_enrichment(db, [task.id for task in tasks])
+    return [build_task_response(task, enrichment) for task in tasks]
+
 @router.post("", response_model=TaskResponse)
 @router.post("/", response_model=TaskResponse)
 def create_task(
@@ -34,6 +93,136 @@ def create_task(
     db.refresh(db_task)
     return db_task
 
+MAX_BULK_TASKS = 1000
+TASK_STATUSES = ["todo", "in_progress", "testing", "completed"]
+# Columns that reject NULL; an explicit null in a bulk update is a per-item error
+NON_NULLABLE_UPDATE_FIELDS = ("title", "status", "estimation_hours")
+
+def validate_task_update(values: dict) -> Optional[str]:
+    """Return the error for a bulk update item, or None if it can be applied."""
+    for field in NON_NULLABLE_UPDATE_FIELDS:
+        if field in values and values[field] is None:
+            return f"{field} cannot be null"
+    if "status" in values and values["status"] not in TASK_STATUSES:
+        return f"Invalid status. Must be one of: {TASK_STATUSES}"
+    return None
+
+def get_editable_project_ids(db: Session, current_user: User, project_ids: List[int]) -> set:
+    """Return the subset of project_ids the user may create or edit tasks in.
+    
+    Uses the same rules as create_task/update_task, with one query for the projects
+    and one for the user's developer assignments however many projects are passed.
+    """
+    existing_ids = {
+        project_id for (project_id,) in db.query(Project.id).filter(Project.id.in_(project_ids)).all()
+    }
+    if has_super_admin_access(current_user) or current_user.role.value == "project_lead":
+        return existing_ids
+    
+    # Other users must be assigned to the project as a developer
+    return {
+        project_id for (project_id,) in db.query(DeveloperProject.project_id).filter(
+            DeveloperProject.project_id.in_(existing_ids),
+            DeveloperProject.developer_id == current_user.id
+        ).all()
+    }
+
+@router.post("/bulk", response_model=TaskBulkResult)
+def bulk_create_tasks(
+    tasks: List[TaskCreate],
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Create many tasks in one transaction, returning a result per item"""
+    if len(tasks) > MAX_BULK_TASKS:
+        raise HTTPException(status_code=400, detail=f"Too many tasks. Maximum is {MAX_BULK_TASKS} per request")
+    
+    # Check access once per distinct project
+    allowed_project_ids = get_editable_project_ids(db, current_user, list({t.project_id for t in tasks}))
+    
+    results = [None] * len(tasks)
+    rows = []
+    row_indexes = []
+    for index, task in enumerate(tasks):
+        if task.project_id not in allowed_project_ids:
+            results[index] = TaskBulkItemResult(
+                index=index, success=False, error="Project not found or not authorized to create tasks for this project"
+            )
+            continue
+        rows.append(task.dict())
+        row_indexes.append(index)
+    
+    if rows:
+        # Single executemany INSERT ... RETURNING
+        created = db.scalars(insert(Task).returning(Task), rows).all()
+        db.flush()
+        for index, response in zip(row_indexes, build_task_responses(db, created)):
+            results[index] = TaskBulkItemResult(index=index, success=True, task=response)
+        db.commit()
+    
+    succeeded = len(rows)
+    return TaskBulkResult(succeeded=succeeded, failed=len(tasks) - succeeded, results=results)
+
+@router.patch("/bulk", response_model=TaskBulkResult)
+def bulk_update_tasks(
+    tasks: List[TaskUpdate],
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Update many tasks in one transaction, returning a result per item.
+    
+    Only the fields sent for an item are changed.
+    """
+    if len(tasks) > MAX_BULK_TASKS:
+        raise HTTPException(status_code=400, detail=f"Too many tasks. Maximum is {MAX_BULK_TASKS} per request")
+    
+    task_ids = list({t.id for t in tasks})
+    if len(task_ids) != len(tasks):
+        id_counts = Counter(t.id for t in tasks)
+        duplicates = sorted(task_id for task_id, count in id_counts.items() if count > 1)
+        raise HTTPException(status_code=400, detail=f"Duplicate task ids in request: {duplicates}")
+    
+    task_projects = dict(db.query(Task.id, Task.project_id).filter(Task.id.in_(task_ids)).all())
+    
+    # Check access once per distinct project
+    allowed_project_ids = get_editable_project_ids(db, current_user, list(set(task_projects.values())))
+    
+    results = [None] * len(tasks)
+    rows = []
+    row_indexes = []
+    for index, task_update in enumerate(tasks):
+        if task_update.id not in task_projects:
+            results[index] = TaskBulkItemResult(index=index, success=False, error="Task not found")
+            continue
+        if task_projects[task_update.id] not in allowed_project_ids:
+            results[index] = TaskBulkItemResult(index=index, success=False, error="Not authorized to edit tasks")
+            continue
+        values = task_update.dict(exclude_unset=True)
+        error = validate_task_update(values)
+        if error:
+            results[index] = TaskBulkItemResult(index=index, success=False, error=error)
+            continue
+        rows.append(values)
+        row_indexes.append(index)
+    
+    if rows:
+        # Executemany UPDATE by primary key
+        db.execute(update(Task), rows)
+        db.flush()
+        updated = {
+            task.id: task
+            for task in db.query(Task).filter(
+                Task.id.in_([row["id"] for row in rows])
+            ).populate_existing().all()
+        }
+        responses = {response.id: response for response in build_task_responses(db, list(updated.values()))}
+        for index, row in zip(row_indexes, rows):
+            results[index] = TaskBulkItemResult(index=index, success=True, task=responses[row["id"]])
+        db.commit()
+    
+    succeeded = len(rows)
+    return TaskBulkResult(succeeded=succeeded, failed=len(tasks) - succeeded, results=results)
+
 @router.get("/project/{project_id}", response_model=List[TaskResponse])
 def get_project_tasks(
     project_id: int,
@@ -63,48 +252,7 @@ def get_project_tasks(
                 raise HTTPException(status_code=403, detail="Not authorized")
         tasks = db.query(Task).filter(Task.project_id == project_id).all()
     
-    # Calculate cumulative worked hours for each task
-    from models import TaskDeveloper
-    result = []
-    for task in tasks:
-        # Calculate cumulative hours from approved timesheets
-        cumulative_hours = db.query(func.sum(Timesheet.hours)).filter(
-            Timesheet.task_id == task.id,
-            Timesheet.status == "approved"
-        ).scalar() or 0.0
-        
-        # Get assigned developers
-        assigned_devs = db.query(TaskDeveloper).filter(
-            TaskDeveloper.task_id == task.id
-        ).all()
-        assigned_developer_ids = [ad.developer_id for ad in assigned_devs]
-        
-        # Check if task is linked to an invoice (billed)
-        invoice_task = db.query(InvoiceTask).filter(
-            InvoiceTask.task_id == task.id
-        ).first()
-        is_paid = invoice_task is not None  # Task is billed if linked to any invoice
-        
-        # Create task dict with cumulative hours
-        task_dict = {
-            "id": task.id,
-            "project_id": task.project_id,
-            "title": task.title,
-            "description": task.description,
-            "status": task.status,
-            "estimation_hours": task.estimation_hours,
-            "billable_hours": task.billable_hours,
-            "productivity_hours": task.productivity_hours,
-            "track_summary": task.track_summary,
-            "cumulative_worked_hours": float(cumulative_hours),
-            "assigned_developer_ids": assigned_developer_ids,
-            "is_paid": is_paid,
-            "created_at": task.created_at,
-            "updated_at": task.updated_at
-        }
-        result.append(TaskResponse(**task_dict))
-    
-    return result
+    return build_task_responses(db, tasks)
 
 @router.get("/{task_id}", response_model=TaskResponse)
 def get_task(
@@ -112,8 +260,6 @@ def get_task(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    from models import TaskDeveloper
-    
     task = db.query(Task).filter(Task.id == task_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
@@ -124,40 +270,7 @@ def get_task(
         if not any(dp.developer_id == current_user.id for dp in project.developer_projects):
             raise HTTPException(status_code=403, detail="Not authorized")
     
-    # Get assigned developers
-    assigned_devs = db.query(TaskDeveloper).filter(
-        TaskDeveloper.task_id == task.id
-    ).all()
-    assigned_developer_ids = [ad.developer_id for ad in assigned_devs]
-    
-    # Calculate cumulative hours
-    cumulative_hours = db.query(func.sum(Timesheet.hours)).filter(
-        Timesheet.task_id == task.id,
-        Timesheet.status == "approved"
-    ).scalar() or 0.0
-    
-    # Check if task is linked to an invoice (billed)
-    invoice_task = db.query(InvoiceTask).filter(
-        InvoiceTask.task_id == task.id
-    ).first()
-    is_paid = invoice_task is not None  # Task is billed if linked to any invoice
-    
-    task_dict = {
-        "id": task.id,
-        "project_id": task.project_id,
-        "title": task.title,
-        "description": task.description,
-        "status": task.status,
-        "estimation_hours": task.estimation_hours,
-        "billable_hours": task.billable_hours,
-        "productivity_hours": task.productivity_hours,
-        "cumulative_worked_hours": float(cumulative_hours),
-        "assigned_developer_ids": assigned_developer_ids,
-        "is_paid": is_paid,
-        "created_at": task.created_at,
-        "updated_at": task.updated_at
-    }
-    return TaskResponse(**task_dict)
+    return build_task_responses(db, [task])[0]
 
 @router.put("/{task_id}", response_model=TaskResponse)
 def update_task(
@@ -184,35 +297,7 @@ def update_task(
     db.commit()
     db.refresh(db_task)
     
-    # Calculate cumulative hours
-    from models import TaskDeveloper
-    cumulative_hours = db.query(func.sum(Timesheet.hours)).filter(
-        Timesheet.task_id == db_task.id,
-        Timesheet.status == "approved"
-    ).scalar() or 0.0
-    
-    # Get assigned developers
-    assigned_devs = db.query(TaskDeveloper).filter(
-        TaskDeveloper.task_id == db_task.id
-    ).all()
-    assigned_developer_ids = [ad.developer_id for ad in assigned_devs]
-    
-    task_dict = {
-        "id": db_task.id,
-        "project_id": db_task.project_id,
-        "title": db_task.title,
-        "description": db_task.description,
-        "status": db_task.status,
-        "estimation_hours": db_task.estimation_hours,
-        "billable_hours": db_task.billable_hours,
-        "productivity_hours": db_task.productivity_hours,
-        "track_summary": db_task.track_summary,
-        "cumulative_worked_hours": float(cumulative_hours),
-        "assigned_developer_ids": assigned_developer_ids,
-        "created_at": db_task.created_at,
-        "updated_at": db_task.updated_at
-    }
-    return TaskResponse(**task_dict)
+    return build_task_responses(db, [db_task])[0]
 
 @router.put("/{task_id}/hours", response_model=TaskResponse)
 def update_task_hours(
@@ -254,174 +339,133 @@ def update_task_hours(
     db.commit()
     db.refresh(db_task)
     
-    # Calculate cumulative hours
-    from models import TaskDeveloper
-    cumulative_hours = db.query(func.sum(Timesheet.hours)).filter(
-        Timesheet.task_id == db_task.id,
-        Timesheet.status == "approved"
-    ).scalar() or 0.0
-    
-    # Get assigned developers
-    assigned_devs = db.query(TaskDeveloper).filter(
-        TaskDeveloper.task_id == db_task.id
-    ).all()
-    assigned_developer_ids = [ad.developer_id for ad in assigned_devs]
-    
-    # Check if task is linked to an invoice (billed)
-    invoice_task = db.query(InvoiceTask).filter(
-        InvoiceTask.task_id == db_task.id
-    ).first()
-    is_paid = invoice_task is not None  # Task is billed if linked to any invoice
-    
-    task_dict = {
-        "id": db_task.id,
-        "project_id": db_task.project_id,
-        "title": db_task.title,
-        "description": db_task.description,
-        "status": db_task.status,
-        "estimation_hours": db_task.estimation_hours,
-        "billable_hours": db_task.billable_hours,
-        "productivity_hours": db_task.productivity_hours,
-        "track_summary": db_task.track_summary,
-        "cumulative_worked_hours": float(cumulative_hours),
-        "assigned_developer_ids": assigned_developer_ids,
-        "is_paid": is_paid,
-        "created_at": db_task.created_at,
-        "updated_at": db_task.updated_at
-    }
-    return TaskResponse(**task_dict)
+    return build_task_responses(db, [db_task])[0]
+
+# Ids are assigned in creation order, so sorting by id is sorting by creation time
+TASK_SORT_COLUMNS = {"id": Task.id, "project_id": Task.project_id}
+
+def filter_and_paginate_tasks(
+    db: Session,
+    query,
+    response: Response,
+    project_id: Optional[int] = None,
+    status: Optional[str] = None,
+    billed: Optional[bool] = None,
+    developer_id: Optional[int] = None,
+    updated_since: Optional[datetime] = None,
+    sort_by: str = "id",
+    order: str = "asc",
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> List[TaskResponse]:
+    """Apply the task list filters, sorting and keyset pagination in SQL.
+    
+    When limit is given and more rows exist, the cursor for the next page is
+    returned in the X-Next-Cursor response header.
+    """
+    if sort_by not in TASK_SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort_by. Must be one of: {list(TASK_SORT_COLUMNS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Invalid order. Must be 'asc' or 'desc'")
+    
+    if project_id:
+        query = query.filter(Task.project_id == project_id)
+    if status:
+        query = query.filter(Task.status == status)
+    if billed is not None:
+        billed_task_ids = db.query(TaskRollup.task_id).filter(TaskRollup.billed_invoice_id.isnot(None))
+        if billed:
+            query = query.filter(Task.id.in_(billed_task_ids))
+        else:
+            query = query.filter(Task.id.notin_(billed_task_ids))
+    if developer_id:
+        query = query.filter(Task.id.in_(
+            db.query(TaskDeveloper.task_id).filter(TaskDeveloper.developer_id == developer_id)
+        ))
+    if updated_since:
+        # Tasks that were never updated count as updated when created
+        query = query.filter(or_(
+            Task.updated_at >= updated_since,
+            and_(Task.updated_at.is_(None), Task.created_at >= updated_since)
+        ))
+    
+    descending = order == "desc"
+    sort_columns = [TASK_SORT_COLUMNS[sort_by]] if sort_by == "id" else [TASK_SORT_COLUMNS[sort_by], Task.id]
+    if cursor:
+        query = query.filter(keyset_after(sort_columns, decode_cursor(cursor, len(sort_columns)), descending))
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in sort_columns])
+    
+    if limit is None:
+        return build_task_responses(db, query.all())
+    
+    # Fetch one extra row to know whether another page exists
+    tasks = query.limit(limit + 1).all()
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        last = tasks[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([getattr(last, column.key) for column in sort_columns])
+    
+    return build_task_responses(db, tasks)
 
 @router.get("/lead/all-tasks", response_model=List[TaskResponse])
 def get_lead_all_tasks(
+    response: Response,
+    project_id: Optional[int] = None,
+    status: Optional[str] = None,
+    billed: Optional[bool] = None,
+    developer_id: Optional[int] = None,
+    updated_since: Optional[datetime] = None,
+    sort_by: str = "id",
+    order: str = "asc",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: User = Depends(require_role(["project_lead", "super_admin"])),
     db: Session = Depends(get_db)
 ):
-    """Get all tasks for projects led by the current project lead, with billing status"""
-    from models import TaskDeveloper
-    from sqlalchemy.orm import joinedload
-    
-    # Get all projects led by this user
-    if has_super_admin_access(current_user):
-        projects = db.query(Project).all()
-    else:
-        projects = db.query(Project).filter(Project.project_lead_id == current_user.id).all()
-    
-    if not projects:
-        return []
-    
-    project_ids = [p.id for p in projects]
-    
-    # Get all tasks for these projects
-    tasks = db.query(Task).options(
-        joinedload(Task.project)
-    ).filter(Task.project_id.in_(project_ids)).all()
-    
-    # Build response with billing status
-    result = []
-    for task in tasks:
-        # Calculate cumulative hours
-        cumulative_hours = db.query(func.sum(Timesheet.hours)).filter(
-            Timesheet.task_id == task.id,
-            Timesheet.status == "approved"
-        ).scalar() or 0.0
-        
-        # Get assigned developers
-        assigned_devs = db.query(TaskDeveloper).filter(
-            TaskDeveloper.task_id == task.id
-        ).all()
-        assigned_developer_ids = [ad.developer_id for ad in assigned_devs]
-        
-        # Check if task is linked to an invoice (billed)
-        invoice_task = db.query(InvoiceTask).filter(
-            InvoiceTask.task_id == task.id
-        ).first()
-        is_paid = invoice_task is not None  # Task is billed if linked to any invoice
-        
-        task_dict = {
-            "id": task.id,
-            "project_id": task.project_id,
-            "title": task.title,
-            "description": task.description,
-            "status": task.status,
-            "estimation_hours": task.estimation_hours,
-            "billable_hours": task.billable_hours,
-            "productivity_hours": task.productivity_hours,
-            "track_summary": task.track_summary,
-            "cumulative_worked_hours": float(cumulative_hours),
-            "assigned_developer_ids": assigned_developer_ids,
-            "is_paid": is_paid,
-            "created_at": task.created_at,
-            "updated_at": task.updated_at
-        }
-        result.append(TaskResponse(**task_dict))
-    
-    return result
+    """Get tasks for projects led by the current project lead, with billing status.
+    
+    Supports server-side filters and keyset pagination (see filter_and_paginate_tasks).
+    """
+    # Get all tasks for projects led by this user
+    query = db.query(Task)
+    if not has_super_admin_access(current_user):
+        query = query.join(Project).filter(Project.project_lead_id == current_user.id)
+    
+    return filter_and_paginate_tasks(
+        db, query, response,
+        project_id=project_id, status=status, billed=billed, developer_id=developer_id,
+        updated_since=updated_since, sort_by=sort_by, order=order, limit=limit, cursor=cursor
+    )
 
 @router.get("/owner/all-tasks", response_model=List[TaskResponse])
 def get_owner_all_tasks(
+    response: Response,
+    project_id: Optional[int] = None,
+    status: Optional[str] = None,
+    billed: Optional[bool] = None,
+    developer_id: Optional[int] = None,
+    updated_since: Optional[datetime] = None,
+    sort_by: str = "id",
+    order: str = "asc",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: User = Depends(require_role(["project_owner", "super_admin"])),
     db: Session = Depends(get_db)
 ):
-    """Get all tasks for projects owned by the current project owner, with billing status"""
-    from models import TaskDeveloper
-    from sqlalchemy.orm import joinedload
-    
-    # Get all projects owned by this user
-    if has_super_admin_access(current_user):
-        projects = db.query(Project).all()
-    else:
-        projects = db.query(Project).filter(Project.project_owner_id == current_user.id).all()
-    
-    if not projects:
-        return []
-    
-    project_ids = [p.id for p in projects]
-    
-    # Get all tasks for these projects
-    tasks = db.query(Task).options(
-        joinedload(Task.project)
-    ).filter(Task.project_id.in_(project_ids)).all()
-    
-    # Build response with billing status
-    result = []
-    for task in tasks:
-        # Calculate cumulative hours
-        cumulative_hours = db.query(func.sum(Timesheet.hours)).filter(
-            Timesheet.task_id == task.id,
-            Timesheet.status == "approved"
-        ).scalar() or 0.0
-        
-        # Get assigned developers
-        assigned_devs = db.query(TaskDeveloper).filter(
-            TaskDeveloper.task_id == task.id
-        ).all()
-        assigned_developer_ids = [ad.developer_id for ad in assigned_devs]
-        
-        # Check if task is linked to an invoice (billed)
-        invoice_task = db.query(InvoiceTask).filter(
-            InvoiceTask.task_id == task.id
-        ).first()
-        is_paid = invoice_task is not None  # Task is billed if linked to any invoice
-        
-        task_dict = {
-            "id": task.id,
-            "project_id": task.project_id,
-            "title": task.title,
-            "description": task.description,
-            "status": task.status,
-            "estimation_hours": task.estimation_hours,
-            "billable_hours": task.billable_hours,
-            "productivity_hours": task.productivity_hours,
-            "track_summary": task.track_summary,
-            "cumulative_worked_hours": float(cumulative_hours),
-            "assigned_developer_ids": assigned_developer_ids,
-            "is_paid": is_paid,
-            "created_at": task.created_at,
-            "updated_at": task.updated_at
-        }
-        result.append(TaskResponse(**task_dict))
-    
-    return result
+    """Get tasks for projects owned by the current project owner, with billing status.
+    
+    Supports server-side filters and keyset pagination (see filter_and_paginate_tasks).
+    """
+    # Get all tasks for projects owned by this user
+    query = db.query(Task)
+    if not has_super_admin_access(current_user):
+        query = query.join(Project).filter(Project.project_owner_id == current_user.id)
+    
+    return filter_and_paginate_tasks(
+        db, query, response,
+        project_id=project_id, status=status, billed=billed, developer_id=developer_id,
+        updated_since=updated_since, sort_by=sort_by, order=order, limit=limit, cursor=cursor
+    )
 
 @router.get("/developer/my-tasks", response_model=List[dict])
 def get_developer_tasks(
@@ -589,9 +633,8 @@ def update_task_status(
         raise HTTPException(status_code=404, detail="Task not found")
     
     # Validate status
-    valid_statuses = ["todo", "in_progress", "testing", "completed"]
-    if status not in valid_statuses:
-        raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {valid_statuses}")
+    if status not in TASK_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {TASK_STATUSES}")
     
     # Check if user is assigned to the project
     project = db_task.project
@@ -604,42 +647,7 @@ def update_task_status(
     db.commit()
     db.refresh(db_task)
     
-    # Calculate cumulative hours
-    cumulative_hours = db.query(func.sum(Timesheet.hours)).filter(
-        Timesheet.task_id == db_task.id,
-        Timesheet.status == "approved"
-    ).scalar() or 0.0
-    
-    # Get assigned developers (if needed)
-    from models import TaskDeveloper
-    assigned_devs = db.query(TaskDeveloper).filter(
-        TaskDeveloper.task_id == db_task.id
-    ).all()
-    assigned_developer_ids = [ad.developer_id for ad in assigned_devs]
-    
-    # Check if task is linked to an invoice (billed)
-    invoice_task = db.query(InvoiceTask).filter(
-        InvoiceTask.task_id == db_task.id
-    ).first()
-    is_paid = invoice_task is not None  # Task is billed if linked to any invoice
-    
-    task_dict = {
-        "id": db_task.id,
-        "project_id": db_task.project_id,
-        "title": db_task.title,
-        "description": db_task.description,
-        "status": db_task.status,
-        "estimation_hours": db_task.estimation_hours,
-        "billable_hours": db_task.billable_hours,
-        "productivity_hours": db_task.productivity_hours,
-        "track_summary": db_task.track_summary,
-        "cumulative_worked_hours": float(cumulative_hours),
-        "assigned_developer_ids": assigned_developer_ids,
-        "is_paid": is_paid,
-        "created_at": db_task.created_at,
-        "updated_at": db_task.updated_at
-    }
-    return TaskResponse(**task_dict)
+    return build_task_responses(db, [db_task])[0]
 
 @router.delete("/{task_id}")
 def delete_task(
@@ -1,11 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
-from datetime import datetime
-from database import get_db
-from models import User, Timesheet, Project, Task, TimesheetStatus
-from schemas import TimesheetCreate, TimesheetResponse
+from datetime import datetime, date, time, timedelta
+import csv
+import io
+import json
+from database import get_db, SessionLocal
+from models import User, Timesheet, Project, Task, TimesheetStatus, DeveloperProject
+from schemas import (
+    TimesheetCreate, TimesheetResponse, TimesheetBatchValidate, TimesheetBatchValidateResult,
+    TimesheetWeekSubmit, TimesheetWeekResult
+)
 from auth import get_current_active_user, require_role
+from task_rollups import refresh_task_rollups
+from pagination import NEXT_CURSOR_HEADER, MAX_PAGE_SIZE, encode_cursor, decode_cursor, keyset_after
 
 router = APIRouter()
 
@@ -37,43 +48,421 @@ def create_timesheet(
         status=TimesheetStatus.PENDING
     )
     db.add(db_timesheet)
+    refresh_task_rollups(db, [db_timesheet.task_id])
     db.commit()
     db.refresh(db_timesheet)
     return db_timesheet
 
-@router.get("", response_model=List[TimesheetResponse])
-@router.get("/", response_model=List[TimesheetResponse])
-def get_timesheets(
+def get_timesheet_filters(
+    current_user: User,
     project_id: Optional[int] = None,
     task_id: Optional[int] = None,
     status: Optional[str] = None,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    user_id: Optional[int] = None,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None
 ):
+    """Build the WHERE conditions for timesheet listings, including role-based visibility.
+    
+    Returns (conditions, join_project); when join_project is True the conditions
+    reference Project and the statement must join it. Project owners get a 403.
+    """
     # Project owners cannot see timesheets
     if current_user.role.value == "project_owner":
         raise HTTPException(status_code=403, detail="Project owners cannot access timesheets")
     
-    query = db.query(Timesheet).options(joinedload(Timesheet.user))
+    conditions = []
+    join_project = False
     
     # Filter by user if developer
     if current_user.role.value == "developer":
-        query = query.filter(Timesheet.user_id == current_user.id)
+        conditions.append(Timesheet.user_id == current_user.id)
     elif current_user.role.value == "project_lead":
         # Project leads see timesheets for their projects
-        query = query.join(Project).filter(Project.project_lead_id == current_user.id)
+        join_project = True
+        conditions.append(Project.project_lead_id == current_user.id)
     
     if project_id:
-        query = query.filter(Timesheet.project_id == project_id)
+        conditions.append(Timesheet.project_id == project_id)
     
     if task_id:
-        query = query.filter(Timesheet.task_id == task_id)
+        conditions.append(Timesheet.task_id == task_id)
     
     if status:
-        query = query.filter(Timesheet.status == status)
+        conditions.append(Timesheet.status == status)
+    
+    if user_id:
+        conditions.append(Timesheet.user_id == user_id)
+    
+    conditions.extend(get_date_range_conditions(from_date, to_date))
+    
+    return conditions, join_project
+
+def get_date_range_conditions(from_date: Optional[date] = None, to_date: Optional[date] = None) -> list:
+    """Inclusive calendar dates as a half-open range on the date column.
+    
+    Timesheet dates may carry a time part, so to_date matches everything before
+    midnight of the following day.
+    """
+    conditions = []
+    if from_date:
+        conditions.append(Timesheet.date >= datetime.combine(from_date, time.min))
+    
+    if to_date:
+        conditions.append(Timesheet.date < datetime.combine(to_date + timedelta(days=1), time.min))
+    
+    return conditions
+
+# Columns that can be requested with the fields= projection on GET /timesheets
+TIMESHEET_FIELDS = {
+    column.key: column for column in (
+        Timesheet.id, Timesheet.user_id, Timesheet.project_id, Timesheet.task_id, Timesheet.date,
+        Timesheet.hours, Timesheet.description, Timesheet.status, Timesheet.validated_by,
+        Timesheet.validated_at, Timesheet.created_at
+    )
+}
+
+@router.get("", response_model=List[TimesheetResponse])
+@router.get("/", response_model=List[TimesheetResponse])
+def get_timesheets(
+    response: Response,
+    project_id: Optional[int] = None,
+    task_id: Optional[int] = None,
+    status: Optional[str] = None,
+    user_id: Optional[int] = None,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get timesheets, newest first.
+    
+    from_date/to_date are inclusive calendar dates. With limit, results are keyset
+    paginated on (date, id) and the next cursor is returned in X-Next-Cursor.
+    fields= (comma separated column names) returns only those columns, selected
+    directly without loading the user relationship.
+    """
+    projection = None
+    if fields:
+        projection = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in projection if name not in TIMESHEET_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {unknown}. Must be among: {list(TIMESHEET_FIELDS)}")
+        if "id" not in projection:
+            projection.insert(0, "id")
+    
+    conditions, join_project = get_timesheet_filters(
+        current_user, project_id, task_id, status, user_id, from_date, to_date
+    )
+    
+    sort_columns = [Timesheet.date, Timesheet.id]
+    if cursor:
+        conditions.append(keyset_after(sort_columns, decode_cursor(cursor, len(sort_columns)), descending=True))
+    
+    if projection is not None:
+        # Core select of only the requested columns (plus the sort keys for the cursor)
+        stmt = select(*[TIMESHEET_FIELDS[name] for name in projection], Timesheet.date.label("_cursor_date"))
+        stmt = stmt.select_from(Timesheet)
+        if join_project:
+            stmt = stmt.join(Project, Timesheet.project_id == Project.id)
+    else:
+        stmt = select(Timesheet).options(joinedload(Timesheet.user))
+        if join_project:
+            stmt = stmt.join(Project, Timesheet.project_id == Project.id)
+    
+    stmt = stmt.where(*conditions).order_by(Timesheet.date.desc(), Timesheet.id.desc())
+    if limit is not None:
+        # Fetch one extra row to know whether another page exists
+        stmt = stmt.limit(limit + 1)
+    
+    if projection is not None:
+        rows = db.execute(stmt).mappings().all()
+    else:
+        rows = db.execute(stmt).unique().scalars().all()
+    
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if projection is not None:
+            next_cursor = encode_cursor([last["_cursor_date"], last["id"]])
+        else:
+            next_cursor = encode_cursor([last.date, last.id])
+    
+    if projection is None:
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return rows
+    
+    result = JSONResponse(content=jsonable_encoder([
+        {name: row[name] for name in projection} for row in rows
+    ]))
+    if next_cursor:
+        result.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return result
+
+EXPORT_FORMATS = ("csv", "jsonl")
+EXPORT_COLUMNS = [
+    "id", "date", "user_id", "user_name", "project_id", "project_name",
+    "task_id", "task_title", "hours", "status", "description", "validated_at"
+]
+EXPORT_BATCH_SIZE = 1000
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, TimesheetStatus):
+        return value.value
+    return value
+
+def _stream_timesheet_export(stmt, export_format: str):
+    """Yield the export in chunks, reading rows through a server-side cursor.
+    
+    Uses its own session because the response body is produced after the
+    request handler has returned.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+        for partition in result.mappings().partitions():
+            if export_format == "csv":
+                for row in partition:
+                    writer.writerow([_export_value(row[column]) for column in EXPORT_COLUMNS])
+                chunk = buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+            else:
+                chunk = "".join(
+                    json.dumps({column: _export_value(row[column]) for column in EXPORT_COLUMNS}) + "\n"
+                    for row in partition
+                )
+            yield chunk
+        if export_format == "csv" and buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+@router.get("/export")
+def export_timesheets(
+    format: str = "csv",
+    project_id: Optional[int] = None,
+    task_id: Optional[int] = None,
+    status: Optional[str] = None,
+    user_id: Optional[int] = None,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Stream timesheets as CSV or JSON Lines with user, task and project names.
+    
+    Applies the same visibility rules and filters as GET /timesheets. Rows are
+    streamed in batches so memory use does not grow with the export size.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {list(EXPORT_FORMATS)}")
+    
+    conditions, _ = get_timesheet_filters(
+        current_user, project_id, task_id, status, user_id, from_date, to_date
+    )
+    
+    stmt = select(
+        Timesheet.id,
+        Timesheet.date,
+        Timesheet.user_id,
+        User.full_name.label("user_name"),
+        Timesheet.project_id,
+        Project.name.label("project_name"),
+        Timesheet.task_id,
+        Task.title.label("task_title"),
+        Timesheet.hours,
+        Timesheet.status,
+        Timesheet.description,
+        Timesheet.validated_at
+    ).select_from(Timesheet).join(
+        User, Timesheet.user_id == User.id
+    ).join(
+        Project, Timesheet.project_id == Project.id
+    ).join(
+        Task, Timesheet.task_id == Task.id
+    ).where(*conditions).order_by(Timesheet.date, Timesheet.id)
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_timesheet_export(stmt, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="timesheets.{format}"'}
+    )
+
+@router.post("/week", response_model=TimesheetWeekResult)
+def submit_timesheet_week(
+    week: TimesheetWeekSubmit,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Save a task x day grid of the current user's timesheets for one week.
+    
+    Cells with hours are created or updated, cells with 0/empty hours delete the
+    existing entry. Only pending entries are changed; cells that already hold
+    approved or rejected entries are returned in locked. Everything is committed
+    in one transaction.
+    """
+    week_start = datetime.combine(week.week_start.date(), time.min)
+    week_end = week_start + timedelta(days=7)
     
-    timesheets = query.all()
-    return timesheets
+    cells = {}
+    for cell in week.cells:
+        day = cell.date.date()
+        if not week_start.date() <= day < week_end.date():
+            raise HTTPException(status_code=400, detail=f"Date {day} is outside the submitted week")
+        if cell.hours is not None and cell.hours < 0:
+            raise HTTPException(status_code=400, detail="Hours cannot be negative")
+        # The last value sent for a cell wins
+        cells[(cell.task_id, day)] = cell
+    
+    task_ids = {task_id for task_id, _ in cells}
+    if not task_ids:
+        return TimesheetWeekResult(created=0, updated=0, deleted=0, unchanged=0)
+    
+    # Task existence and project membership in a single query
+    access_rows = db.query(Task.id, Task.project_id, DeveloperProject.id).outerjoin(
+        DeveloperProject,
+        (DeveloperProject.project_id == Task.project_id) & (DeveloperProject.developer_id == current_user.id)
+    ).filter(Task.id.in_(task_ids)).all()
+    task_projects = {}
+    for task_id, project_id, membership_id in access_rows:
+        if current_user.role.value != "project_lead" and membership_id is None:
+            raise HTTPException(status_code=403, detail=f"Not authorized to create timesheet for the project of task {task_id}")
+        task_projects[task_id] = project_id
+    missing = sorted(task_ids - set(task_projects))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Tasks not found: {missing}")
+    
+    # Existing entries for the grid, grouped by cell
+    existing = {}
+    for db_timesheet in db.query(Timesheet).filter(
+        Timesheet.user_id == current_user.id,
+        Timesheet.task_id.in_(task_ids),
+        Timesheet.date >= week_start,
+        Timesheet.date < week_end
+    ).order_by(Timesheet.id).all():
+        existing.setdefault((db_timesheet.task_id, db_timesheet.date.date()), []).append(db_timesheet)
+    
+    created = updated = deleted = unchanged = 0
+    locked = []
+    for key, cell in cells.items():
+        entries = existing.get(key, [])
+        if any(entry.status != TimesheetStatus.PENDING for entry in entries):
+            locked.append(cell)
+            continue
+        
+        if not cell.hours:
+            for entry in entries:
+                db.delete(entry)
+                deleted += 1
+            if not entries:
+                unchanged += 1
+            continue
+        
+        if not entries:
+            db.add(Timesheet(
+                user_id=current_user.id,
+                project_id=task_projects[cell.task_id],
+                task_id=cell.task_id,
+                date=datetime.combine(key[1], time.min),
+                hours=cell.hours,
+                description=cell.description,
+                status=TimesheetStatus.PENDING
+            ))
+            created += 1
+            continue
+        
+        # A cell maps to one entry; extra pending entries for the same day are merged into it
+        entry, duplicates = entries[0], entries[1:]
+        for duplicate in duplicates:
+            db.delete(duplicate)
+            deleted += 1
+        if entry.hours != cell.hours or entry.description != cell.description or duplicates:
+            entry.hours = cell.hours
+            entry.description = cell.description
+            updated += 1
+        else:
+            unchanged += 1
+    
+    if created or updated or deleted:
+        refresh_task_rollups(db, task_ids)
+        db.commit()
+    
+    return TimesheetWeekResult(
+        created=created,
+        updated=updated,
+        deleted=deleted,
+        unchanged=unchanged,
+        locked=locked
+    )
+
+@router.put("/validate-batch", response_model=TimesheetBatchValidateResult)
+def validate_timesheets_batch(
+    batch: TimesheetBatchValidate,
+    current_user: User = Depends(require_role(["project_lead"])),
+    db: Session = Depends(get_db)
+):
+    """Approve or reject many timesheets with one set-based UPDATE.
+    
+    Timesheets are selected either by explicit ids or by a filter (project and
+    date range, pending only). Only timesheets in projects led by the current
+    user are updated; requested ids that are not are returned in skipped_ids.
+    """
+    if not batch.timesheet_ids and not batch.project_id:
+        raise HTTPException(status_code=400, detail="Provide timesheet_ids or a project_id filter")
+    
+    # Lead ownership is checked with a single join
+    query = db.query(Timesheet.id, Timesheet.task_id).join(Project).filter(
+        Project.project_lead_id == current_user.id
+    )
+    requested_ids = set(batch.timesheet_ids or [])
+    if requested_ids:
+        query = query.filter(Timesheet.id.in_(requested_ids))
+    else:
+        query = query.filter(
+            Timesheet.project_id == batch.project_id,
+            Timesheet.status == TimesheetStatus.PENDING
+        )
+        query = query.filter(*get_date_range_conditions(
+            batch.from_date.date() if batch.from_date else None,
+            batch.to_date.date() if batch.to_date else None
+        ))
+    
+    rows = query.all()
+    timesheet_ids = [timesheet_id for timesheet_id, _ in rows]
+    skipped_ids = sorted(requested_ids - set(timesheet_ids))
+    
+    new_status = TimesheetStatus.APPROVED if batch.approved else TimesheetStatus.REJECTED
+    updated = 0
+    if timesheet_ids:
+        updated = db.query(Timesheet).filter(Timesheet.id.in_(timesheet_ids)).update(
+            {
+                Timesheet.status: new_status,
+                Timesheet.validated_by: current_user.id,
+                Timesheet.validated_at: datetime.utcnow()
+            },
+            synchronize_session=False
+        )
+        refresh_task_rollups(db, [task_id for _, task_id in rows])
+        db.commit()
+    
+    return TimesheetBatchValidateResult(
+        status=new_status,
+        matched=len(requested_ids) if requested_ids else len(timesheet_ids),
+        updated=updated,
+        skipped_ids=skipped_ids
+    )
 
 @router.get("/{timesheet_id}", response_model=TimesheetResponse)
 def get_timesheet(
@@ -117,6 +506,7 @@ def validate_timesheet(
     
     timesheet.validated_by = current_user.id
     timesheet.validated_at = datetime.utcnow()
+    refresh_task_rollups(db, [timesheet.task_id])
     
     db.commit()
     db.refresh(timesheet)
@@ -185,8 +575,10 @@ def update_timesheet(
         if not any(dp.developer_id == current_user.id for dp in project.developer_projects):
             raise HTTPException(status_code=403, detail="Not authorized to update timesheet for this project")
     
+    previous_task_id = db_timesheet.task_id
     for key, value in timesheet_update.dict().items():
         setattr(db_timesheet, key, value)
+    refresh_task_rollups(db, [previous_task_id, db_timesheet.task_id])
     
     db.commit()
     db.refresh(db_timesheet)
@@ -228,6 +620,7 @@ def delete_timesheet(
         raise HTTPException(status_code=403, detail="Not authorized to delete timesheets")
     
     db.delete(db_timesheet)
+    refresh_task_rollups(db, [db_timesheet.task_id])
     db.commit()
     return {"message": "Timesheet deleted successfully"}
 
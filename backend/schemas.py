@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, field_validator
 from typing import Optional, List, List
-from datetime import datetime
+from datetime import datetime, date
 import re
 from models import UserRole, TimesheetStatus, PaymentStatus, ProjectStatus
 
@@ -162,6 +162,25 @@ class TaskUpdateHours(BaseModel):
     productivity_hours: Optional[float] = None
     track_summary: Optional[str] = None  # Track summary for invoice
 
+class TaskUpdate(BaseModel):
+    """Partial task update used by the bulk endpoint - only fields that are sent are changed"""
+    id: int
+    title: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    estimation_hours: Optional[float] = None
+
+class TaskBulkItemResult(BaseModel):
+    index: int  # Position of the item in the request
+    success: bool
+    task: Optional[TaskResponse] = None
+    error: Optional[str] = None
+
+class TaskBulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[TaskBulkItemResult] = []
+
 # Timesheet Schemas
 class TimesheetBase(BaseModel):
     project_id: int
@@ -186,6 +205,39 @@ class TimesheetResponse(TimesheetBase):
     class Config:
         from_attributes = True
 
+class TimesheetBatchValidate(BaseModel):
+    """Approve or reject many timesheets at once, either by id or by filter"""
+    approved: bool
+    timesheet_ids: Optional[List[int]] = None  # Explicit ids (any status)
+    # Filter mode (used when timesheet_ids is not given) - only pending timesheets are matched
+    project_id: Optional[int] = None
+    from_date: Optional[datetime] = None
+    to_date: Optional[datetime] = None
+
+class TimesheetBatchValidateResult(BaseModel):
+    status: TimesheetStatus
+    matched: int  # Timesheets requested or matched by the filter
+    updated: int
+    skipped_ids: List[int] = []  # Requested ids that were not found or not authorized
+
+class TimesheetWeekCell(BaseModel):
+    task_id: int
+    date: datetime  # Day of the cell; the time part is ignored
+    hours: Optional[float] = None  # 0 or empty clears the cell
+    description: Optional[str] = None
+
+class TimesheetWeekSubmit(BaseModel):
+    """Task x day grid for the current user's week"""
+    week_start: datetime  # First day of the week; cells must fall within the following 7 days
+    cells: List[TimesheetWeekCell]
+
+class TimesheetWeekResult(BaseModel):
+    created: int
+    updated: int
+    deleted: int
+    unchanged: int
+    locked: List[TimesheetWeekCell] = []  # Cells with approved/rejected entries, left untouched
+
 # Invoice Schemas
 class InvoiceBase(BaseModel):
     project_id: int
@@ -204,6 +256,7 @@ class InvoiceResponse(InvoiceBase):
     created_by: int
     total_paid: Optional[float] = 0.0
     status: Optional[str] = "pending"  # Calculated: pending, paid (partial payments treated as pending)
+    payments: Optional[List[dict]] = None  # Only with GET /invoices?include=payments
     
     class Config:
         from_attributes = True
@@ -313,6 +366,25 @@ class DeveloperPaymentResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class DeveloperPaymentBatchCreate(BaseModel):
+    payments: List[DeveloperPaymentCreate]  # Several payments may target the same voucher
+
+class DeveloperPaymentBatchItem(BaseModel):
+    payment_id: int
+    voucher_id: int
+    developer_id: int
+    project_id: int
+    payment_amount: float
+    payment_date: datetime
+    voucher_total_paid: float  # After the batch
+    voucher_status: str  # pending, partial, paid
+
+class DeveloperPaymentBatchResponse(BaseModel):
+    payment_count: int
+    voucher_count: int
+    total_amount: float
+    payments: List[DeveloperPaymentBatchItem] = []
+
 class DeveloperWorkSummary(BaseModel):
     developer_id: int
     developer_name: str
@@ -348,6 +420,63 @@ class AccountingEntryResponse(AccountingEntryBase):
     class Config:
         from_attributes = True
 
+class LedgerEntryResponse(AccountingEntryResponse):
+    running_balance: float  # Balance after this entry, in the account's normal direction
+
+class LedgerDiscrepancyResponse(BaseModel):
+    id: int
+    run_id: int
+    check_type: str  # unbalanced_reference, unpaired_entries, missing_entries
+    transaction_type: Optional[str] = None
+    reference_number: Optional[str] = None
+    source_id: Optional[int] = None
+    debit_total: Optional[float] = None
+    credit_total: Optional[float] = None
+    entry_count: Optional[int] = None
+    details: Optional[str] = None
+    detected_at: datetime
+    resolved_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class LedgerCheckRunResponse(BaseModel):
+    id: int
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    last_entry_id: int
+    entries_checked: int
+    discrepancies_found: int
+    
+    class Config:
+        from_attributes = True
+
+class AccountingPeriodResponse(BaseModel):
+    id: int
+    period: str  # YYYY-MM
+    period_start: date
+    period_end: date
+    last_entry_id: int
+    closed_by: int
+    closed_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class TrialBalanceLine(BaseModel):
+    project_id: Optional[int] = None
+    account_type: str
+    debit_total: float
+    credit_total: float
+    balance: float  # debit_total - credit_total
+
+class TrialBalance(BaseModel):
+    as_of: date
+    base_period: Optional[str] = None  # Closed period the balances start from
+    lines: List[TrialBalanceLine]
+    total_debits: float
+    total_credits: float
+
 class AccountingSummary(BaseModel):
     total_debits: float
     total_credits: float
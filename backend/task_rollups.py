@@ -0,0 +1,131 @@
+"""
+Maintenance helpers for the task_rollups table.
+
+Each TaskRollup row caches per-task totals derived from timesheets, invoice_tasks
+and developer_payment_tasks. Write paths call refresh_task_rollups() for the tasks
+they touched before committing, so the rollup changes in the same transaction as
+its inputs. find_drifted_task_rollups()/rebuild_task_rollups() back the
+consistency checker in verify_task_rollups.py.
+"""
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+from models import TaskRollup, Timesheet, TimesheetStatus, InvoiceTask, DeveloperPaymentTask
+
+ROLLUP_FIELDS = ("approved_hours", "pending_hours", "timesheet_count", "billed_invoice_id", "voucher_paid_amount")
+
+def _empty_rollup() -> dict:
+    return {
+        "approved_hours": 0.0,
+        "pending_hours": 0.0,
+        "timesheet_count": 0,
+        "billed_invoice_id": None,
+        "voucher_paid_amount": 0.0
+    }
+
+def compute_task_rollups(db: Session, task_ids: Optional[Iterable[int]] = None) -> Dict[int, dict]:
+    """Compute rollup values from the source tables with three grouped queries.
+    
+    If task_ids is None, values are computed for every task that has any timesheet,
+    invoice link or developer payment split.
+    """
+    rollups: Dict[int, dict] = {}
+    ids = None
+    if task_ids is not None:
+        ids = list(set(task_ids))
+        if not ids:
+            return rollups
+        rollups = {task_id: _empty_rollup() for task_id in ids}
+    
+    # Timesheet hours by status
+    timesheet_query = db.query(
+        Timesheet.task_id,
+        func.sum(case((Timesheet.status == TimesheetStatus.APPROVED, Timesheet.hours), else_=0.0)),
+        func.sum(case((Timesheet.status == TimesheetStatus.PENDING, Timesheet.hours), else_=0.0)),
+        func.count(Timesheet.id)
+    )
+    if ids is not None:
+        timesheet_query = timesheet_query.filter(Timesheet.task_id.in_(ids))
+    for task_id, approved_hours, pending_hours, timesheet_count in timesheet_query.group_by(Timesheet.task_id).all():
+        rollup = rollups.setdefault(task_id, _empty_rollup())
+        rollup["approved_hours"] = float(approved_hours or 0.0)
+        rollup["pending_hours"] = float(pending_hours or 0.0)
+        rollup["timesheet_count"] = int(timesheet_count or 0)
+    
+    # First invoice each task is billed on
+    invoice_query = db.query(InvoiceTask.task_id, func.min(InvoiceTask.invoice_id))
+    if ids is not None:
+        invoice_query = invoice_query.filter(InvoiceTask.task_id.in_(ids))
+    for task_id, invoice_id in invoice_query.group_by(InvoiceTask.task_id).all():
+        rollups.setdefault(task_id, _empty_rollup())["billed_invoice_id"] = invoice_id
+    
+    # Developer payment splits
+    paid_query = db.query(DeveloperPaymentTask.task_id, func.sum(DeveloperPaymentTask.amount))
+    if ids is not None:
+        paid_query = paid_query.filter(DeveloperPaymentTask.task_id.in_(ids))
+    for task_id, paid_amount in paid_query.group_by(DeveloperPaymentTask.task_id).all():
+        rollups.setdefault(task_id, _empty_rollup())["voucher_paid_amount"] = float(paid_amount or 0.0)
+    
+    return rollups
+
+def refresh_task_rollups(db: Session, task_ids: Iterable[int]) -> None:
+    """Recompute and upsert the rollup rows for the given tasks. Does not commit."""
+    ids = [task_id for task_id in set(task_ids) if task_id is not None]
+    if not ids:
+        return
+    
+    # Make pending changes in this transaction visible to the aggregates
+    db.flush()
+    
+    computed = compute_task_rollups(db, ids)
+    existing = {
+        rollup.task_id: rollup
+        for rollup in db.query(TaskRollup).filter(TaskRollup.task_id.in_(ids)).all()
+    }
+    for task_id, values in computed.items():
+        rollup = existing.get(task_id)
+        if rollup is None:
+            rollup = TaskRollup(task_id=task_id)
+            db.add(rollup)
+        for field, value in values.items():
+            setattr(rollup, field, value)
+
+def _rollup_matches(stored: dict, expected: dict) -> bool:
+    for field in ROLLUP_FIELDS:
+        stored_value = stored[field]
+        expected_value = expected[field]
+        if isinstance(expected_value, float):
+            if abs((stored_value or 0.0) - expected_value) > 1e-6:
+                return False
+        elif stored_value != expected_value:
+            return False
+    return True
+
+def find_drifted_task_rollups(db: Session) -> List[int]:
+    """Return ids of tasks whose stored rollup differs from the source tables"""
+    expected = compute_task_rollups(db)
+    stored = {
+        row.task_id: {field: getattr(row, field) for field in ROLLUP_FIELDS}
+        for row in db.query(TaskRollup.task_id, *[getattr(TaskRollup, field) for field in ROLLUP_FIELDS]).all()
+    }
+    
+    drifted = []
+    for task_id in set(expected) | set(stored):
+        expected_values = expected.get(task_id, _empty_rollup())
+        stored_values = stored.get(task_id)
+        if stored_values is None:
+            # A missing row is equivalent to an empty rollup
+            if not _rollup_matches(_empty_rollup(), expected_values):
+                drifted.append(task_id)
+        elif not _rollup_matches(stored_values, expected_values):
+            drifted.append(task_id)
+    return sorted(drifted)
+
+def rebuild_task_rollups(db: Session, task_ids: Optional[List[int]] = None) -> List[int]:
+    """Rebuild drifted rollups (or the given tasks) and commit. Returns the rebuilt task ids."""
+    if task_ids is None:
+        task_ids = find_drifted_task_rollups(db)
+    if task_ids:
+        refresh_task_rollups(db, task_ids)
+        db.commit()
+    return task_ids
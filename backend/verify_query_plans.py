@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Check that the hot foreign-key lookups use an index instead of a full table scan.
+
+Runs EXPLAIN QUERY PLAN (SQLite) or EXPLAIN (PostgreSQL) on the queries the
+routers issue most and fails if any of them scans a whole table. Run it against
+a database migrated to head, e.g. after `alembic upgrade head`.
+"""
+import re
+import sys
+import json
+from datetime import datetime
+from pathlib import Path
+
+# Add current directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import select, func
+from database import engine
+from models import (
+    Task, Timesheet, TimesheetStatus, TaskDeveloper, DeveloperProject, InvoiceTask,
+    PaymentVoucherTask, DeveloperPayment, DeveloperPaymentTask, AccountingEntry
+)
+
+SINCE = datetime(2025, 1, 1)
+UNTIL = datetime(2025, 2, 1)
+
+# (description, statement) for each hot access path
+HOT_QUERIES = [
+    ("tasks by project",
+     select(Task.id).where(Task.project_id == 1)),
+    ("timesheet hours by task and status",
+     select(func.sum(Timesheet.hours)).where(Timesheet.task_id == 1, Timesheet.status == TimesheetStatus.APPROVED)),
+    ("timesheets by project and date range",
+     select(Timesheet.id).where(Timesheet.project_id == 1, Timesheet.date >= SINCE, Timesheet.date < UNTIL)),
+    ("timesheets by user and date range",
+     select(Timesheet.id).where(Timesheet.user_id == 1, Timesheet.date >= SINCE, Timesheet.date < UNTIL)),
+    ("task developers by task",
+     select(TaskDeveloper.developer_id).where(TaskDeveloper.task_id.in_([1, 2, 3]))),
+    ("task developers by developer",
+     select(TaskDeveloper.task_id).where(TaskDeveloper.developer_id == 1)),
+    ("developer project membership",
+     select(DeveloperProject.id).where(DeveloperProject.project_id == 1, DeveloperProject.developer_id == 1)),
+    ("invoice tasks by task",
+     select(InvoiceTask.invoice_id).where(InvoiceTask.task_id.in_([1, 2, 3]))),
+    ("invoice tasks by invoice",
+     select(InvoiceTask.task_id).where(InvoiceTask.invoice_id == 1)),
+    ("voucher tasks by voucher",
+     select(PaymentVoucherTask.task_id).where(PaymentVoucherTask.voucher_id == 1)),
+    ("voucher tasks by task",
+     select(PaymentVoucherTask.voucher_id).where(PaymentVoucherTask.task_id.in_([1, 2, 3]))),
+    ("developer payments by voucher",
+     select(func.sum(DeveloperPayment.payment_amount)).where(DeveloperPayment.voucher_id == 1)),
+    ("developer payment splits by task",
+     select(func.sum(DeveloperPaymentTask.amount)).where(DeveloperPaymentTask.task_id.in_([1, 2, 3]))),
+    ("developer payment splits by payment",
+     select(DeveloperPaymentTask.task_id).where(DeveloperPaymentTask.payment_id == 1)),
+    ("accounting entries by date range",
+     select(AccountingEntry.id).where(AccountingEntry.transaction_date >= SINCE, AccountingEntry.transaction_date < UNTIL)),
+    ("accounting entries by project and date range",
+     select(AccountingEntry.id).where(
+         AccountingEntry.project_id == 1,
+         AccountingEntry.transaction_date >= SINCE,
+         AccountingEntry.transaction_date < UNTIL
+     )),
+]
+
+# "SCAN timesheets" (or "SCAN TABLE timesheets" on older SQLite) without "USING ... INDEX"
+SQLITE_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+def _compile(statement) -> str:
+    return str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+
+def _sqlite_full_scans(connection, sql: str):
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    details = [row[-1] for row in rows]
+    return [m.group(1) for m in (SQLITE_FULL_SCAN.match(d) for d in details) if m], details
+
+def _postgres_full_scans(connection, sql: str, disable_seqscan: bool):
+    if disable_seqscan:
+        # Small dev tables make sequential scans the cheapest plan, so disable them to
+        # see whether the planner has an index to fall back to at all.
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    
+    scans, details = [], []
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        details.append(f"{node['Node Type']} {node.get('Relation Name', '')}".strip())
+        if node["Node Type"] == "Seq Scan":
+            scans.append(node.get("Relation Name"))
+        nodes.extend(node.get("Plans", []))
+    return scans, details
+
+def explain_full_scans(connection, statement, disable_seqscan: bool = True):
+    """Explain a statement. Returns (tables scanned in full, plan lines).
+    
+    On PostgreSQL, sequential scans are disabled for the current transaction unless
+    disable_seqscan is False; run it inside a transaction that is then ended.
+    """
+    sql = _compile(statement)
+    if connection.dialect.name == "postgresql":
+        return _postgres_full_scans(connection, sql, disable_seqscan)
+    return _sqlite_full_scans(connection, sql)
+
+def verify_query_plans(verbose: bool = False) -> bool:
+    """Explain every hot query. Returns True when none of them does a full table scan."""
+    failures = []
+    
+    with engine.connect() as connection:
+        for description, statement in HOT_QUERIES:
+            with connection.begin():
+                scans, details = explain_full_scans(connection, statement)
+            if scans:
+                failures.append(description)
+                print(f"  ✗ {description}: full scan of {', '.join(scans)}")
+            else:
+                print(f"  ✓ {description}")
+            if verbose or scans:
+                for detail in details:
+                    print(f"      {detail}")
+    
+    if failures:
+        print(f"\n⚠ {len(failures)} of {len(HOT_QUERIES)} hot queries do a full table scan.")
+        print("Run `alembic upgrade head` to create the missing indexes.")
+        return False
+    
+    print(f"\n✓ All {len(HOT_QUERIES)} hot queries use an index")
+    return True
+
+if __name__ == "__main__":
+    try:
+        print(f"Checking query plans on {engine.dialect.name}...\n")
+        success = verify_query_plans(verbose="--verbose" in sys.argv)
+        sys.exit(0 if success else 1)
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Check the task_rollups table against timesheets, invoice_tasks and developer_payment_tasks.
+
+Reports every task whose stored rollup has drifted from the source tables.
+Run with --fix to rebuild the drifted rows, or --all to rebuild every task.
+"""
+import sys
+from pathlib import Path
+
+# Add current directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import SessionLocal
+from models import Task
+from task_rollups import find_drifted_task_rollups, rebuild_task_rollups
+
+def verify_task_rollups(fix: bool = False, rebuild_all: bool = False) -> bool:
+    """Check (and optionally rebuild) task rollups. Returns True when no drift remains."""
+    db = SessionLocal()
+    try:
+        if rebuild_all:
+            task_ids = [task_id for (task_id,) in db.query(Task.id).all()]
+            rebuild_task_rollups(db, task_ids)
+            print(f"✓ Rebuilt rollups for {len(task_ids)} tasks")
+            return True
+    
+        drifted = find_drifted_task_rollups(db)
+        if not drifted:
+            print("✓ All task rollups are consistent")
+            return True
+    
+        print(f"⚠ {len(drifted)} task rollup(s) have drifted:")
+        for task_id in drifted[:50]:
+            print(f"  - task {task_id}")
+        if len(drifted) > 50:
+            print(f"  ... and {len(drifted) - 50} more")
+    
+        if fix:
+            rebuild_task_rollups(db, drifted)
+            print(f"✓ Rebuilt {len(drifted)} task rollup(s)")
+            return True
+    
+        print("\nRun with --fix to rebuild them.")
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    try:
+        success = verify_task_rollups(fix="--fix" in sys.argv, rebuild_all="--all" in sys.argv)
+        sys.exit(0 if success else 1)
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
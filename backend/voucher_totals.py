@@ -0,0 +1,36 @@
+"""
+Maintenance helpers for PaymentVoucher.total_paid and PaymentVoucher.status.
+
+Both columns are derived from developer_payments. Write paths that add (or
+remove) developer payments call refresh_voucher_totals() for the vouchers they
+touched before committing, so the voucher changes in the same transaction as
+its payments and listings can filter on the indexed status column.
+"""
+from typing import Iterable
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import PaymentVoucher, PaymentStatus, DeveloperPayment
+
+VOUCHER_STATUSES = ("pending", "partial", "paid")
+
+def voucher_status(total_paid: float, voucher_amount: float) -> str:
+    return "paid" if total_paid >= voucher_amount else ("partial" if total_paid > 0 else "pending")
+
+def refresh_voucher_totals(db: Session, voucher_ids: Iterable[int]) -> None:
+    """Recompute total_paid and status of the given vouchers. Does not commit."""
+    ids = [voucher_id for voucher_id in set(voucher_ids) if voucher_id is not None]
+    if not ids:
+        return
+    
+    # Make pending payments in this transaction visible to the aggregate
+    db.flush()
+    
+    paid_totals = dict(
+        db.query(DeveloperPayment.voucher_id, func.sum(DeveloperPayment.payment_amount)).filter(
+            DeveloperPayment.voucher_id.in_(ids)
+        ).group_by(DeveloperPayment.voucher_id).all()
+    )
+    for voucher in db.query(PaymentVoucher).filter(PaymentVoucher.id.in_(ids)).all():
+        total_paid = float(paid_totals.get(voucher.id) or 0.0)
+        voucher.total_paid = total_paid
+        voucher.status = PaymentStatus(voucher_status(total_paid, voucher.voucher_amount))
@@ -334,7 +334,8 @@ export default function Dashboard() {
       let invoices = []
       if (user?.role === 'project_owner' || user?.role === 'project_lead' || user?.role === 'super_admin') {
         try {
-          const invoicesRes = await api.get('/payments/invoices')
+          // Payments are embedded so the payment stats below need no extra requests
+          const invoicesRes = await api.get('/payments/invoices', { params: { include: 'payments' } })
           console.log('[Dashboard] Invoices raw response:', invoicesRes)
           console.log('[Dashboard] Invoices response.data:', invoicesRes.data)
           
@@ -439,21 +440,12 @@ export default function Dashboard() {
           .reduce((sum, inv) => sum + (inv.invoice_amount - (inv.total_paid || 0)), 0),
       }
 
-      // Fetch payments for each invoice to calculate payment stats
+      // Payment stats from the payments embedded in each invoice
       let paymentStats = { total: 0, total_amount: 0 }
-      try {
-        for (const invoice of invoices) {
-          try {
-            const paymentsRes = await api.get(`/payments/invoices/${invoice.id}/payments`)
-            const payments = paymentsRes.data || []
-            paymentStats.total += payments.length
-            paymentStats.total_amount += payments.reduce((sum, p) => sum + (p.amount || 0), 0)
-          } catch (err) {
-            // Skip if can't fetch payments for this invoice
-          }
-        }
-      } catch (err) {
-        // Handle payment fetch errors
+      for (const invoice of invoices) {
+        const payments = invoice.payments || []
+        paymentStats.total += payments.length
+        paymentStats.total_amount += payments.reduce((sum, p) => sum + (p.amount || 0), 0)
       }
 
       // Get recent invoices (last 5)
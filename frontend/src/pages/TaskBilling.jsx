@@ -4,6 +4,8 @@ import api from '../services/api'
 import toast from 'react-hot-toast'
 import { useNavigate } from 'react-router-dom'
 
+const TASKS_PAGE_SIZE = 100
+
 export default function TaskBilling() {
   const { user } = useAuth()
   const navigate = useNavigate()
@@ -17,6 +19,8 @@ export default function TaskBilling() {
   const [filterProject, setFilterProject] = useState('all')
   const [filterStatus, setFilterStatus] = useState('all')
   const [filterBilling, setFilterBilling] = useState('all') // all, billed, unbilled
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   // Redirect if not project lead or super admin
   useEffect(() => {
@@ -27,21 +31,49 @@ export default function TaskBilling() {
 
   useEffect(() => {
     if (user && (user.role === 'project_lead' || user.role === 'super_admin')) {
-      fetchTasks()
       fetchProjects()
     }
   }, [user])
 
-  const fetchTasks = async () => {
+  // Filters are applied by the server, so changing one reloads from the first page
+  useEffect(() => {
+    if (user && (user.role === 'project_lead' || user.role === 'super_admin')) {
+      setSelectedTasks([])
+      fetchTasks()
+    }
+  }, [user, filterProject, filterStatus, filterBilling])
+
+  // Pass the X-Next-Cursor of the previous page to append the next one
+  const fetchTasks = async (cursor = null) => {
     try {
-      setLoading(true)
-      const response = await api.get('/tasks/lead/all-tasks')
-      setTasks(response.data)
+      if (cursor) {
+        setLoadingMore(true)
+      } else {
+        setLoading(true)
+      }
+      const params = { limit: TASKS_PAGE_SIZE }
+      if (filterProject !== 'all') {
+        params.project_id = parseInt(filterProject)
+      }
+      if (filterStatus !== 'all') {
+        params.status = filterStatus
+      }
+      if (filterBilling !== 'all') {
+        params.billed = filterBilling === 'billed'
+      }
+      if (cursor) {
+        params.cursor = cursor
+      }
+
+      const response = await api.get('/tasks/lead/all-tasks', { params })
+      setTasks(prev => (cursor ? [...prev, ...response.data] : response.data))
+      setNextCursor(response.headers['x-next-cursor'] || null)
     } catch (error) {
       console.error('Error fetching tasks:', error)
       toast.error('Failed to fetch tasks')
     } finally {
       setLoading(false)
+      setLoadingMore(false)
     }
   }
 
@@ -58,26 +90,9 @@ export default function TaskBilling() {
     }
   }
 
-  // Filter tasks
-  const filteredTasks = tasks.filter(task => {
-    if (filterProject !== 'all' && task.project_id !== parseInt(filterProject)) {
-      return false
-    }
-    if (filterStatus !== 'all' && task.status !== filterStatus) {
-      return false
-    }
-    if (filterBilling === 'billed' && !task.is_paid) {
-      return false
-    }
-    if (filterBilling === 'unbilled' && task.is_paid) {
-      return false
-    }
-    return true
-  })
-
   const handleSelectAll = (e) => {
     if (e.target.checked) {
-      setSelectedTasks(filteredTasks.map(t => t.id))
+      setSelectedTasks(tasks.map(t => t.id))
     } else {
       setSelectedTasks([])
     }
@@ -105,8 +120,8 @@ export default function TaskBilling() {
     )
   }
 
-  // Get unique project IDs for filter
-  const projectIds = [...new Set(tasks.map(t => t.project_id))]
+  // Offer every accessible project, not just those on the loaded pages
+  const projectIds = Object.keys(projects)
 
   return (
     <div>
@@ -215,7 +230,7 @@ export default function TaskBilling() {
                 <th className="table-header-cell w-12">
                   <input
                     type="checkbox"
-                    checked={filteredTasks.length > 0 && selectedTasks.length === filteredTasks.length && filteredTasks.every(t => selectedTasks.includes(t.id))}
+                    checked={tasks.length > 0 && selectedTasks.length === tasks.length && tasks.every(t => selectedTasks.includes(t.id))}
                     onChange={handleSelectAll}
                     className="w-4 h-4 text-primary-600 border-gray-300 rounded focus:ring-primary-500"
                   />
@@ -229,7 +244,7 @@ export default function TaskBilling() {
               </tr>
             </thead>
             <tbody className="table-body">
-              {filteredTasks.length === 0 ? (
+              {tasks.length === 0 ? (
                 <tr>
                   <td colSpan="7" className="table-cell text-center py-12">
                     <div className="empty-state">
@@ -244,7 +259,7 @@ export default function TaskBilling() {
                   </td>
                 </tr>
               ) : (
-                filteredTasks.map((task) => (
+                tasks.map((task) => (
                   <tr
                     key={task.id}
                     className={`table-row ${
@@ -329,6 +344,17 @@ export default function TaskBilling() {
             </tbody>
           </table>
         </div>
+        {nextCursor && (
+          <div className="card-body text-center">
+            <button
+              onClick={() => fetchTasks(nextCursor)}
+              disabled={loadingMore}
+              className="btn btn-secondary"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Description View Modal */}
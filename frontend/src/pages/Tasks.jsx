@@ -4,6 +4,8 @@ import api from '../services/api'
 import toast from 'react-hot-toast'
 import { useNavigate, Link } from 'react-router-dom'
 
+const TASKS_PAGE_SIZE = 100
+
 export default function Tasks() {
   const { user } = useAuth()
   const navigate = useNavigate()
@@ -13,6 +15,8 @@ export default function Tasks() {
   const [filterProject, setFilterProject] = useState('all')
   const [filterStatus, setFilterStatus] = useState('all')
   const [filterBilling, setFilterBilling] = useState('all') // all, billed, unbilled
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [showDescriptionModal, setShowDescriptionModal] = useState(false)
   const [selectedTaskDescription, setSelectedTaskDescription] = useState(null)
 
@@ -25,21 +29,48 @@ export default function Tasks() {
 
   useEffect(() => {
     if (user && (user.role === 'project_owner' || user.role === 'super_admin')) {
-      fetchTasks()
       fetchProjects()
     }
   }, [user])
 
-  const fetchTasks = async () => {
+  // Filters are applied by the server, so changing one reloads from the first page
+  useEffect(() => {
+    if (user && (user.role === 'project_owner' || user.role === 'super_admin')) {
+      fetchTasks()
+    }
+  }, [user, filterProject, filterStatus, filterBilling])
+
+  // Pass the X-Next-Cursor of the previous page to append the next one
+  const fetchTasks = async (cursor = null) => {
     try {
-      setLoading(true)
-      const response = await api.get('/tasks/owner/all-tasks')
-      setTasks(response.data)
+      if (cursor) {
+        setLoadingMore(true)
+      } else {
+        setLoading(true)
+      }
+      const params = { limit: TASKS_PAGE_SIZE }
+      if (filterProject !== 'all') {
+        params.project_id = parseInt(filterProject)
+      }
+      if (filterStatus !== 'all') {
+        params.status = filterStatus
+      }
+      if (filterBilling !== 'all') {
+        params.billed = filterBilling === 'billed'
+      }
+      if (cursor) {
+        params.cursor = cursor
+      }
+
+      const response = await api.get('/tasks/owner/all-tasks', { params })
+      setTasks(prev => (cursor ? [...prev, ...response.data] : response.data))
+      setNextCursor(response.headers['x-next-cursor'] || null)
     } catch (error) {
       console.error('Error fetching tasks:', error)
       toast.error('Failed to fetch tasks')
     } finally {
       setLoading(false)
+      setLoadingMore(false)
     }
   }
 
@@ -56,23 +87,6 @@ export default function Tasks() {
     }
   }
 
-  // Filter tasks
-  const filteredTasks = tasks.filter(task => {
-    if (filterProject !== 'all' && task.project_id !== parseInt(filterProject)) {
-      return false
-    }
-    if (filterStatus !== 'all' && task.status !== filterStatus) {
-      return false
-    }
-    if (filterBilling === 'billed' && !task.is_paid) {
-      return false
-    }
-    if (filterBilling === 'unbilled' && task.is_paid) {
-      return false
-    }
-    return true
-  })
-
   if (user?.role !== 'project_owner' && user?.role !== 'super_admin') {
     return null
   }
@@ -85,8 +99,8 @@ export default function Tasks() {
     )
   }
 
-  // Get unique project IDs for filter
-  const projectIds = [...new Set(tasks.map(t => t.project_id))]
+  // Offer every accessible project, not just those on the loaded pages
+  const projectIds = Object.keys(projects)
 
   return (
     <div className="space-y-6">
@@ -180,7 +194,7 @@ export default function Tasks() {
               </tr>
             </thead>
             <tbody className="table-body">
-              {filteredTasks.length === 0 ? (
+              {tasks.length === 0 ? (
                 <tr>
                   <td colSpan="6" className="table-cell text-center py-12">
                     <div className="flex flex-col items-center">
@@ -195,7 +209,7 @@ export default function Tasks() {
                   </td>
                 </tr>
               ) : (
-                filteredTasks.map((task) => (
+                tasks.map((task) => (
                   <tr
                     key={task.id}
                     className="table-row"
@@ -273,6 +287,17 @@ export default function Tasks() {
             </tbody>
           </table>
         </div>
+        {nextCursor && (
+          <div className="card-body text-center">
+            <button
+              onClick={() => fetchTasks(nextCursor)}
+              disabled={loadingMore}
+              className="btn btn-secondary"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Description View Modal */}